@@ -14,6 +14,12 @@ TRAINING_DIR = f'{DATA_DIR}training/'
 HOLDOUT_DIR = f'{DATA_DIR}holdout/'
 SAMPLE_DIR = f'{DATA_DIR}sample/'
 CACHE_DIR = 'cache/'
+# Decoded recordings, stored per EDF/XML content hash (see src/epoch_store.py)
+EPOCH_STORE_DIR = f'{CACHE_DIR}epoch_store/'
+# Preprocessed signals, stored per recording and modality (see src/preprocess_store.py)
+PREPROCESS_STORE_DIR = f'{CACHE_DIR}preprocess_store/'
+# Header inventory of the training recordings, refreshed per changed file (see src/catalog.py)
+CATALOG_PATH = f'{CACHE_DIR}catalog.json'
 
 # Validate and create directories if needed
 if not os.path.exists(DATA_DIR):
@@ -22,9 +28,88 @@ if not os.path.exists(CACHE_DIR):
     print(f"Creating cache directory: {CACHE_DIR}")
     os.makedirs(CACHE_DIR, exist_ok=True)
 
+# -- Data Loading --
+# Set to True to keep decoded recordings in EPOCH_STORE_DIR so later runs skip EDF decoding.
+USE_EPOCH_STORE = True
+
+# Floating-point type used for signals from decoding through to the feature matrix.
+# float32 halves memory and bandwidth; use 'float64' for bit-exact comparisons.
+SIGNAL_DTYPE = 'float32'
+
+# Number of worker processes used to load recordings in parallel (1 = sequential)
+LOAD_N_JOBS = min(4, os.cpu_count() or 1)
+
+# EEG derivations built from the recorded channels (see src/derivations.py), e.g.
+# ['C4-M1', 'C3-M2'] or ['C3-(M1+M2)/2', 'C4-(M1+M2)/2']. None keeps the channels
+# as recorded (SHHS 'EEG' and 'EEG(sec)' are already C4-A1 and C3-A2).
+EEG_DERIVATIONS = None
+
 # -- Preprocessing --
 LOW_PASS_FILTER_FREQ = 40  # Hz
 
+# Preprocessing chain per modality, applied in order at the modality's own
+# sampling rate (read from channel_info). Steps:
+#   {'step': 'lowpass' | 'highpass', 'cutoff': Hz, 'order': 5}
+#   {'step': 'bandpass', 'cutoff': (low, high), 'order': 5}
+#   {'step': 'notch', 'freq': Hz | 'auto', 'quality': 30}  ('auto' notches the
+#                                    mains frequency detected in the data, if any)
+#   {'step': 'rereference', 'reference': 'average' | channel name}
+#   {'step': 'normalize', 'method': 'zscore' | 'robust', 'scope': 'epoch' | 'recording'}
+#                                    (z-score or median/IQR scaling of each epoch, or of
+#                                    each recording's channels by streaming statistics)
+#   {'step': 'resample', 'fs': Hz}  (polyphase; e.g. EOG to 125 Hz for stacked
+#                                    tensors, or EEG to 100 Hz for cheaper spectra)
+# Adjacent filter steps are fused into one pass; edges at or above Nyquist are skipped.
+PREPROCESSING_CHAIN = {
+    'eeg': [{'step': 'notch', 'freq': 'auto'}, {'step': 'lowpass', 'cutoff': LOW_PASS_FILTER_FREQ}],
+    'eog': [{'step': 'lowpass', 'cutoff': 15}],   # EOG is sampled at 50 Hz; slow eye movements
+    'emg': [{'step': 'notch', 'freq': 'auto'},
+            {'step': 'highpass', 'cutoff': 10}],  # Keep high-frequency muscle activity
+}
+
+# Mains frequencies considered by 'auto' notch steps, and the median
+# powerline-to-baseline magnitude ratio above which interference is notched
+POWERLINE_FREQS = (50.0, 60.0)
+POWERLINE_RATIO_THRESHOLD = 3.0
+
+# How epoched signals are filtered:
+#   'epoch'      - each 30 s epoch on its own (edge transients at every boundary)
+#   'continuous' - causal filter over each recording's continuous signal
+#   'zero_phase' - forward-backward filter over the continuous signal (no phase shift);
+#                  needs whole recordings, so it cannot be used for streaming
+FILTER_MODE = 'zero_phase'
+
+# Filter mode and chain used by preprocess_stream(), which sees one block of epochs at a
+# time: 'zero_phase', 'auto' notches, 'recording' normalization and (in 'continuous'
+# mode) resampling need whole recordings, so the notches use the US mains frequency.
+STREAM_FILTER_MODE = 'continuous'
+STREAM_PREPROCESSING_CHAIN = {
+    'eeg': [{'step': 'notch', 'freq': 60.0}, {'step': 'lowpass', 'cutoff': LOW_PASS_FILTER_FREQ}],
+    'eog': [{'step': 'lowpass', 'cutoff': 15}],
+    'emg': [{'step': 'notch', 'freq': 60.0}, {'step': 'highpass', 'cutoff': 10}],
+}
+
+# Workers used to run the preprocessing chain over chunks of epochs/channels (1 = sequential)
+# 'thread' shares the arrays directly (SciPy filters release the GIL);
+# 'process' uses a process pool with shared-memory input and output.
+PREPROCESS_N_JOBS = os.cpu_count() or 1
+PREPROCESS_BACKEND = 'thread'
+
+# Set to True to keep preprocessed signals in PREPROCESS_STORE_DIR. Entries are keyed by the
+# raw signal and the modality's settings, so changing one modality's chain only recomputes
+# that modality, and stale results are never returned.
+USE_PREPROCESS_STORE = True
+
+# -- Signal Quality --
+# Per-epoch, per-channel quality checks (see src/quality.py)
+QA_FLAT_STD = 1e-7          # V; epochs with a lower standard deviation are flat
+QA_CLIP_FRACTION = 0.05     # share of samples at the channel's min/max that counts as clipping
+QA_AMPLITUDE_Z = 6.0        # robust z-score of the epoch amplitude that counts as an outlier
+QA_POWERLINE_RATIO = 5.0    # powerline-to-baseline magnitude ratio of one epoch, at any of POWERLINE_FREQS
+QA_EOG_CORRELATION = 0.9    # |r| between EEG and EOG that counts as eye-movement contamination
+# Set to True to drop flagged epochs before feature extraction and training
+QA_DROP_BAD_EPOCHS = False
+
 # -- Feature Extraction --
 # (Add feature-specific parameters here)
 
@@ -1,17 +1,17 @@
 import config
-from src.data_loader import load_training_data
+from src.data_loader import load_all_training_data
+from src.derivations import derive_eeg
 from src.preprocessing import preprocess
+from src.quality import assess_signal_quality, usable_epochs, summarize_quality
 from src.feature_extraction import extract_features
 from src.feature_selection import select_features
 from src.classification import train_classifier
 from src.visualization import visualize_results
 from src.report import generate_report
-from src.utils import save_cache, load_cache
-import os
+from src.utils import save_cache, load_cache, get_sampling_rate
 import sys
 import io
 import numpy as np
-from glob import glob
 
 
 def main():
@@ -32,56 +32,23 @@ def main():
     # Load ALL available data files from training directory
     print("\n=== STEP 1: DATA LOADING ===")
 
-    # Find all .edf files in the training directory
-    edf_files = sorted(glob(os.path.join(config.TRAINING_DIR, "*.edf")))
+    # Load every EDF + XML pair in the training directory
+    multi_channel_data, labels, record_ids, channel_info = load_all_training_data(
+        config.TRAINING_DIR, n_jobs=config.LOAD_N_JOBS, dtype=config.SIGNAL_DTYPE,
+        store_dir=config.EPOCH_STORE_DIR if config.USE_EPOCH_STORE else None,
+        catalog_path=config.CATALOG_PATH
+    )
 
-    if len(edf_files) == 0:
-        raise FileNotFoundError(f"No .edf files found in {config.TRAINING_DIR}")
+    # Montage-independent EEG: mix the recorded channels into the configured derivations
+    # (run_inference.py derives the holdout EEG with the same helper)
+    multi_channel_data, channel_info['eeg_names'] = derive_eeg(multi_channel_data, channel_info,
+                                                               config.EEG_DERIVATIONS)
+    if config.EEG_DERIVATIONS:
+        print(f"  EEG derivations: {', '.join(channel_info['eeg_names'])}")
 
-    print(f"Found {len(edf_files)} data files to load")
-
-    # Lists to store data from all files
-    all_eeg_data = []
-    all_labels = []
-
-    # Load each file pair (EDF + XML)
-    for edf_file in edf_files:
-        # Get corresponding XML file
-        base_name = os.path.splitext(os.path.basename(edf_file))[0]
-        xml_file = os.path.join(config.TRAINING_DIR, f"{base_name}.xml")
-
-        if not os.path.exists(xml_file):
-            print(f"⚠️  WARNING: No annotation file found for {base_name}.edf, skipping...")
-            continue
-
-        print(f"\nLoading {base_name}...")
-
-        # Handle both new multi-channel format and old single-channel format for compatibility
-        try:
-            multi_channel_data, labels, channel_info = load_training_data(edf_file, xml_file)
-            print(f"  Multi-channel data loaded:")
-            print(f"    EEG: {multi_channel_data['eeg'].shape}")
-            print(f"    EOG: {multi_channel_data['eog'].shape}")
-            print(f"    EMG: {multi_channel_data['emg'].shape}")
-            print(f"  Labels: {labels.shape}")
-
-            # For pipeline compatibility, use EEG data as primary signal
-            eeg_data_file = multi_channel_data['eeg'][:, 0, :]  # Use first EEG channel for now
-            print(f"  Using EEG channel 1: {eeg_data_file.shape}")
-
-        except (ValueError, TypeError):
-            # Fallback to old format if multi-channel not implemented
-            eeg_data_file, labels = load_training_data(edf_file, xml_file)
-            print(f"  Single-channel data loaded: {eeg_data_file.shape}, Labels: {labels.shape}")
-
-        # Append to lists
-        all_eeg_data.append(eeg_data_file)
-        all_labels.append(labels)
-
-    # Concatenate all data
-    print(f"\n--- Concatenating data from {len(all_eeg_data)} files ---")
-    eeg_data = np.concatenate(all_eeg_data, axis=0)
-    labels = np.concatenate(all_labels, axis=0)
+    # For pipeline compatibility, use EEG data as primary signal
+    eeg_data = multi_channel_data['eeg'][:, 0, :]  # Use first EEG channel/derivation for now
+    print(f"  Using EEG channel 1 ({channel_info['eeg_names'][0]}): {eeg_data.shape}")
 
     print(f"Combined dataset:")
     print(f"  EEG data shape: {eeg_data.shape}")
@@ -97,21 +64,32 @@ def main():
             percentage = count / len(labels) * 100
             print(f"  {stage_names[label]}: {count} epochs ({percentage:.1f}%)")
 
+    # Flag bad epochs on the raw signals (flat, clipped, outliers, powerline, EOG leakage),
+    # each recording against its own baselines
+    quality_flags = assess_signal_quality(multi_channel_data, channel_info, config, record_ids)
+    usable = usable_epochs(quality_flags)
+    print(f"\nSignal quality: {np.count_nonzero(~usable)} of {len(usable)} epochs flagged")
+    for signal_type, counts in summarize_quality(quality_flags).items():
+        flagged = {name: count for name, count in counts.items() if count}
+        if flagged:
+            print(f"  {signal_type.upper()}: {flagged}")
+
     # 2. Preprocessing
     print("\n=== STEP 2: PREPROCESSING ===")
-    preprocessed_data = None
-    cache_filename_preprocess = f"preprocessed_data_iter{config.CURRENT_ITERATION}.joblib"
-    if config.USE_CACHE:
-        preprocessed_data = load_cache(cache_filename_preprocess, config.CACHE_DIR)
-        if preprocessed_data is not None:
-            print("Loaded preprocessed data from cache")
-
-    if preprocessed_data is None:
-        preprocessed_data = preprocess(eeg_data, config)
-        print(f"Preprocessed data shape: {preprocessed_data.shape}")
-        if config.USE_CACHE:
-            save_cache(preprocessed_data, cache_filename_preprocess, config.CACHE_DIR)
-            print("Saved preprocessed data to cache")
+    # The raw EEG is not needed afterwards, so preprocess it in place. Recordings
+    # already preprocessed with the current settings are read from the store.
+    # The returned channel_info holds the rates after any resampling steps.
+    preprocessed_data, channel_info = preprocess(
+        eeg_data, config, record_ids=record_ids, channel_info=channel_info, inplace=True,
+        store_dir=config.PREPROCESS_STORE_DIR if config.USE_PREPROCESS_STORE else None,
+        return_channel_info=True)
+    print(f"Preprocessed data shape: {preprocessed_data.shape} at {get_sampling_rate(channel_info, 'eeg')} Hz")
+
+    if config.QA_DROP_BAD_EPOCHS:
+        preprocessed_data = preprocessed_data[usable]
+        labels = labels[usable]
+        record_ids = record_ids[usable]
+        print(f"Dropped {np.count_nonzero(~usable)} flagged epochs, {len(labels)} remain")
 
     # 3. Feature Extraction
     print("\n=== STEP 3: FEATURE EXTRACTION ===")
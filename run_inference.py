@@ -1,5 +1,6 @@
 import config
 from src.data_loader import load_holdout_data
+from src.derivations import derive_eeg
 from src.preprocessing import preprocess
 from src.feature_extraction import extract_features
 from src.inference import make_inference, generate_submission_file
@@ -20,7 +21,15 @@ def run_inference():
     # 1. Load Hold-out Data
     # For jumpstart, we're using dummy data. In a real scenario, you'd iterate through files.
     holdout_edf_file = os.path.join(config.HOLDOUT_DIR, "dummy_holdout.edf") # Placeholder
-    holdout_eeg_data = load_holdout_data(holdout_edf_file)
+    holdout_data, record_info = load_holdout_data(
+        holdout_edf_file, dtype=config.SIGNAL_DTYPE,
+        store_dir=config.EPOCH_STORE_DIR if config.USE_EPOCH_STORE else None
+    )
+
+    # Same EEG derivations and channel as training (see main.py)
+    holdout_data, eeg_names = derive_eeg(holdout_data, record_info, config.EEG_DERIVATIONS)
+    holdout_eeg_data = holdout_data['eeg'][:, 0, :]
+    print(f"  Using EEG channel 1 ({eeg_names[0]}): {holdout_eeg_data.shape}")
 
     # 2. Preprocessing (using the same logic as training)
     preprocessed_holdout_data = None
@@ -29,7 +38,7 @@ def run_inference():
         preprocessed_holdout_data = load_cache(cache_filename_preprocess_holdout, config.CACHE_DIR)
     
     if preprocessed_holdout_data is None:
-        preprocessed_holdout_data = preprocess(holdout_eeg_data, config)
+        preprocessed_holdout_data = preprocess(holdout_eeg_data, config, channel_info=record_info)
         if config.USE_CACHE:
             save_cache(preprocessed_holdout_data, cache_filename_preprocess_holdout, config.CACHE_DIR)
 
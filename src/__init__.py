@@ -3,21 +3,60 @@
 from .data_loader import (
     load_training_data,
     load_holdout_data,
-    load_all_training_data
+    load_all_training_data,
+    plan_training_data,
+    assemble_training_data,
+    stream_holdout_data
 )
 from .xml_parser import (
     parse_xml_annotations,
     create_epoch_labels
 )
+from .catalog import (
+    build_catalog
+)
 
 from .preprocessing import (
     preprocess,
-    lowpass_filter
+    preprocess_stream,
+    lowpass_filter,
+    apply_filter,
+    filter_epochs,
+    compile_chain,
+    apply_chain
+)
+
+from .filters import (
+    design_filter
+)
+
+from .quality import (
+    assess_signal_quality,
+    usable_epochs,
+    summarize_quality
+)
+
+from .powerline import (
+    analyze_powerline,
+    detect_powerline,
+    powerline_epochs
+)
+
+from .normalization import (
+    normalize_recordings
+)
+
+from .derivations import (
+    derive_channels,
+    derive_eeg,
+    derivation_matrix
 )
 
 from .feature_extraction import (
     extract_features,
-    extract_time_domain_features
+    extract_features_stream,
+    extract_time_domain_features,
+    time_domain_features
 )
 
 from .feature_selection import (
@@ -46,15 +85,43 @@ __all__ = [
     'load_training_data',
     'load_holdout_data',
     'load_all_training_data',
+    'plan_training_data',
+    'assemble_training_data',
+    'stream_holdout_data',
     # xml parser
     'parse_xml_annotations',
     'create_epoch_labels',
+    # catalog
+    'build_catalog',
     # preprocessing
     'preprocess',
+    'preprocess_stream',
     'lowpass_filter',
+    'apply_filter',
+    'filter_epochs',
+    'compile_chain',
+    'apply_chain',
+    # filters
+    'design_filter',
+    # quality
+    'assess_signal_quality',
+    'usable_epochs',
+    'summarize_quality',
+    # powerline
+    'analyze_powerline',
+    'detect_powerline',
+    'powerline_epochs',
+    # normalization
+    'normalize_recordings',
+    # derivations
+    'derive_channels',
+    'derive_eeg',
+    'derivation_matrix',
     # feature_extraction
     'extract_features',
+    'extract_features_stream',
     'extract_time_domain_features',
+    'time_domain_features',
     # feature_selection
     'select_features',
     # classification
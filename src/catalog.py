@@ -0,0 +1,163 @@
+"""
+Recording Catalog
+
+Builds an inventory of the recordings in a data directory from the EDF
+headers and XML annotations only; no signal data is decoded. The catalog
+lists channels, sampling rates, epoch counts, stage histograms and file
+metadata per recording, and is cached as JSON. On later builds only the
+recordings whose files changed (size or modification time) are re-read.
+
+The catalog is meant for planning work over large cohorts, e.g. estimating
+memory, sharding recordings across workers, or filtering by montage,
+without touching the signals.
+"""
+
+import os
+import json
+import numpy as np
+from glob import glob
+from pathlib import Path
+
+# Handle both package import and standalone execution
+try:
+    from .edf_reader import read_edf_header
+    from .xml_parser import parse_xml_annotations, create_epoch_labels
+except ImportError:
+    from edf_reader import read_edf_header
+    from xml_parser import parse_xml_annotations, create_epoch_labels
+
+STAGE_NAMES = ['Wake', 'N1', 'N2', 'N3', 'REM']
+
+
+def build_catalog(data_dir, epoch_length=30, cache_path=None):
+    """
+    Build (or incrementally refresh) the catalog of a data directory.
+
+    Args:
+        data_dir (str): Directory containing EDF files (and matching XML files)
+        epoch_length (float): Epoch duration in seconds (default 30)
+        cache_path (str): JSON file to cache the catalog in (default None,
+            no caching). Entries whose files are unchanged are reused.
+
+    Returns:
+        dict: Catalog entry per record ID, in file order, each with keys:
+            - 'edf_file', 'xml_file' (None for unlabelled recordings)
+            - 'channels': list of signal labels
+            - 'sampling_rates': dict of signal label -> Hz
+            - 'duration': float, recording duration in seconds
+            - 'n_epochs': int, epochs the loaders will produce
+            - 'stage_histogram': dict of stage name -> epoch count (None without XML)
+            - 'edf_size', 'edf_mtime', 'xml_size', 'xml_mtime': file metadata
+
+    Example:
+        >>> catalog = build_catalog('data/training/', cache_path='cache/catalog.json')
+        >>> print(sum(entry['n_epochs'] for entry in catalog.values()))
+    """
+    cached = _load_cached_catalog(cache_path, epoch_length)
+
+    catalog = {}
+    n_refreshed = 0
+
+    for edf_file in sorted(glob(os.path.join(data_dir, '*.edf'))):
+        record_id = Path(edf_file).stem
+        xml_file = os.path.splitext(edf_file)[0] + '.xml'
+        if not os.path.exists(xml_file):
+            xml_file = None
+
+        file_info = _file_info(edf_file, xml_file)
+
+        entry = cached.get(record_id)
+        if entry is not None and all(entry.get(k) == v for k, v in file_info.items()):
+            catalog[record_id] = entry
+            continue
+
+        try:
+            catalog[record_id] = _catalog_entry(edf_file, xml_file, epoch_length, file_info)
+            n_refreshed += 1
+        except Exception as e:
+            print(f"  ERROR cataloguing {record_id}: {e}")
+
+    print(f"Catalog: {len(catalog)} recordings in {data_dir} ({n_refreshed} read, {len(catalog) - n_refreshed} cached)")
+
+    if cache_path is not None:
+        _save_catalog(cache_path, catalog, epoch_length)
+
+    return catalog
+
+
+def _file_info(edf_file, xml_file):
+    """File paths, sizes and modification times used to detect changes."""
+    edf_stat = os.stat(edf_file)
+    xml_stat = os.stat(xml_file) if xml_file is not None else None
+    return {
+        'edf_file': edf_file,
+        'xml_file': xml_file,
+        'edf_size': edf_stat.st_size,
+        'edf_mtime': edf_stat.st_mtime,
+        'xml_size': xml_stat.st_size if xml_stat else None,
+        'xml_mtime': xml_stat.st_mtime if xml_stat else None,
+    }
+
+
+def _catalog_entry(edf_file, xml_file, epoch_length, file_info):
+    """Read one recording's headers and annotations into a catalog entry."""
+    header = read_edf_header(edf_file)
+    n_epochs = int(header['last_sample_time'] / epoch_length)
+
+    stage_histogram = None
+    if xml_file is not None:
+        stages = parse_xml_annotations(xml_file, as_table=True)['stages']
+        labels = create_epoch_labels(stages, header['last_sample_time'], epoch_length)[:n_epochs]
+        counts = np.bincount(labels, minlength=len(STAGE_NAMES))
+        stage_histogram = {name: int(count) for name, count in zip(STAGE_NAMES, counts)}
+
+    entry = dict(file_info)
+    entry.update({
+        'channels': header['labels'],
+        'sampling_rates': {label: float(fs) for label, fs in zip(header['labels'], header['sampling_rates'])},
+        'duration': float(header['duration']),
+        'n_epochs': n_epochs,
+        'stage_histogram': stage_histogram,
+    })
+    return entry
+
+
+def _load_cached_catalog(cache_path, epoch_length):
+    """Load cached entries; empty if missing, unreadable or built for another epoch length."""
+    if cache_path is None or not os.path.exists(cache_path):
+        return {}
+
+    try:
+        with open(cache_path) as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+    if cached.get('epoch_length') != epoch_length:
+        return {}
+    return cached.get('records', {})
+
+
+def _save_catalog(cache_path, catalog, epoch_length):
+    """Write the catalog JSON atomically."""
+    directory = os.path.dirname(cache_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    tmp_path = f'{cache_path}.tmp-{os.getpid()}'
+    with open(tmp_path, 'w') as f:
+        json.dump({'epoch_length': epoch_length, 'records': catalog}, f, indent=2)
+    os.replace(tmp_path, cache_path)
+
+
+if __name__ == '__main__':
+    # Example usage
+    import sys
+
+    if len(sys.argv) > 1:
+        catalog = build_catalog(sys.argv[1])
+        for record_id, entry in catalog.items():
+            print(f"{record_id}: {entry['n_epochs']} epochs, {len(entry['channels'])} channels, "
+                  f"{entry['edf_size'] / 1e6:.1f} MB")
+    else:
+        print("Usage: python catalog.py <data_dir>")
@@ -0,0 +1,101 @@
+"""
+Channel Classification Rules
+
+Single rule engine that maps EDF channel labels to EEG, EOG and EMG groups,
+plus a separate group of reference electrodes recorded on their own.
+The training loader, holdout loader, dataset planner and streaming reader
+all resolve channels here, so they cannot drift apart.
+
+The name patterns are compiled once, and resolved plans are memoized by
+header signature (channel labels plus sampling rates): loading many
+recordings with the same montage runs the detection only once.
+"""
+
+import re
+from functools import lru_cache
+
+SIGNAL_TYPES = ('eeg', 'eog', 'emg')
+
+# Group of the reference electrodes; only read by derivations.derive_eeg()
+REFERENCE_GROUP = 'ref'
+
+# EOG channels (checked first to avoid conflicts)
+EOG_RULE = re.compile(r'EOG')
+
+# EMG channels (checked before EEG to avoid conflicts)
+EMG_RULE = re.compile(r'EMG|CHIN')
+
+# EEG channels: 'EEG' in the label, but not SaO2, SpO2, etc.
+EEG_LABEL_RULE = re.compile(r'EEG')
+EEG_EXCLUDE_RULE = re.compile(r'SAO|SPO')
+
+# EEG electrodes: C3, C4 (central), F3, F4 (frontal), O1, O2 (occipital), midline
+EEG_ELECTRODE_RULE = re.compile(r'C3|C4|F3|F4|O1-|O2-|CZ|FZ|PZ')
+
+# Reference electrodes recorded on their own (mastoids M1/M2, earlobes A1/A2).
+# They go to the REFERENCE_GROUP, never to the EEG, so derivations such as
+# C3-(M1+M2)/2 can use them without a mastoid ever standing in for the EEG
+EEG_REFERENCE_RULE = re.compile(r'^(EEG[\s_]*)?[AM][12]\b')
+
+
+def resolve_channel_plan(channel_names, sampling_rates=None):
+    """
+    Resolve the EEG/EOG/EMG channel plan for a recording.
+
+    Args:
+        channel_names (list): Channel labels from the EDF header
+        sampling_rates (list): Optional sampling rate per channel in Hz
+
+    Returns:
+        dict: Channel plan with keys:
+            - 'groups': dict of signal type -> list of channel names, for
+              SIGNAL_TYPES and REFERENCE_GROUP (reference electrodes)
+            - 'sampling_rates': dict of group -> highest sampling rate
+              in the group in Hz (None if rates were not given or the
+              group is empty)
+
+    Example:
+        >>> plan = resolve_channel_plan(['EEG', 'EOG(L)', 'EMG'], [125, 50, 125])
+        >>> plan['groups']['eog'], plan['sampling_rates']['eog']
+        (['EOG(L)'], 50.0)
+    """
+    rates = tuple(float(fs) for fs in sampling_rates) if sampling_rates is not None else None
+    groups, group_rates = _resolve(tuple(channel_names), rates)
+
+    # Fresh lists/dicts so callers cannot modify the memoized plan
+    return {
+        'groups': {signal_type: list(names) for signal_type, names in groups},
+        'sampling_rates': dict(group_rates),
+    }
+
+
+@lru_cache(maxsize=256)
+def _resolve(channel_names, sampling_rates):
+    """Memoized channel classification, keyed by header signature."""
+    upper = [ch.upper() for ch in channel_names]
+
+    eog = [i for i, u in enumerate(upper) if EOG_RULE.search(u)]
+    emg = [i for i, u in enumerate(upper) if EMG_RULE.search(u)]
+
+    eeg_candidates = [
+        i for i, u in enumerate(upper)
+        if (EEG_LABEL_RULE.search(u) and not EEG_EXCLUDE_RULE.search(u))
+        or EEG_ELECTRODE_RULE.search(u)
+    ]
+
+    # Exclude EOG/EMG channels (by name, so duplicated labels stay excluded)
+    taken = {channel_names[i] for i in eog + emg}
+    ref = [i for i, u in enumerate(upper) if EEG_REFERENCE_RULE.search(u) and channel_names[i] not in taken]
+    taken.update(channel_names[i] for i in ref)
+    eeg = [i for i in eeg_candidates if channel_names[i] not in taken]
+
+    groups = []
+    group_rates = []
+    for signal_type, indices in zip(SIGNAL_TYPES + (REFERENCE_GROUP,), (eeg, eog, emg, ref)):
+        groups.append((signal_type, tuple(channel_names[i] for i in indices)))
+        fs = None
+        if sampling_rates is not None and indices:
+            fs = max(sampling_rates[i] for i in indices)
+        group_rates.append((signal_type, fs))
+
+    return tuple(groups), tuple(group_rates)
@@ -8,16 +8,26 @@ for sleep stage classification.
 import numpy as np
 import mne
 import os
+from collections import deque
 from pathlib import Path
 
 # Handle both package import and standalone execution
 try:
     from .xml_parser import parse_xml_annotations, create_epoch_labels
+    from .edf_reader import read_edf_header, read_epochs
+    from .epoch_store import store_key, load_from_store, save_to_store
+    from .channels import resolve_channel_plan
+    from .catalog import build_catalog
 except ImportError:
     from xml_parser import parse_xml_annotations, create_epoch_labels
+    from edf_reader import read_edf_header, read_epochs
+    from epoch_store import store_key, load_from_store, save_to_store
+    from channels import resolve_channel_plan
+    from catalog import build_catalog
 
 
-def load_training_data(edf_file_path, xml_file_path, epoch_length=30):
+def load_training_data(edf_file_path, xml_file_path, epoch_length=30,
+                       reader='selective', dtype=None, store_dir=None):
     """
     Load EDF and XML files for training.
 
@@ -29,6 +39,18 @@ def load_training_data(edf_file_path, xml_file_path, epoch_length=30):
         edf_file_path (str): Path to the EDF file
         xml_file_path (str): Path to the XML annotation file
         epoch_length (float): Epoch duration in seconds (default 30)
+        reader (str): EDF reading strategy (default 'selective'):
+            - 'selective': read the header first, then decode only the
+              EEG/EOG/EMG signals, each group at its native sampling rate
+            - 'native': like 'selective', but decoded by the built-in
+              memory-mapped EDF reader instead of MNE (see edf_reader.py)
+            - 'preload': decode every signal in the file up front (MNE
+              resamples all signals to the highest sampling rate)
+        dtype: Signal dtype, e.g. np.float32 (default float64)
+        store_dir (str): Epoch store directory (default None, no store). When
+            set, the decoded recording is saved there on the first load and
+            later loads of the same files return memory-mapped arrays from
+            the store instead of decoding the EDF again (see epoch_store.py)
 
     Returns:
         tuple: (multi_channel_data, labels, channel_info) where:
@@ -36,6 +58,9 @@ def load_training_data(edf_file_path, xml_file_path, epoch_length=30):
                 - 'eeg': np.ndarray, shape (n_epochs, n_eeg_channels, samples_per_epoch)
                 - 'eog': np.ndarray, shape (n_epochs, n_eog_channels, samples_per_epoch)
                 - 'emg': np.ndarray, shape (n_epochs, n_emg_channels, samples_per_epoch)
+                - 'ref': only when the montage records reference electrodes
+                  (M1/M2, A1/A2) on their own; consumed by
+                  derivations.derive_eeg()
             - labels (np.ndarray): Shape (n_epochs,), integer labels 0-4
             - channel_info (dict): Metadata about channels and sampling rates
 
@@ -52,11 +77,21 @@ def load_training_data(edf_file_path, xml_file_path, epoch_length=30):
     if not os.path.exists(xml_file_path):
         raise FileNotFoundError(f"XML file not found: {xml_file_path}")
 
-    # Load EDF file
-    raw = mne.io.read_raw_edf(edf_file_path, preload=True, verbose=False)
+    # Reuse a previously decoded copy of this recording if there is one
+    if store_dir is not None:
+        key = store_key(edf_file_path, xml_file_path, epoch_length,
+                        dtype if dtype is not None else np.float64, reader)
+        stored = load_from_store(store_dir, key)
+        if stored is not None:
+            multi_channel_data, labels, channel_info = stored
+            print(f"Loaded {len(labels)} epochs from epoch store ({key[:12]})")
+            return multi_channel_data, labels, channel_info
+
+    # Open the EDF (header only unless the reader preloads)
+    edf = _open_edf(edf_file_path, reader)
 
     # Get recording duration
-    recording_duration = raw.times[-1]  # Duration in seconds
+    recording_duration = edf['duration']  # Duration in seconds
 
     # Parse XML annotations
     parsed_xml = parse_xml_annotations(xml_file_path)
@@ -67,64 +102,21 @@ def load_training_data(edf_file_path, xml_file_path, epoch_length=30):
     labels = create_epoch_labels(stages, recording_duration, epoch_length)
 
     # Identify channels by name patterns
-    channel_names = raw.ch_names
-
-    # EOG channels (check first to avoid conflicts)
-    eog_channels = [ch for ch in channel_names if 'EOG' in ch.upper()]
-
-    # EMG channels (check before EEG to avoid conflicts)
-    emg_channels = [ch for ch in channel_names if 'EMG' in ch.upper() or 'CHIN' in ch.upper()]
-
-    # EEG channels - match specific patterns, exclude already identified channels
-    eeg_candidates = []
-    for ch in channel_names:
-        ch_upper = ch.upper()
-        # Match EEG with specific patterns, but exclude SaO2, SpO2, etc.
-        if 'EEG' in ch_upper and 'SAO' not in ch_upper and 'SPO' not in ch_upper:
-            eeg_candidates.append(ch)
-        # Match C3, C4 (central), F3, F4 (frontal), O1, O2 (occipital), etc.
-        elif any(pattern in ch_upper for pattern in ['C3', 'C4', 'F3', 'F4', 'O1-', 'O2-', 'CZ', 'FZ', 'PZ']):
-            eeg_candidates.append(ch)
-
-    # Remove duplicates and exclude EOG/EMG channels
-    eeg_channels = [ch for ch in eeg_candidates
-                    if ch not in eog_channels and ch not in emg_channels]
-
-    print(f"Identified channels:")
-    print(f"  EEG: {eeg_channels}")
-    print(f"  EOG: {eog_channels}")
-    print(f"  EMG: {emg_channels}")
+    channel_groups = _channel_plan(edf)['groups']
+    _print_channel_groups(channel_groups)
 
     # Extract data for each signal type
     multi_channel_data = {}
     channel_info = {'epoch_length': epoch_length}
 
-    # Extract EEG data
-    if eeg_channels:
-        eeg_raw = raw.copy().pick(eeg_channels)
-        eeg_data, eeg_fs = _extract_epochs(eeg_raw, epoch_length, n_epochs)
-        multi_channel_data['eeg'] = eeg_data
-        channel_info['eeg_names'] = eeg_channels
-        channel_info['eeg_fs'] = eeg_fs
-        print(f"  EEG: {eeg_data.shape[1]} channels, {eeg_data.shape[2]} samples/epoch, {eeg_fs} Hz")
-
-    # Extract EOG data
-    if eog_channels:
-        eog_raw = raw.copy().pick(eog_channels)
-        eog_data, eog_fs = _extract_epochs(eog_raw, epoch_length, n_epochs)
-        multi_channel_data['eog'] = eog_data
-        channel_info['eog_names'] = eog_channels
-        channel_info['eog_fs'] = eog_fs
-        print(f"  EOG: {eog_data.shape[1]} channels, {eog_data.shape[2]} samples/epoch, {eog_fs} Hz")
-
-    # Extract EMG data
-    if emg_channels:
-        emg_raw = raw.copy().pick(emg_channels)
-        emg_data, emg_fs = _extract_epochs(emg_raw, epoch_length, n_epochs)
-        multi_channel_data['emg'] = emg_data
-        channel_info['emg_names'] = emg_channels
-        channel_info['emg_fs'] = emg_fs
-        print(f"  EMG: {emg_data.shape[1]} channels, {emg_data.shape[2]} samples/epoch, {emg_fs} Hz")
+    for signal_type, channels in channel_groups.items():
+        if not channels:
+            continue
+        data, fs = _load_channel_group(edf, channels, epoch_length, n_epochs, dtype)
+        multi_channel_data[signal_type] = data
+        channel_info[f'{signal_type}_names'] = channels
+        channel_info[f'{signal_type}_fs'] = fs
+        print(f"  {signal_type.upper()}: {data.shape[1]} channels, {data.shape[2]} samples/epoch, {fs} Hz")
 
     # Print label distribution
     print(f"\nLoaded {n_epochs} epochs ({n_epochs*epoch_length/3600:.2f} hours)")
@@ -133,21 +125,29 @@ def load_training_data(edf_file_path, xml_file_path, epoch_length=30):
     # Trim labels to match data (in case of rounding issues)
     labels = labels[:n_epochs]
 
+    if store_dir is not None:
+        save_to_store(store_dir, key, multi_channel_data, channel_info, labels)
+
     return multi_channel_data, labels, channel_info
 
 
-def load_holdout_data(edf_file_path, epoch_length=30):
+def load_holdout_data(edf_file_path, epoch_length=30, reader='selective',
+                      dtype=None, store_dir=None):
     """
     Load holdout EDF file (no labels) for inference.
 
     Args:
         edf_file_path (str): Path to the EDF file
         epoch_length (float): Epoch duration in seconds (default 30)
+        reader (str): EDF reading strategy, see load_training_data()
+        dtype: Signal dtype, e.g. np.float32 (default float64)
+        store_dir (str): Epoch store directory, see load_training_data()
 
     Returns:
         tuple: (multi_channel_data, record_info) where:
             - multi_channel_data (dict): Same structure as load_training_data
-            - record_info (dict): Metadata including record_id, n_epochs, channels
+            - record_info (dict): Metadata including record_id, n_epochs,
+              channels, sampling_rates and '<type>_names' per loaded group
 
     Example:
         >>> data, info = load_holdout_data('H1.edf')
@@ -163,66 +163,42 @@ def load_holdout_data(edf_file_path, epoch_length=30):
     # Extract record ID from filename
     record_id = Path(edf_file_path).stem
 
-    # Load EDF file
-    raw = mne.io.read_raw_edf(edf_file_path, preload=True, verbose=False)
+    # Reuse a previously decoded copy of this recording if there is one
+    if store_dir is not None:
+        key = store_key(edf_file_path, None, epoch_length,
+                        dtype if dtype is not None else np.float64, reader)
+        stored = load_from_store(store_dir, key)
+        if stored is not None:
+            multi_channel_data, _, record_info = stored
+            record_info['record_id'] = record_id
+            print(f"Loaded {record_info['n_epochs']} epochs from epoch store ({key[:12]})")
+            return multi_channel_data, record_info
+
+    # Open the EDF (header only unless the reader preloads)
+    edf = _open_edf(edf_file_path, reader)
 
     # Get recording duration
-    recording_duration = raw.times[-1]
+    recording_duration = edf['duration']
     n_epochs = int(recording_duration / epoch_length)
 
     # Identify channels (same as training)
-    channel_names = raw.ch_names
-
-    # EOG channels (check first to avoid conflicts)
-    eog_channels = [ch for ch in channel_names if 'EOG' in ch.upper()]
-
-    # EMG channels (check before EEG to avoid conflicts)
-    emg_channels = [ch for ch in channel_names if 'EMG' in ch.upper() or 'CHIN' in ch.upper()]
-
-    # EEG channels - match specific patterns, exclude already identified channels
-    eeg_candidates = []
-    for ch in channel_names:
-        ch_upper = ch.upper()
-        # Match EEG with specific patterns, but exclude SaO2, SpO2, etc.
-        if 'EEG' in ch_upper and 'SAO' not in ch_upper and 'SPO' not in ch_upper:
-            eeg_candidates.append(ch)
-        # Match C3, C4 (central), F3, F4 (frontal), O1, O2 (occipital), etc.
-        elif any(pattern in ch_upper for pattern in ['C3', 'C4', 'F3', 'F4', 'O1-', 'O2-', 'CZ', 'FZ', 'PZ']):
-            eeg_candidates.append(ch)
-
-    # Remove duplicates and exclude EOG/EMG channels
-    eeg_channels = [ch for ch in eeg_candidates
-                    if ch not in eog_channels and ch not in emg_channels]
-
-    print(f"Identified channels:")
-    print(f"  EEG: {eeg_channels}")
-    print(f"  EOG: {eog_channels}")
-    print(f"  EMG: {emg_channels}")
+    channel_groups = _channel_plan(edf)['groups']
+    _print_channel_groups(channel_groups)
+    eeg_channels = channel_groups['eeg']
+    eog_channels = channel_groups['eog']
+    emg_channels = channel_groups['emg']
 
     # Extract data for each signal type
     multi_channel_data = {}
     sampling_rates = {}
 
-    if eeg_channels:
-        eeg_raw = raw.copy().pick(eeg_channels)
-        eeg_data, eeg_fs = _extract_epochs(eeg_raw, epoch_length, n_epochs)
-        multi_channel_data['eeg'] = eeg_data
-        sampling_rates['eeg'] = eeg_fs
-        print(f"  EEG: {eeg_data.shape[1]} channels, {eeg_data.shape[2]} samples/epoch, {eeg_fs} Hz")
-
-    if eog_channels:
-        eog_raw = raw.copy().pick(eog_channels)
-        eog_data, eog_fs = _extract_epochs(eog_raw, epoch_length, n_epochs)
-        multi_channel_data['eog'] = eog_data
-        sampling_rates['eog'] = eog_fs
-        print(f"  EOG: {eog_data.shape[1]} channels, {eog_data.shape[2]} samples/epoch, {eog_fs} Hz")
-
-    if emg_channels:
-        emg_raw = raw.copy().pick(emg_channels)
-        emg_data, emg_fs = _extract_epochs(emg_raw, epoch_length, n_epochs)
-        multi_channel_data['emg'] = emg_data
-        sampling_rates['emg'] = emg_fs
-        print(f"  EMG: {emg_data.shape[1]} channels, {emg_data.shape[2]} samples/epoch, {emg_fs} Hz")
+    for signal_type, channels in channel_groups.items():
+        if not channels:
+            continue
+        data, fs = _load_channel_group(edf, channels, epoch_length, n_epochs, dtype)
+        multi_channel_data[signal_type] = data
+        sampling_rates[signal_type] = fs
+        print(f"  {signal_type.upper()}: {data.shape[1]} channels, {data.shape[2]} samples/epoch, {fs} Hz")
 
     # Create record info
     record_info = {
@@ -232,29 +208,214 @@ def load_holdout_data(edf_file_path, epoch_length=30):
         'sampling_rates': sampling_rates,
         'epoch_length': epoch_length
     }
+    for signal_type in multi_channel_data:
+        record_info[f'{signal_type}_names'] = channel_groups[signal_type]
 
     print(f"Loaded {n_epochs} epochs ({n_epochs*epoch_length/3600:.2f} hours)")
 
+    if store_dir is not None:
+        save_to_store(store_dir, key, multi_channel_data, record_info)
+
     return multi_channel_data, record_info
 
 
-def _extract_epochs(raw, epoch_length, n_epochs):
+def stream_holdout_data(edf_file_path, block_epochs=256, epoch_length=30,
+                        dtype=None):
+    """
+    Stream an EDF recording as blocks of epochs, for bounded-memory processing.
+
+    Signals are decoded by the native memory-mapped reader one block at a
+    time, so memory use depends on block_epochs and not on the recording
+    length. Blocks can be fed to preprocess_stream() and
+    extract_features_stream().
+
+    Args:
+        edf_file_path (str): Path to the EDF file
+        block_epochs (int): Epochs per block (default 256); the last block
+            may be shorter
+        epoch_length (float): Epoch duration in seconds (default 30)
+        dtype: Signal dtype, e.g. np.float32 (default float64)
+
+    Yields:
+        tuple: (multi_channel_data, sampling_rates) where:
+            - multi_channel_data (dict): 'eeg', 'eog', 'emg' arrays of shape
+              (n_block_epochs, n_channels, samples_per_epoch)
+            - sampling_rates (dict): Sampling rate per signal type in Hz
+
+    Example:
+        >>> for block, rates in stream_holdout_data('H1.edf', block_epochs=120):
+        ...     print(block['eeg'].shape, rates['eeg'])
+    """
+    if not os.path.exists(edf_file_path):
+        raise FileNotFoundError(f"EDF file not found: {edf_file_path}")
+
+    dtype = np.dtype(dtype if dtype is not None else np.float64)
+    edf = _open_edf(edf_file_path, 'native')
+    n_epochs = int(edf['duration'] / epoch_length)
+    channel_groups = _channel_plan(edf)['groups']
+
+    print(f"Streaming {n_epochs} epochs from {edf_file_path} in blocks of {block_epochs}")
+
+    for start in range(0, n_epochs, block_epochs):
+        n = min(block_epochs, n_epochs - start)
+        multi_channel_data = {}
+        sampling_rates = {}
+        for signal_type, channels in channel_groups.items():
+            if not channels:
+                continue
+            data, fs = read_epochs(edf_file_path, channels, epoch_length, n, start=start,
+                                   dtype=dtype, header=edf['header'])
+            multi_channel_data[signal_type] = data
+            sampling_rates[signal_type] = fs
+        yield multi_channel_data, sampling_rates
+
+
+def _open_edf(edf_file_path, reader='selective'):
+    """
+    Open an EDF file for the given reader strategy.
+
+    Args:
+        edf_file_path (str): Path to the EDF file
+        reader (str): 'selective', 'native' or 'preload'
+
+    Returns:
+        dict: Opened recording with keys 'path', 'reader', 'ch_names',
+            'sampling_rates' (native rate per channel), 'duration'
+            (time of the last sample, in seconds) and either 'raw' (MNE
+            readers) or 'header' (native reader)
+    """
+    if reader not in ('selective', 'native', 'preload'):
+        raise ValueError(f"Unknown EDF reader: {reader}. Use 'selective', 'native' or 'preload'.")
+
+    edf = {'path': edf_file_path, 'reader': reader}
+
+    if reader == 'native':
+        header = read_edf_header(edf_file_path)
+        edf['header'] = header
+        edf['ch_names'] = header['labels']
+        edf['sampling_rates'] = header['sampling_rates'].tolist()
+        edf['duration'] = header['last_sample_time']
+    else:
+        raw = mne.io.read_raw_edf(edf_file_path, preload=(reader == 'preload'),
+                                  verbose=False)
+        edf['raw'] = raw
+        edf['ch_names'] = raw.ch_names
+        edf['sampling_rates'] = _mne_sampling_rates(raw, read_edf_header(edf_file_path))
+        edf['duration'] = raw.times[-1]
+
+    return edf
+
+
+def _mne_sampling_rates(raw, header):
+    """
+    Native sampling rate of every channel of an MNE EDF reader.
+
+    raw.info['sfreq'] is the single rate MNE resamples all channels to; the
+    per-channel rates come from the EDF header.
+
+    Args:
+        raw: mne.io.Raw from mne.io.read_raw_edf()
+        header (dict): Header of the same file from read_edf_header()
+
+    Returns:
+        list: Sampling rate in Hz per channel, in raw.ch_names order
+
+    Raises:
+        ValueError: If a channel of raw is not in the header.
+    """
+    # MNE keeps the header's signals in order, minus the EDF+ annotation signal
+    # (and renames duplicated labels), so the rates line up by position
+    rates = [float(fs) for label, fs in zip(header['labels'], header['sampling_rates'])
+             if label != 'EDF Annotations']
+    if len(rates) == len(raw.ch_names):
+        return rates
+
+    header_rates = dict(zip(header['labels'], header['sampling_rates']))
+    missing = [ch for ch in raw.ch_names if ch not in header_rates]
+    if missing:
+        raise ValueError(f"Channels {missing} are not in the EDF header")
+    return [float(header_rates[ch]) for ch in raw.ch_names]
+
+
+def _channel_plan(edf):
+    """
+    Resolve the channel plan of an opened recording (see channels.py).
+
+    Args:
+        edf (dict): Opened recording from _open_edf()
+
+    Returns:
+        dict: Plan with 'groups' (channel names per signal type) and
+            'sampling_rates' (Hz per signal type)
+    """
+    return resolve_channel_plan(edf['ch_names'], edf['sampling_rates'])
+
+
+def _print_channel_groups(channel_groups):
+    """Print identified channel groups."""
+    print(f"Identified channels:")
+    print(f"  EEG: {channel_groups['eeg']}")
+    print(f"  EOG: {channel_groups['eog']}")
+    print(f"  EMG: {channel_groups['emg']}")
+    if channel_groups.get('ref'):
+        print(f"  Reference electrodes: {channel_groups['ref']}")
+
+
+def _load_channel_group(edf, channels, epoch_length, n_epochs, dtype=None):
     """
-    Extract fixed-length epochs from continuous MNE Raw data.
+    Decode one channel group and segment it into epochs.
+
+    The 'selective' and 'native' readers only read the requested signals
+    from disk, straight into a single array; no copy of the full recording
+    is ever made.
 
     Args:
-        raw (mne.io.Raw): MNE Raw object
+        edf (dict): Opened recording from _open_edf()
+        channels (list): Channel names to load
         epoch_length (float): Epoch duration in seconds
         n_epochs (int): Number of epochs to extract
+        dtype: Signal dtype (default float64)
 
     Returns:
         tuple: (epochs_array, sampling_rate) where:
             - epochs_array: np.ndarray, shape (n_epochs, n_channels, samples_per_epoch)
             - sampling_rate: float, sampling frequency in Hz
     """
-    # Get data and sampling rate
-    data = raw.get_data()  # Shape: (n_channels, n_samples)
-    fs = raw.info['sfreq']
+    dtype = np.dtype(dtype if dtype is not None else np.float64)
+
+    if edf['reader'] == 'native':
+        return read_epochs(edf['path'], channels, epoch_length, n_epochs,
+                           dtype=dtype, header=edf['header'])
+
+    if edf['reader'] == 'selective':
+        # Re-open with only this group so MNE keeps the group's native rate
+        group_raw = mne.io.read_raw_edf(edf['path'], include=channels,
+                                        preload=False, verbose=False)
+        data = group_raw.get_data()
+        fs = group_raw.info['sfreq']
+    else:
+        data = edf['raw'].get_data(picks=channels)
+        fs = edf['raw'].info['sfreq']
+
+    # MNE always decodes to float64; convert once, before epoching
+    data = data.astype(dtype, copy=False)
+
+    return _extract_epochs(data, fs, epoch_length, n_epochs), fs
+
+
+def _extract_epochs(data, fs, epoch_length, n_epochs):
+    """
+    Segment continuous signal data into fixed-length epochs.
+
+    Args:
+        data (np.ndarray): Continuous data, shape (n_channels, n_samples)
+        fs (float): Sampling frequency in Hz
+        epoch_length (float): Epoch duration in seconds
+        n_epochs (int): Number of epochs to extract
+
+    Returns:
+        np.ndarray: Shape (n_epochs, n_channels, samples_per_epoch)
+    """
     n_channels = data.shape[0]
 
     # Calculate samples per epoch
@@ -275,7 +436,7 @@ def _extract_epochs(raw, epoch_length, n_epochs):
     epochs = data.reshape(n_channels, n_epochs, samples_per_epoch)
     epochs = np.transpose(epochs, (1, 0, 2))  # (n_epochs, n_channels, samples)
 
-    return epochs, fs
+    return epochs
 
 
 def _print_label_distribution(labels):
@@ -290,111 +451,319 @@ def _print_label_distribution(labels):
             print(f"  {stage_names[stage]}: {count} epochs ({pct:.1f}%)")
 
 
-def load_all_training_data(training_dir, epoch_length=30):
+def plan_training_data(training_dir, epoch_length=30, catalog_path=None):
     """
-    Load all training recordings from a directory.
+    Phase 1 of dataset assembly: scan a training directory without decoding signals.
+
+    The EDF headers are scanned by catalog.build_catalog(), and the XML
+    annotations are read for the epoch labels. The plan records how many
+    epochs each recording contributes, its labels, and the channel layout,
+    so assemble_training_data() can allocate the combined arrays once and
+    fill them in a single pass.
 
     Args:
         training_dir (str): Path to directory containing EDF and XML files
         epoch_length (float): Epoch duration in seconds (default 30)
+        catalog_path (str): JSON file caching the catalog, so unchanged
+            recordings are not scanned again (default None, no caching)
 
     Returns:
-        tuple: (all_data, all_labels, all_record_ids, channel_info) where:
-            - all_data (dict): Combined multi-channel data from all recordings
-            - all_labels (np.ndarray): Concatenated labels
-            - all_record_ids (np.ndarray): Record ID for each epoch
-            - channel_info (dict): Channel information (same across recordings)
+        dict: Dataset plan with keys:
+            - 'records': list of dicts ('record_id', 'edf_file', 'xml_file',
+              'n_epochs', 'labels', 'channel_groups'), in file order
+            - 'layout': dict per signal type with 'names', 'fs',
+              'n_channels' and 'samples_per_epoch' (from the first recording)
+            - 'total_epochs': int, epochs across all planned recordings
+            - 'epoch_length': float
 
     Example:
-        >>> data, labels, record_ids, info = load_all_training_data('data/training/')
-        >>> print(f"Total epochs: {len(labels)}")
-        >>> print(f"Unique recordings: {len(np.unique(record_ids))}")
+        >>> plan = plan_training_data('data/training/')
+        >>> print(f"{plan['total_epochs']} epochs in {len(plan['records'])} recordings")
     """
-    from glob import glob
-
-    print(f"Loading all training data from {training_dir}...")
-
-    # Find all EDF files
-    edf_files = sorted(glob(os.path.join(training_dir, '*.edf')))
+    catalog = build_catalog(training_dir, epoch_length, cache_path=catalog_path)
 
-    if not edf_files:
+    if not catalog:
         raise FileNotFoundError(f"No EDF files found in {training_dir}")
 
-    print(f"Found {len(edf_files)} recordings")
+    print(f"Found {len(catalog)} recordings")
 
-    # Initialize lists to store data from all recordings
-    all_eeg = []
-    all_eog = []
-    all_emg = []
-    all_labels = []
-    all_record_ids = []
-    channel_info = None
+    records = []
+    layout = None
 
-    # Load each recording
-    for edf_file in edf_files:
-        # Get corresponding XML file
-        xml_file = edf_file.replace('.edf', '.xml')
+    for record_id, entry in catalog.items():
+        edf_file, xml_file = entry['edf_file'], entry['xml_file']
 
-        if not os.path.exists(xml_file):
+        if xml_file is None:
             print(f"  WARNING: Skipping {edf_file} - no corresponding XML file")
             continue
 
-        # Extract record ID from filename
-        record_id = Path(edf_file).stem
+        n_epochs = entry['n_epochs']
+        try:
+            stages = parse_xml_annotations(xml_file)['stages']
+            labels = create_epoch_labels(stages, n_epochs * epoch_length, epoch_length)
+        except Exception as e:
+            print(f"  ERROR planning {record_id}: {e}")
+            continue
 
-        print(f"\nLoading {record_id}...")
+        channel_plan = resolve_channel_plan(entry['channels'],
+                                            [entry['sampling_rates'][ch] for ch in entry['channels']])
+        channel_groups = channel_plan['groups']
+        record_layout = {}
+        for signal_type, channels in channel_groups.items():
+            if not channels:
+                continue
+            fs = channel_plan['sampling_rates'][signal_type]
+            record_layout[signal_type] = {
+                'names': channels,
+                'fs': fs,
+                'n_channels': len(channels),
+                'samples_per_epoch': int(epoch_length * fs),
+            }
+
+        # All recordings must share the layout of the first one
+        if layout is None:
+            layout = record_layout
+        else:
+            shape = {k: (v['n_channels'], v['samples_per_epoch']) for k, v in record_layout.items()}
+            expected = {k: (v['n_channels'], v['samples_per_epoch']) for k, v in layout.items()}
+            if shape != expected:
+                print(f"  WARNING: Skipping {record_id} - channel layout {shape} does not match {expected}")
+                continue
+
+        records.append({
+            'record_id': record_id,
+            'edf_file': edf_file,
+            'xml_file': xml_file,
+            'n_epochs': n_epochs,
+            'labels': labels,
+            'channel_groups': channel_groups,
+        })
+
+    if not records:
+        raise ValueError(f"No usable recordings found in {training_dir}")
+
+    return {
+        'records': records,
+        'layout': layout,
+        'total_epochs': sum(r['n_epochs'] for r in records),
+        'epoch_length': epoch_length,
+    }
 
-        try:
-            # Load this recording
-            multi_channel_data, labels, info = load_training_data(
-                edf_file, xml_file, epoch_length
-            )
 
-            # Store channel info from first recording
-            if channel_info is None:
-                channel_info = info
+def assemble_training_data(plan, dtype=None, n_jobs=1, reader='selective',
+                           store_dir=None):
+    """
+    Phase 2 of dataset assembly: decode every planned recording into combined arrays.
 
-            # Append data
-            if 'eeg' in multi_channel_data:
-                all_eeg.append(multi_channel_data['eeg'])
-            if 'eog' in multi_channel_data:
-                all_eog.append(multi_channel_data['eog'])
-            if 'emg' in multi_channel_data:
-                all_emg.append(multi_channel_data['emg'])
+    One array per signal type is allocated up front (plus the labels and
+    record ID arrays) and each recording is written into its slice. With
+    the 'native' reader and n_jobs=1 signals are decoded directly into the
+    combined arrays; otherwise each recording is decoded once and copied
+    in, so peak memory stays at the dataset plus one recording instead of
+    twice the dataset.
 
-            all_labels.append(labels)
+    With n_jobs > 1 recordings are decoded by a pool of worker processes and
+    sent back to be copied in, in plan order. At most n_jobs recordings are
+    in flight at a time, so peak memory is the dataset plus about n_jobs
+    decoded recordings (each also briefly held in its pickled form).
 
-            # Track record ID for each epoch
-            all_record_ids.extend([record_id] * len(labels))
+    Args:
+        plan (dict): Plan from plan_training_data()
+        dtype: Output dtype, e.g. np.float32 (default float64)
+        n_jobs (int): Number of worker processes (default 1, sequential)
+        reader (str): 'selective' or 'native', see load_training_data()
+        store_dir (str): Epoch store directory (default None, no store),
+            see load_training_data()
 
-        except Exception as e:
-            print(f"  ERROR loading {record_id}: {e}")
-            continue
+    Returns:
+        tuple: (all_data, all_labels, all_record_ids, channel_info), same
+            as load_all_training_data()
+    """
+    from concurrent.futures import ProcessPoolExecutor
 
-    # Concatenate all recordings
-    combined_data = {}
+    if reader not in ('selective', 'native'):
+        raise ValueError(f"Dataset assembly needs a per-group reader ('selective' or 'native'), got {reader}")
 
-    if all_eeg:
-        combined_data['eeg'] = np.concatenate(all_eeg, axis=0)
-        print(f"\nCombined EEG shape: {combined_data['eeg'].shape}")
+    dtype = np.dtype(dtype if dtype is not None else np.float64)
+    records = plan['records']
+    total_epochs = plan['total_epochs']
 
-    if all_eog:
-        combined_data['eog'] = np.concatenate(all_eog, axis=0)
-        print(f"Combined EOG shape: {combined_data['eog'].shape}")
+    combined_data = {
+        signal_type: np.empty((total_epochs, group['n_channels'], group['samples_per_epoch']), dtype=dtype)
+        for signal_type, group in plan['layout'].items()
+    }
+    combined_labels = np.empty(total_epochs, dtype=records[0]['labels'].dtype)
+    id_length = max(len(r['record_id']) for r in records)
+    combined_record_ids = np.empty(total_epochs, dtype=f'<U{id_length}')
 
-    if all_emg:
-        combined_data['emg'] = np.concatenate(all_emg, axis=0)
-        print(f"Combined EMG shape: {combined_data['emg'].shape}")
+    tasks = [{'record': r, 'epoch_length': plan['epoch_length'], 'reader': reader,
+              'dtype': dtype, 'store_dir': store_dir} for r in records]
 
-    combined_labels = np.concatenate(all_labels, axis=0)
-    combined_record_ids = np.array(all_record_ids)
+    n_loaded = 0
+    cursor = 0
 
-    print(f"\nTotal loaded: {len(combined_labels)} epochs from {len(edf_files)} recordings")
+    if n_jobs > 1 and len(tasks) > 1:
+        print(f"Loading {len(tasks)} recordings with {n_jobs} worker processes")
+        executor = ProcessPoolExecutor(max_workers=n_jobs)
+    else:
+        # Sequential decoding writes straight into the combined arrays
+        executor = None
+    in_flight = deque()
+
+    try:
+        for i, record in enumerate(records):
+            n = record['n_epochs']
+            out = {k: v[cursor:cursor + n] for k, v in combined_data.items()}
+
+            if executor is None:
+                record_id, _, error = _decode_record(tasks[i], out)
+            else:
+                # Keep n_jobs recordings in flight: finished ones cannot pile up
+                # while an earlier recording is still decoding
+                while len(in_flight) < n_jobs and i + len(in_flight) < len(tasks):
+                    in_flight.append(executor.submit(_decode_record, tasks[i + len(in_flight)]))
+                # Results are taken in plan order regardless of which worker finishes first
+                record_id, multi_channel_data, error = in_flight.popleft().result()
+                if error is None:
+                    for signal_type, data in multi_channel_data.items():
+                        out[signal_type][...] = data
+                    del multi_channel_data
+
+            if error is not None:
+                print(f"  ERROR loading {record_id}: {error}")
+                continue
+
+            combined_labels[cursor:cursor + n] = record['labels']
+            combined_record_ids[cursor:cursor + n] = record_id
+            cursor += n
+            n_loaded += 1
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    if n_loaded == 0:
+        raise ValueError("No recordings could be loaded")
+
+    # Drop space reserved for recordings that failed to load (views, no copy)
+    combined_data = {k: v[:cursor] for k, v in combined_data.items()}
+    combined_labels = combined_labels[:cursor]
+    combined_record_ids = combined_record_ids[:cursor]
+
+    channel_info = {'epoch_length': plan['epoch_length']}
+    for signal_type, group in plan['layout'].items():
+        channel_info[f'{signal_type}_names'] = group['names']
+        channel_info[f'{signal_type}_fs'] = group['fs']
+
+    for signal_type, data in combined_data.items():
+        print(f"Combined {signal_type.upper()} shape: {data.shape}")
+
+    print(f"\nTotal loaded: {len(combined_labels)} epochs from {n_loaded} recordings")
     _print_label_distribution(combined_labels)
 
     return combined_data, combined_labels, combined_record_ids, channel_info
 
 
+def _decode_record(task, out=None):
+    """
+    Decode the signals of one planned recording; runs in worker processes.
+
+    Args:
+        task (dict): 'record' (an entry of plan['records']), 'epoch_length',
+            'reader', 'dtype' and 'store_dir' (None to bypass the epoch store)
+        out (dict): Optional arrays per signal type to decode into
+
+    Returns:
+        tuple: (record_id, multi_channel_data, error), where error is None
+            on success and a message otherwise
+    """
+    record = task['record']
+    record_id = record['record_id']
+    epoch_length = task['epoch_length']
+    reader = task['reader']
+    dtype = task['dtype']
+    store_dir = task['store_dir']
+    print(f"\nLoading {record_id}...")
+
+    try:
+        if store_dir is not None:
+            key = store_key(record['edf_file'], record['xml_file'], epoch_length, dtype, reader)
+            stored = load_from_store(store_dir, key)
+            if stored is not None:
+                multi_channel_data = stored[0]
+                if out is not None:
+                    for signal_type, data in multi_channel_data.items():
+                        out[signal_type][...] = data
+                print(f"  Loaded {record_id} from epoch store")
+                return record_id, multi_channel_data, None
+
+        edf = _open_edf(record['edf_file'], reader)
+        multi_channel_data = {}
+        channel_info = {'epoch_length': epoch_length}
+        for signal_type, channels in record['channel_groups'].items():
+            if not channels:
+                continue
+            target = out[signal_type] if out is not None else None
+
+            if reader == 'native':
+                data, fs = read_epochs(record['edf_file'], channels, epoch_length, record['n_epochs'],
+                                       dtype=dtype, out=target, header=edf['header'])
+            else:
+                data, fs = _load_channel_group(edf, channels, epoch_length, record['n_epochs'], dtype)
+                if target is not None:
+                    target[...] = data
+                    data = target
+
+            multi_channel_data[signal_type] = data
+            channel_info[f'{signal_type}_names'] = channels
+            channel_info[f'{signal_type}_fs'] = fs
+
+        if store_dir is not None:
+            save_to_store(store_dir, key, multi_channel_data, channel_info, record['labels'])
+    except Exception as e:
+        return record_id, None, str(e)
+
+    return record_id, multi_channel_data, None
+
+
+def load_all_training_data(training_dir, epoch_length=30, n_jobs=1,
+                           reader='selective', dtype=None, store_dir=None, catalog_path=None):
+    """
+    Load all training recordings from a directory.
+
+    This is plan_training_data() followed by assemble_training_data(): epoch
+    counts come from the EDF headers and XML files, and each recording is
+    written into combined arrays that are allocated once.
+
+    Args:
+        training_dir (str): Path to directory containing EDF and XML files
+        epoch_length (float): Epoch duration in seconds (default 30)
+        n_jobs (int): Number of worker processes (default 1, sequential)
+        reader (str): 'selective' or 'native', see load_training_data()
+        dtype: Output dtype, e.g. np.float32 (default float64)
+        store_dir (str): Epoch store directory (default None, no store),
+            see load_training_data()
+        catalog_path (str): Catalog cache file (default None, no caching),
+            see plan_training_data()
+
+    Returns:
+        tuple: (all_data, all_labels, all_record_ids, channel_info) where:
+            - all_data (dict): Combined multi-channel data from all recordings
+            - all_labels (np.ndarray): Concatenated labels
+            - all_record_ids (np.ndarray): Record ID for each epoch
+            - channel_info (dict): Channel information (same across recordings)
+
+    Example:
+        >>> data, labels, record_ids, info = load_all_training_data('data/training/', n_jobs=4)
+        >>> print(f"Total epochs: {len(labels)}")
+        >>> print(f"Unique recordings: {len(np.unique(record_ids))}")
+    """
+    print(f"Loading all training data from {training_dir}...")
+
+    plan = plan_training_data(training_dir, epoch_length, catalog_path)
+    return assemble_training_data(plan, dtype=dtype, n_jobs=n_jobs, reader=reader,
+                                  store_dir=store_dir)
+
+
 if __name__ == '__main__':
     # Example usage
     import sys
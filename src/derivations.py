@@ -0,0 +1,202 @@
+"""
+EEG Derivations
+
+Builds the EEG derivations the pipeline works on from whatever channels a
+recording provides, so cohorts with different montages feed the same
+feature code. A derivation is written as active electrode minus reference:
+
+    'C4'               the channel as recorded
+    'C4-M1'            bipolar (e.g. contralateral mastoid)
+    'C3-(M1+M2)/2'     linked mastoids: minus the mean of several electrodes
+
+Electrode names are matched against the recorded labels either exactly or
+after stripping an 'EEG' prefix and a '-REF' suffix ('EEG C3-REF' -> 'C3'),
+ignoring case.
+
+All derivations form one mixing matrix of shape (n_derivations,
+n_channels), zero except for the electrodes each derivation uses. It is
+applied to the whole (n_epochs, n_channels, samples) tensor with a single
+batched matmul, without per-channel loops or a transposed copy of the data.
+"""
+
+import re
+import numpy as np
+
+# Reference side written as a mean of electrodes: (M1+M2)/2
+MEAN_REFERENCE_RULE = re.compile(r'^\((.+)\)\s*/\s*(\d+)$')
+
+# Recording-system decorations around an electrode name: 'EEG C3-REF' -> 'C3'
+ELECTRODE_PREFIX_RULE = re.compile(r'^EEG[\s_]*')
+ELECTRODE_SUFFIX_RULE = re.compile(r'[\s_-]*REF$')
+
+
+def derivation_matrix(derivations, channel_names, dtype=np.float64):
+    """
+    Build the mixing matrix of a list of derivations.
+
+    Args:
+        derivations (list): Derivation strings, see the module docstring
+        channel_names (list): Recorded channel labels, in array order
+        dtype: dtype of the matrix (default float64)
+
+    Returns:
+        np.ndarray: Matrix of shape (len(derivations), len(channel_names));
+            row i holds the weight of every recorded channel in derivation i
+
+    Raises:
+        ValueError: If a derivation is malformed or names an electrode that
+            is missing from (or ambiguous in) channel_names.
+
+    Example:
+        >>> derivation_matrix(['C3-(M1+M2)/2'], ['C3', 'M1', 'M2'])
+        array([[ 1. , -0.5, -0.5]])
+    """
+    matrix = np.zeros((len(derivations), len(channel_names)), dtype=dtype)
+    for row, derivation in enumerate(derivations):
+        for electrode, weight in _parse_derivation(derivation, channel_names).items():
+            matrix[row, _channel_index(electrode, channel_names)] += weight
+    return matrix
+
+
+def apply_derivations(data, matrix, out=None):
+    """
+    Mix recorded channels into derivations.
+
+    Args:
+        data (np.ndarray): Epochs, shape (n_epochs, n_channels, samples)
+        matrix (np.ndarray): Mixing matrix from derivation_matrix()
+        out (np.ndarray): Optional output of shape (n_epochs, n_derivations, samples)
+
+    Returns:
+        np.ndarray: Derived epochs, shape (n_epochs, n_derivations, samples),
+            in the dtype of `data` (float32 stays float32)
+    """
+    dtype = np.result_type(data, np.float32)
+    return np.matmul(matrix.astype(dtype, copy=False), data, out=out)
+
+
+def derive_channels(data, channel_names, derivations, out=None):
+    """
+    Compute derivations from recorded channels.
+
+    Args:
+        data (np.ndarray): Epochs, shape (n_epochs, n_channels, samples)
+        channel_names (list): Recorded channel labels, in array order
+        derivations (list): Derivation strings, see the module docstring
+        out (np.ndarray): Optional output array, see apply_derivations()
+
+    Returns:
+        tuple: (derived, names) with derived of shape
+            (n_epochs, len(derivations), samples) and names the derivation
+            strings
+
+    Example:
+        >>> eeg, names = derive_channels(data['eeg'], channel_info['eeg_names'],
+        ...                              ['C4-M1', 'C3-M2'])
+    """
+    matrix = derivation_matrix(derivations, channel_names)
+    return apply_derivations(data, matrix, out), list(derivations)
+
+
+def derive_eeg(multi_channel_data, channel_info, derivations):
+    """
+    Replace the recorded EEG of loaded data by derivations.
+
+    Training (main.py) and inference (run_inference.py) both pass the loaders'
+    output through this function, so a model always sees the same EEG
+    derivations, in the same order, as it was trained on.
+
+    Reference electrodes recorded on their own (the loaders' 'ref' group, see
+    channels.py) are only used here, as inputs to the derivations; they are
+    never part of the returned data, with or without derivations.
+
+    Args:
+        multi_channel_data (dict): Arrays per signal type from the loaders
+        channel_info (dict): channel_info from the training loaders or
+            record_info from load_holdout_data() ('eeg_names', 'ref_names')
+        derivations (list): Derivation strings, see the module docstring
+            (config.EEG_DERIVATIONS); None or empty keeps the recorded EEG
+
+    Returns:
+        tuple: (multi_channel_data, eeg_names) where multi_channel_data is a
+            new dict without 'ref' whose 'eeg' holds the derivations (the
+            other signal types are shared with the input) and eeg_names
+            labels its channels
+
+    Raises:
+        ValueError: If a derivation cannot be built from the recorded
+            channels, or uses reference electrodes sampled at another rate
+            than the EEG.
+
+    Example:
+        >>> data, eeg_names = derive_eeg(*load_holdout_data('H1.edf'), config.EEG_DERIVATIONS)
+    """
+    data = {k: v for k, v in multi_channel_data.items() if k != 'ref'}
+    eeg = multi_channel_data['eeg']
+    names = list(channel_info['eeg_names'])
+    if not derivations:
+        return data, names
+
+    reference = multi_channel_data.get('ref')
+    reference_names = list(channel_info.get('ref_names', [])) if reference is not None else []
+    matrix = derivation_matrix(derivations, names + reference_names)
+    eeg_matrix, reference_matrix = matrix[:, :len(names)], matrix[:, len(names):]
+
+    derived = apply_derivations(eeg, eeg_matrix)
+    if reference_matrix.any():
+        if reference.shape[-1] != eeg.shape[-1]:
+            raise ValueError(f"Reference electrodes have {reference.shape[-1]} samples per epoch, "
+                             f"the EEG {eeg.shape[-1]}; derivations need both at the same rate")
+        derived += apply_derivations(reference, reference_matrix)
+
+    data['eeg'] = derived
+    return data, list(derivations)
+
+
+def _parse_derivation(derivation, channel_names):
+    """{electrode: weight} of one derivation string."""
+    # A recorded label (which may itself contain '-') is taken as is
+    if _find_channels(derivation, channel_names):
+        return {derivation: 1.0}
+
+    active, sep, reference = derivation.partition('-')
+    active, reference = active.strip(), reference.strip()
+    if not active or (sep and not reference):
+        raise ValueError(f"Malformed derivation: {derivation}")
+
+    weights = {active: 1.0}
+    if not sep:
+        return weights
+
+    mean = MEAN_REFERENCE_RULE.match(reference)
+    electrodes = [e.strip() for e in mean.group(1).split('+')] if mean else [reference]
+    count = int(mean.group(2)) if mean else 1
+    if count != len(electrodes) or not all(electrodes):
+        raise ValueError(f"Malformed reference in derivation {derivation}: {reference}")
+    for electrode in electrodes:
+        weights[electrode] = weights.get(electrode, 0.0) - 1.0 / count
+    return weights
+
+
+def _channel_index(electrode, channel_names):
+    """Index of the recorded channel of an electrode."""
+    matches = _find_channels(electrode, channel_names)
+    if len(matches) != 1:
+        problem = 'not found' if not matches else 'ambiguous'
+        raise ValueError(f"Electrode {electrode} {problem} in channels {list(channel_names)}")
+    return matches[0]
+
+
+def _find_channels(electrode, channel_names):
+    """Indices of recorded channels that match an electrode name."""
+    exact = [i for i, name in enumerate(channel_names) if name.upper() == electrode.upper()]
+    if exact:
+        return exact
+    key = _electrode_name(electrode)
+    return [i for i, name in enumerate(channel_names) if _electrode_name(name) == key]
+
+
+def _electrode_name(label):
+    """Electrode part of a channel label, upper case."""
+    name = ELECTRODE_PREFIX_RULE.sub('', label.strip().upper())
+    return ELECTRODE_SUFFIX_RULE.sub('', name)
@@ -0,0 +1,127 @@
+"""
+Epoch Store
+
+Persistent on-disk store of decoded recordings. Each recording is converted
+once into a directory of raw .npy arrays (one per signal type, plus labels)
+and a channel_info.json file. Later runs open the arrays with
+np.load(mmap_mode='r'), so nothing is decoded again and pages are only read
+when they are used.
+
+Entries are keyed by a hash of the EDF (and XML) file contents together with
+the loading parameters, so editing or replacing a file, or changing the
+epoch length, never returns stale data.
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import numpy as np
+
+# Stored arrays: the signal types plus the reference electrodes (channels.REFERENCE_GROUP)
+SIGNAL_TYPES = ('eeg', 'eog', 'emg', 'ref')
+
+# Bumped when the channel grouping changes, so entries decoded with an older
+# grouping are never returned
+STORE_VERSION = 2
+
+
+def store_key(edf_file_path, xml_file_path=None, epoch_length=30, dtype=np.float64,
+              reader='selective'):
+    """
+    Compute the store key for a recording.
+
+    Args:
+        edf_file_path (str): Path to the EDF file
+        xml_file_path (str): Path to the XML annotation file (None for holdout data)
+        epoch_length (float): Epoch duration in seconds
+        dtype: Signal dtype of the stored arrays
+        reader (str): EDF reading strategy used to decode the recording
+
+    Returns:
+        str: Hex digest identifying the recording and loading parameters
+    """
+    digest = hashlib.sha256()
+    for path in (edf_file_path, xml_file_path):
+        if path is None:
+            digest.update(b'<none>')
+            continue
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    params = (f'epoch_length={float(epoch_length)};dtype={np.dtype(dtype).str};reader={reader};'
+              f'version={STORE_VERSION}')
+    digest.update(params.encode('ascii'))
+    return digest.hexdigest()
+
+
+def load_from_store(store_dir, key):
+    """
+    Open a stored recording.
+
+    Args:
+        store_dir (str): Root directory of the store
+        key (str): Key from store_key()
+
+    Returns:
+        tuple or None: (multi_channel_data, labels, info) with memory-mapped
+            read-only arrays (labels is None for holdout recordings), or
+            None if the recording is not in the store
+    """
+    entry_dir = os.path.join(store_dir, key)
+    info_path = os.path.join(entry_dir, 'channel_info.json')
+    if not os.path.exists(info_path):
+        return None
+
+    with open(info_path) as f:
+        info = json.load(f)
+
+    multi_channel_data = {}
+    for signal_type in SIGNAL_TYPES:
+        path = os.path.join(entry_dir, f'{signal_type}.npy')
+        if os.path.exists(path):
+            multi_channel_data[signal_type] = np.load(path, mmap_mode='r')
+
+    labels_path = os.path.join(entry_dir, 'labels.npy')
+    labels = np.load(labels_path) if os.path.exists(labels_path) else None
+
+    return multi_channel_data, labels, info
+
+
+def save_to_store(store_dir, key, multi_channel_data, info, labels=None):
+    """
+    Write a decoded recording to the store.
+
+    The entry is written to a temporary directory and renamed into place, so
+    an interrupted run never leaves a partial entry behind.
+
+    Args:
+        store_dir (str): Root directory of the store
+        key (str): Key from store_key()
+        multi_channel_data (dict): Arrays per signal type
+        info (dict): JSON-serializable channel/record information
+        labels (np.ndarray): Epoch labels (None for holdout recordings)
+    """
+    entry_dir = os.path.join(store_dir, key)
+    if os.path.exists(entry_dir):
+        return
+
+    os.makedirs(store_dir, exist_ok=True)
+    tmp_dir = f'{entry_dir}.tmp-{os.getpid()}'
+    os.makedirs(tmp_dir, exist_ok=True)
+
+    try:
+        for signal_type, data in multi_channel_data.items():
+            np.save(os.path.join(tmp_dir, f'{signal_type}.npy'), data)
+        if labels is not None:
+            np.save(os.path.join(tmp_dir, 'labels.npy'), labels)
+        with open(os.path.join(tmp_dir, 'channel_info.json'), 'w') as f:
+            json.dump(info, f, indent=2)
+        try:
+            os.rename(tmp_dir, entry_dir)
+        except OSError:
+            # Another process stored the same recording first
+            if not os.path.exists(entry_dir):
+                raise
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
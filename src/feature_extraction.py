@@ -1,15 +1,117 @@
 import numpy as np
-import scipy
+
+# Handle both package import and standalone execution
+try:
+    from .utils import get_signal_dtype
+except ImportError:
+    from utils import get_signal_dtype
+
+# Time-domain features, in feature-matrix column order
+TIME_DOMAIN_FEATURES = ('mean', 'median', 'std', 'variance', 'rms', 'min', 'max', 'range',
+                        'skewness', 'kurtosis', 'zero_crossings', 'hjorth_activity',
+                        'hjorth_mobility', 'hjorth_complexity', 'total_energy', 'mean_power')
+
+# Subsets used for the EOG and EMG channels
+EOG_FEATURES = ('mean', 'std', 'range')
+EMG_FEATURES = ('mean', 'std', 'rms')
+
+# Epochs processed per step; bounds the float64 temporaries
+CHUNK_EPOCHS = 256
+
+# How each statistic is computed from a (..., samples) float64 block. `get`
+# returns other statistics of the same block, each computed at most once.
+_STATISTICS = {
+    'mean': lambda x, get: x.mean(axis=-1),
+    'median': lambda x, get: np.median(x, axis=-1),
+    'centered': lambda x, get: x - get('mean')[..., None],
+    'centered_squared': lambda x, get: np.square(get('centered')),
+    'variance': lambda x, get: get('centered_squared').mean(axis=-1),
+    'std': lambda x, get: np.sqrt(get('variance')),
+    'mean_power': lambda x, get: np.square(x).mean(axis=-1),
+    'rms': lambda x, get: np.sqrt(get('mean_power')),
+    'total_energy': lambda x, get: get('mean_power') * x.shape[-1],
+    'min': lambda x, get: x.min(axis=-1),
+    'max': lambda x, get: x.max(axis=-1),
+    'range': lambda x, get: get('max') - get('min'),
+    # Biased moment ratios, as scipy.stats.skew / kurtosis (Fisher) by default;
+    # products instead of ** 3 / ** 4, which go through the much slower pow()
+    'skewness': lambda x, get: ((get('centered_squared') * get('centered')).mean(axis=-1)
+                                / get('variance') ** 1.5),
+    'kurtosis': lambda x, get: (np.square(get('centered_squared')).mean(axis=-1)
+                                / np.square(get('variance')) - 3),
+    'zero_crossings': lambda x, get: np.count_nonzero(np.diff(np.sign(x), axis=-1), axis=-1),
+    'hjorth_activity': lambda x, get: get('variance'),
+    'diff_variance': lambda x, get: np.var(np.diff(x, axis=-1), axis=-1),
+    'diff2_variance': lambda x, get: np.var(np.diff(x, 2, axis=-1), axis=-1),
+    'hjorth_mobility': lambda x, get: np.sqrt(get('diff_variance') / get('variance')),
+    # mobility(y') / mobility(y)
+    'hjorth_complexity': lambda x, get: np.sqrt(get('diff2_variance') / get('diff_variance')) / get('hjorth_mobility'),
+}
+
+
+def time_domain_features(data, names=TIME_DOMAIN_FEATURES, out=None):
+    """
+    Compute time-domain features of every epoch and channel at once.
+
+    The statistics are computed along the sample axis of whole chunks of
+    epochs (in float64), and intermediate results such as the centered
+    signal or the variance are shared between the features that need them.
+
+    Args:
+        data (np.ndarray): Signal of shape (..., samples), e.g. one epoch,
+            (n_epochs, samples) or (n_epochs, n_channels, samples)
+        names (tuple): Features to compute, from TIME_DOMAIN_FEATURES
+            (default: all of them)
+        out (np.ndarray): Optional output of shape data.shape[:-1] + (len(names),),
+            e.g. a view into a preallocated feature matrix
+
+    Returns:
+        np.ndarray: Features of shape data.shape[:-1] + (len(names),). Flat
+            epochs give NaN for the ratio features (skewness, kurtosis,
+            Hjorth mobility and complexity).
+
+    Example:
+        >>> features = time_domain_features(data['eeg'])   # (n_epochs, 2, 16)
+        >>> features[..., TIME_DOMAIN_FEATURES.index('std')]
+    """
+    unknown = [name for name in names if name not in TIME_DOMAIN_FEATURES]
+    if unknown:
+        raise ValueError(f"Unknown time-domain features: {unknown}. Must be in {TIME_DOMAIN_FEATURES}.")
+
+    if out is None:
+        out = np.empty(data.shape[:-1] + (len(names),), dtype=np.result_type(data, np.float32))
+    if data.ndim == 1:
+        _time_domain_block(data, names, out)
+        return out
+
+    for start in range(0, len(data), CHUNK_EPOCHS):
+        _time_domain_block(data[start:start + CHUNK_EPOCHS], names, out[start:start + CHUNK_EPOCHS])
+    return out
+
+
+def _time_domain_block(block, names, out):
+    """Write the named features of one block of epochs into out[..., i]."""
+    x = np.asarray(block, dtype=np.float64)
+    computed = {}
+
+    def get(name):
+        if name not in computed:
+            computed[name] = _STATISTICS[name](x, get)
+        return computed[name]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for i, name in enumerate(names):
+            out[..., i] = get(name)
+
 
 def extract_time_domain_features(epoch):
     """
     EXAMPLE: Extract basic time-domain features from a single epoch.
 
-    This is a MINIMAL example with only 3 features.
-    Students must implement the remaining 13+ time-domain features.
-
     Works for any signal type (EEG, EOG, EMG) but students should consider
-    signal-specific features for optimal performance.
+    signal-specific features for optimal performance. To add a feature, add
+    it to TIME_DOMAIN_FEATURES and _STATISTICS; the batched extraction in
+    time_domain_features() then computes it for every epoch at once.
 
     Args:
         epoch (np.ndarray): A 1D array representing one epoch of signal data.
@@ -17,28 +119,8 @@ def extract_time_domain_features(epoch):
     Returns:
         dict: A dictionary of features.
     """
-    # TODO: Current feature set for time-domain only, need to implement more features
-    features = {
-        'mean': np.mean(epoch),
-        'median': np.median(epoch),
-        'std': np.std(epoch),
-        'variance': np.var(epoch),
-        'rms': np.sqrt(np.mean(epoch**2)),
-        'min': np.min(epoch),
-        'max': np.max(epoch),
-        'range': np.max(epoch) - np.min(epoch),
-        'skewness': scipy.stats.skew(epoch),
-        'kurtosis': scipy.stats.kurtosis(epoch),
-        'zero_crossings': np.sum(np.diff(np.sign(epoch)) != 0),
-        'hjorth_activity': np.var(epoch),
-        'hjorth_mobility': np.sqrt(np.var(np.diff(epoch)) / np.var(epoch)),
-        # This looks horrible but the formula is mobility(y')/mobility(y)
-        'hjorth_complexity': (np.sqrt(np.var(np.diff(epoch, 2)) / np.var(np.diff(epoch))))/(np.sqrt(np.var(np.diff(epoch)) / np.var(epoch))),
-        'total_energy': np.sum(epoch**2),
-        'mean_power': np.mean(epoch**2),
-    }
-
-    return features
+    return dict(zip(TIME_DOMAIN_FEATURES, time_domain_features(np.asarray(epoch),
+                                                          out=np.empty(len(TIME_DOMAIN_FEATURES)))))
 
 def extract_features(data, config):
     """
@@ -57,13 +139,21 @@ def extract_features(data, config):
         config (module): The configuration module.
 
     Returns:
-        np.ndarray: A 2D array of features (n_epochs, n_features).
+        np.ndarray: A 2D array of features (n_epochs, n_features), in the
+            configured signal dtype (config.SIGNAL_DTYPE).
     """
     print(f"Extracting features for iteration {config.CURRENT_ITERATION}...")
 
     # Detect if we have multi-channel data structure
     is_multi_channel = isinstance(data, dict) and 'eeg' in data
 
+    # Work in the configured signal dtype (no copy if it already matches)
+    dtype = get_signal_dtype(config)
+    if is_multi_channel:
+        data = {signal_type: signal.astype(dtype, copy=False) for signal_type, signal in data.items()}
+    else:
+        data = np.asarray(data).astype(dtype, copy=False)
+
     if is_multi_channel:
         print("Processing multi-channel data (EEG + EOG + EMG)")
         return extract_multi_channel_features(data, config)
@@ -72,39 +162,53 @@ def extract_features(data, config):
         return extract_single_channel_features(data, config)
 
 
-def extract_multi_channel_features(multi_channel_data, config):
+def extract_features_stream(blocks, config):
     """
-    Extract features from multi-channel data: 2 EEG + 2 EOG + 1 EMG channels.
+    Extract features from a stream of epoch blocks, one block at a time.
 
-    Students should expand this significantly!
-    """
-    n_epochs = multi_channel_data['eeg'].shape[0]
-    all_features = []
+    Only one block of signal data is held in memory; the (much smaller)
+    feature rows of each block are collected into the final matrix.
 
-    for epoch_idx in range(n_epochs):
-        epoch_features = []
+    Args:
+        blocks (iterable): (multi_channel_data, sampling_rates) tuples, e.g.
+            from preprocessing.preprocess_stream()
+        config (module): The configuration module.
 
-        # EEG features (2 channels)
-        for ch in range(multi_channel_data['eeg'].shape[1]):
-            eeg_signal = multi_channel_data['eeg'][epoch_idx, ch, :]
-            eeg_features = extract_time_domain_features(eeg_signal)
-            epoch_features.extend(list(eeg_features.values()))
+    Returns:
+        np.ndarray: A 2D array of features (n_epochs, n_features).
+    """
+    block_features = [extract_features(block, config) for block, _ in blocks]
 
-        if config.CURRENT_ITERATION >= 3:
-            # Add EOG features (2 channels)
-            for ch in range(multi_channel_data['eog'].shape[1]):
-                eog_signal = multi_channel_data['eog'][epoch_idx, ch, :]
-                eog_features = extract_eog_features(eog_signal)
-                epoch_features.extend(list(eog_features.values()))
+    if not block_features:
+        return np.zeros((0, 0), dtype=get_signal_dtype(config))
 
-            # Add EMG features (1 channel)
-            emg_signal = multi_channel_data['emg'][epoch_idx, 0, :]
-            emg_features = extract_emg_features(emg_signal)
-            epoch_features.extend(list(emg_features.values()))
+    return np.concatenate(block_features, axis=0)
 
-        all_features.append(epoch_features)
 
-    features = np.array(all_features)
+def extract_multi_channel_features(multi_channel_data, config):
+    """
+    Extract features from multi-channel data: 2 EEG + 2 EOG + 1 EMG channels.
+
+    Students should expand this significantly!
+    """
+    eeg = multi_channel_data['eeg']
+    n_epochs = eeg.shape[0]
+
+    # (signal, feature names) blocks, in column order: per channel, its features
+    blocks = [(eeg, TIME_DOMAIN_FEATURES)]
+    if config.CURRENT_ITERATION >= 3:
+        blocks.append((multi_channel_data['eog'], EOG_FEATURES))       # EOG features (2 channels)
+        blocks.append((multi_channel_data['emg'][:, :1], EMG_FEATURES))  # EMG features (1 channel)
+
+    # Every block writes straight into its columns of one preallocated matrix
+    n_features = sum(signal.shape[1] * len(names) for signal, names in blocks)
+    features = np.empty((n_epochs, n_features), dtype=get_signal_dtype(config))
+    column = 0
+    for signal, names in blocks:
+        width = signal.shape[1] * len(names)
+        target = features[:, column:column + width].reshape(n_epochs, signal.shape[1], len(names))
+        time_domain_features(signal, names, out=target)
+        column += width
 
     if config.CURRENT_ITERATION == 1:
         expected = 2 * 3  # 2 EEG channels × 3 features each
@@ -123,11 +227,8 @@ def extract_single_channel_features(data, config):
     if config.CURRENT_ITERATION == 1:
         # Iteration 1: Time-domain features (TARGET: 16 features)
         # CURRENT: Only 3 features implemented - students must add 13 more!
-        all_features = []
-        for epoch in data:
-            features = extract_time_domain_features(epoch)
-            all_features.append(list(features.values()))
-        features = np.array(all_features)
+        features = time_domain_features(data, out=np.empty((len(data), len(TIME_DOMAIN_FEATURES)),
+                                                           dtype=get_signal_dtype(config)))
 
         print(f"WARNING: Only {features.shape[1]} features extracted, target is 16 for iteration 1")
         print("Students must implement the remaining time-domain features!")
@@ -137,13 +238,13 @@ def extract_single_channel_features(data, config):
         print("TODO: Students must implement frequency-domain feature extraction")
         print("Target: ~31 features (time + frequency domain)")
         n_epochs = data.shape[0] if len(data.shape) > 1 else 1
-        features = np.zeros((n_epochs, 0))  # Empty features - students must implement
+        features = np.zeros((n_epochs, 0), dtype=get_signal_dtype(config))  # Empty features - students must implement
 
     elif config.CURRENT_ITERATION >= 3:
         # TODO: Students must implement multi-signal features
         print("TODO: Students should use multi-channel data format for iteration 3+")
         n_epochs = data.shape[0] if len(data.shape) > 1 else 1
-        features = np.zeros((n_epochs, 0))  # Empty features - students must implement
+        features = np.zeros((n_epochs, 0), dtype=get_signal_dtype(config))  # Empty features - students must implement
 
     else:
         raise ValueError(f"Invalid iteration: {config.CURRENT_ITERATION}")
@@ -160,11 +261,8 @@ def extract_eog_features(eog_signal):
     - Slow eye movements
     - Eye blinks and artifacts
     """
-    features = {
-        'eog_mean': np.mean(eog_signal),
-        'eog_std': np.std(eog_signal),
-        'eog_range': np.max(eog_signal) - np.min(eog_signal),
-    }
+    values = time_domain_features(np.asarray(eog_signal), EOG_FEATURES, out=np.empty(len(EOG_FEATURES)))
+    features = {f'eog_{name}': value for name, value in zip(EOG_FEATURES, values)}
 
     # TODO: Students should add:
     # - Eye movement detection features
@@ -183,11 +281,8 @@ def extract_emg_features(emg_signal):
     - Muscle twitches and artifacts
     - Sleep-related muscle activity
     """
-    features = {
-        'emg_mean': np.mean(emg_signal),
-        'emg_std': np.std(emg_signal),
-        'emg_rms': np.sqrt(np.mean(emg_signal**2)),
-    }
+    values = time_domain_features(np.asarray(emg_signal), EMG_FEATURES, out=np.empty(len(EMG_FEATURES)))
+    features = {f'emg_{name}': value for name, value in zip(EMG_FEATURES, values)}
 
     # TODO: Students should add:
     # - High-frequency power (muscle activity indicator)
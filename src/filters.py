@@ -0,0 +1,127 @@
+"""
+Filter Design Registry
+
+All preprocessing filters are designed here, in second-order-section (SOS)
+form. SOS cascades stay numerically stable at high orders and low normalized
+cutoffs, where the (b, a) form loses precision.
+
+Designs are memoized by (type, order, cutoffs, fs, dtype), so every
+preprocessing path shares one design per filter and calling a filter again
+costs no redesign. The anti-aliasing FIR filters of the polyphase resampler
+are memoized the same way, by resampling ratio.
+"""
+
+import numpy as np
+from fractions import Fraction
+from functools import lru_cache
+from scipy.signal import butter, firwin, iirnotch, tf2sos
+
+FILTER_TYPES = ('lowpass', 'highpass', 'bandpass', 'notch')
+
+
+def design_filter(filter_type, cutoff, fs, order=5, dtype=np.float64, quality=30.0):
+    """
+    Get the SOS coefficients of a filter from the registry.
+
+    Args:
+        filter_type (str): 'lowpass', 'highpass', 'bandpass' (Butterworth)
+            or 'notch' (second-order IIR notch)
+        cutoff: Cutoff frequency in Hz, a (low, high) pair for 'bandpass',
+            or the rejected frequency for 'notch'
+        fs (float): Sampling frequency in Hz
+        order (int): Butterworth order (ignored for 'notch')
+        dtype: dtype of the returned coefficients (default float64)
+        quality (float): Quality factor of the notch (ignored otherwise)
+
+    Returns:
+        np.ndarray: SOS array, shape (n_sections, 6). The array is shared
+            by all callers and therefore read-only; scipy.signal.sosfilt()
+            and sosfiltfilt() need a writeable copy (np.array(sos)).
+
+    Raises:
+        ValueError: If the filter type is unknown or a cutoff is not
+            between 0 and the Nyquist frequency.
+
+    Example:
+        >>> sos = design_filter('bandpass', (0.5, 40), fs=125, order=4)
+        >>> sos.shape
+        (4, 6)
+    """
+    if filter_type not in FILTER_TYPES:
+        raise ValueError(f"Unknown filter type: {filter_type}. Must be one of {FILTER_TYPES}.")
+
+    cutoffs = tuple(float(c) for c in np.atleast_1d(cutoff))
+    if filter_type != 'notch':
+        quality = None
+    else:
+        order = 2
+
+    return _design(filter_type, int(order), cutoffs, float(fs), np.dtype(dtype).str, quality)
+
+
+@lru_cache(maxsize=128)
+def _design(filter_type, order, cutoffs, fs, dtype, quality):
+    """Memoized filter design, keyed by (type, order, cutoffs, fs, dtype, quality)."""
+    nyquist = 0.5 * fs
+    if any(not 0 < c < nyquist for c in cutoffs):
+        raise ValueError(f"Cutoff {cutoffs} Hz must be between 0 and the Nyquist frequency {nyquist} Hz")
+
+    if filter_type == 'notch':
+        b, a = iirnotch(cutoffs[0], quality, fs=fs)
+        sos = tf2sos(b, a)
+    else:
+        wn = cutoffs if filter_type == 'bandpass' else cutoffs[0]
+        sos = butter(order, wn, btype=filter_type, fs=fs, output='sos')
+
+    return _read_only(sos.astype(dtype))
+
+
+def resample_factors(fs, target_fs):
+    """
+    Integer up/down factors that take a signal from fs to target_fs.
+
+    Args:
+        fs (float): Current sampling frequency in Hz
+        target_fs (float): Target sampling frequency in Hz
+
+    Returns:
+        tuple: (up, down) in lowest terms, e.g. (4, 5) for 125 -> 100 Hz
+    """
+    ratio = (Fraction(target_fs).limit_denominator(1000) /
+             Fraction(fs).limit_denominator(1000))
+    return ratio.numerator, ratio.denominator
+
+
+def design_resampler(up, down, dtype=np.float64):
+    """
+    Get the anti-aliasing FIR filter for polyphase resampling by up/down.
+
+    The design is the one scipy.signal.resample_poly uses by default (Kaiser
+    window, beta 5, 10 taps per phase), so passing it as `window` gives the
+    same result without redesigning the filter on every call.
+
+    Args:
+        up (int): Upsampling factor
+        down (int): Downsampling factor
+        dtype: dtype of the returned coefficients (default float64)
+
+    Returns:
+        np.ndarray: FIR coefficients. The array is shared by all callers and
+            therefore read-only.
+    """
+    return _resampler(int(up), int(down), np.dtype(dtype).str)
+
+
+@lru_cache(maxsize=32)
+def _resampler(up, down, dtype):
+    """Memoized resampling filter design, keyed by (up, down, dtype)."""
+    max_rate = max(up, down)
+    half_len = 10 * max_rate
+    h = firwin(2 * half_len + 1, 1.0 / max_rate, window=('kaiser', 5.0))
+    return _read_only(h.astype(dtype))
+
+
+def _read_only(array):
+    """Mark a memoized design read-only, so no caller can alter it for the others."""
+    array.flags.writeable = False
+    return array
@@ -0,0 +1,127 @@
+"""
+Per-Recording Normalization
+
+Scales every channel of every recording to a common amplitude range, so
+differences in amplifier gain and electrode impedance between recordings do
+not reach the features (distance-based classifiers such as k-NN are
+especially sensitive to them).
+
+Statistics are gathered in a single streaming pass over chunks of epochs, so
+memory-mapped or very long recordings are never copied as a whole:
+    - 'zscore': mean and standard deviation, merging per-chunk moments with
+      the parallel form of Welford's algorithm (Chan et al.)
+    - 'robust': median and interquartile range, estimated from a bounded
+      uniform sample of the recording (exact when the recording is smaller
+      than the sample)
+"""
+
+import numpy as np
+
+# Handle both package import and standalone execution
+try:
+    from .utils import record_segments
+except ImportError:
+    from utils import record_segments
+
+NORMALIZATION_METHODS = ('zscore', 'robust')
+
+# Epochs read per step of the streaming pass
+CHUNK_EPOCHS = 256
+
+# Values per channel kept for the 'robust' quantile estimate; the rank error
+# of the estimated quantiles is about 1 / sqrt(QUANTILE_SAMPLES)
+QUANTILE_SAMPLES = 100_000
+
+
+def recording_statistics(data, method='robust', seed=0):
+    """
+    Per-channel location and scale of one recording, in one streaming pass.
+
+    Args:
+        data (np.ndarray): Epochs of one recording, shape (n_epochs, samples)
+            or (n_epochs, n_channels, samples); may be a memmap
+        method (str): 'zscore' (mean, standard deviation) or 'robust'
+            (median, interquartile range)
+        seed (int): Seed of the 'robust' sampler, for reproducible estimates
+
+    Returns:
+        tuple: (center, scale), float64 arrays of shape data.shape[1:-1]
+            (scalars for single-channel data)
+
+    Raises:
+        ValueError: If the method is unknown.
+    """
+    if method not in NORMALIZATION_METHODS:
+        raise ValueError(f"Unknown normalization method: {method}. Must be one of {NORMALIZATION_METHODS}.")
+
+    channel_shape = data.shape[1:-1]
+    if method == 'zscore':
+        count = 0
+        mean = np.zeros(channel_shape)
+        m2 = np.zeros(channel_shape)
+        for start in range(0, len(data), CHUNK_EPOCHS):
+            chunk = np.moveaxis(data[start:start + CHUNK_EPOCHS], -1, 1)
+            n = chunk.shape[0] * chunk.shape[1]
+            chunk_mean = chunk.mean(axis=(0, 1), dtype=np.float64)
+            chunk_m2 = np.square(chunk - chunk_mean, dtype=np.float64).sum(axis=(0, 1))
+            # Merge the chunk's moments into the running ones
+            delta = chunk_mean - mean
+            total = count + n
+            mean += delta * (n / total)
+            m2 += chunk_m2 + delta ** 2 * (count * n / total)
+            count = total
+        return mean, np.sqrt(m2 / max(count, 1))
+
+    rng = np.random.default_rng(seed)
+    n_values = data.shape[0] * data.shape[-1]
+    samples = []
+    for start in range(0, len(data), CHUNK_EPOCHS):
+        chunk = data[start:start + CHUNK_EPOCHS]
+        if n_values <= QUANTILE_SAMPLES:
+            values = np.moveaxis(chunk, -1, 1).reshape((-1,) + channel_shape)
+        else:
+            # Uniform sample, proportional to the chunk's share of the recording
+            k = int(np.ceil(QUANTILE_SAMPLES * chunk.shape[0] / data.shape[0]))
+            values = chunk[rng.integers(0, chunk.shape[0], k), ..., rng.integers(0, chunk.shape[-1], k)]
+        samples.append(np.asarray(values, dtype=np.float64))
+    if not samples:
+        return np.zeros(channel_shape), np.ones(channel_shape)
+
+    q1, median, q3 = np.quantile(np.concatenate(samples), (0.25, 0.5, 0.75), axis=0)
+    return median, q3 - q1
+
+
+def normalize_recordings(data, record_ids=None, method='robust', out=None):
+    """
+    Normalize every channel of every recording by its own statistics.
+
+    Args:
+        data (np.ndarray): Epochs, shape (n_epochs, samples) or
+            (n_epochs, n_channels, samples); may be a memmap
+        record_ids (np.ndarray): Record ID per epoch; consecutive epochs with
+            the same ID form one recording (default None: one recording)
+        method (str): 'zscore' or 'robust', see recording_statistics()
+        out (np.ndarray): Optional output array of the same shape; may be
+            `data` itself to normalize in place
+
+    Returns:
+        np.ndarray: Normalized epochs, floating point
+
+    Example:
+        >>> normalized = normalize_recordings(eeg, record_ids, method='robust')
+        >>> np.median(normalized[record_ids == 'R1'], axis=(0, 2))   # ~0 per channel
+    """
+    if out is None:
+        out = np.empty(data.shape, dtype=np.result_type(data, np.float32))
+
+    for start, stop in record_segments(record_ids, len(data)):
+        center, scale = recording_statistics(data[start:stop], method)
+        # Flat channels keep their (zero) deviations instead of blowing up
+        center = center[..., None].astype(out.dtype)
+        scale = np.maximum(scale, np.finfo(out.dtype).eps)[..., None].astype(out.dtype)
+        for chunk in range(start, stop, CHUNK_EPOCHS):
+            end = min(chunk + CHUNK_EPOCHS, stop)
+            np.subtract(data[chunk:end], center, out=out[chunk:end])
+            out[chunk:end] /= scale
+
+    return out
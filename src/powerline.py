@@ -0,0 +1,159 @@
+"""
+Powerline Noise Analysis
+
+Measures mains interference (50 Hz in Europe, 60 Hz in the US) in every
+epoch of every channel. Each chunk of epochs goes through a single batched
+real FFT, and all candidate mains frequencies and the baseline are read from
+that one spectrum.
+
+The ratio reported per epoch and channel is the peak magnitude within
++/- tolerance of the mains frequency divided by the mean magnitude of the
+baseline band (5-40 Hz by default, minus +/- 5 Hz around each mains
+frequency). Without interference the ratio stays below ~3 (the largest of
+the noise bins in the peak band sits a few times above the mean level);
+above that the interference is significant.
+"""
+
+import numpy as np
+from scipy.fft import rfft, rfftfreq
+
+# Handle both package import and standalone execution
+try:
+    from .utils import get_sampling_rate
+except ImportError:
+    from utils import get_sampling_rate
+
+POWERLINE_FREQS = (50.0, 60.0)
+
+# Epochs transformed per FFT call; bounds the size of the spectra
+CHUNK_EPOCHS = 256
+
+
+def powerline_magnitudes(data, fs, freqs=POWERLINE_FREQS, tolerance=2.0, baseline=(5.0, 40.0)):
+    """
+    Peak mains magnitudes and baseline magnitude of every epoch and channel.
+
+    Args:
+        data (np.ndarray): Epochs, shape (n_epochs, samples_per_epoch) or
+            (n_epochs, n_channels, samples_per_epoch)
+        fs (float): Sampling frequency in Hz
+        freqs (tuple): Candidate mains frequencies in Hz; those whose band
+            reaches the Nyquist frequency are left out
+        tolerance (float): Half-width of the band searched for the peak, in Hz
+        baseline (tuple): (low, high) band in Hz used as the reference level
+
+    Returns:
+        tuple: (peaks, baseline_magnitude) where peaks maps each analyzable
+            frequency to an array of shape data.shape[:-1] and
+            baseline_magnitude has the same shape. Magnitudes use the
+            single-sided 2/N scaling.
+    """
+    n_samples = data.shape[-1]
+    bins = rfftfreq(n_samples, 1 / fs)
+    freqs = [f for f in freqs if f + tolerance < 0.5 * fs]
+
+    peak_bands = {f: np.abs(bins - f) <= tolerance for f in freqs}
+    baseline_band = (bins >= baseline[0]) & (bins <= baseline[1])
+    for f in freqs:
+        baseline_band &= np.abs(bins - f) > 5.0
+
+    peaks = {f: np.zeros(data.shape[:-1]) for f in freqs}
+    level = np.zeros(data.shape[:-1])
+    for start in range(0, data.shape[0], CHUNK_EPOCHS):
+        chunk = slice(start, start + CHUNK_EPOCHS)
+        magnitude = (2.0 / n_samples) * np.abs(rfft(data[chunk], axis=-1))
+        for f, band in peak_bands.items():
+            peaks[f][chunk] = magnitude[..., band].max(axis=-1)
+        if baseline_band.any():
+            level[chunk] = magnitude[..., baseline_band].mean(axis=-1)
+
+    return peaks, level
+
+
+def powerline_ratios(data, fs, freqs=POWERLINE_FREQS, tolerance=2.0, baseline=(5.0, 40.0)):
+    """
+    Per-epoch powerline-to-baseline magnitude ratios.
+
+    Args:
+        data (np.ndarray): Epochs, see powerline_magnitudes()
+        fs (float): Sampling frequency in Hz
+        freqs (tuple): Candidate mains frequencies in Hz
+        tolerance (float): Half-width of the peak band in Hz
+        baseline (tuple): (low, high) reference band in Hz
+
+    Returns:
+        dict: Frequency -> ratio array of shape data.shape[:-1], for
+            the frequencies below the Nyquist frequency
+    """
+    peaks, level = powerline_magnitudes(data, fs, freqs, tolerance, baseline)
+    level = np.maximum(level, np.finfo(level.dtype).tiny)
+    return {f: peak / level for f, peak in peaks.items()}
+
+
+def analyze_powerline(multi_channel_data, channel_info=None, freqs=POWERLINE_FREQS, tolerance=2.0):
+    """
+    Powerline ratios of every modality.
+
+    Args:
+        multi_channel_data (dict): Arrays of shape (n_epochs, n_channels,
+            samples_per_epoch) per signal type
+        channel_info (dict): Channel information with the sampling rates
+            (default None: SHHS rates)
+        freqs (tuple): Candidate mains frequencies in Hz
+        tolerance (float): Half-width of the peak band in Hz
+
+    Returns:
+        dict: signal type -> {frequency: ratio array (n_epochs, n_channels)}
+
+    Example:
+        >>> ratios = analyze_powerline(multi_channel_data, channel_info)
+        >>> np.median(ratios['eeg'][60.0], axis=0)   # per EEG channel
+    """
+    return {signal_type: powerline_ratios(data, get_sampling_rate(channel_info, signal_type),
+                                          freqs, tolerance)
+            for signal_type, data in multi_channel_data.items()}
+
+
+def powerline_epochs(data, fs, freqs=POWERLINE_FREQS, threshold=3.0):
+    """
+    Epochs and channels with significant mains interference.
+
+    Args:
+        data (np.ndarray): Epochs, see powerline_magnitudes()
+        fs (float): Sampling frequency in Hz
+        freqs (tuple): Candidate mains frequencies in Hz
+        threshold (float): Ratio above which an epoch counts as affected
+
+    Returns:
+        np.ndarray: Boolean array of shape data.shape[:-1], True where the
+            ratio at any candidate frequency below the Nyquist frequency
+            exceeds threshold
+    """
+    affected = np.zeros(data.shape[:-1], dtype=bool)
+    for ratio in powerline_ratios(data, fs, freqs).values():
+        affected |= ratio > threshold
+    return affected
+
+
+def detect_powerline(data, fs, freqs=POWERLINE_FREQS, threshold=3.0):
+    """
+    Mains frequency present in a recording, if any.
+
+    Args:
+        data (np.ndarray): Epochs, see powerline_magnitudes()
+        fs (float): Sampling frequency in Hz
+        freqs (tuple): Candidate mains frequencies in Hz
+        threshold (float): Median ratio above which interference counts as present
+
+    Returns:
+        float: The candidate frequency with the highest median ratio over
+            all epochs and channels, or None if no ratio exceeds threshold
+            (or no candidate is below the Nyquist frequency)
+    """
+    if data.shape[0] == 0:
+        return None
+    medians = {f: float(np.median(r)) for f, r in powerline_ratios(data, fs, freqs).items()}
+    if not medians:
+        return None
+    freq = max(medians, key=medians.get)
+    return freq if medians[freq] > threshold else None
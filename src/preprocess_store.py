@@ -0,0 +1,104 @@
+"""
+Preprocessing Store
+
+Persistent on-disk store of preprocessed signals, one .npy entry per
+recording and modality. Entries are keyed by a hash of the raw signal
+together with every setting that determines the result: the modality's
+chain, its sampling rate and channel names, FILTER_MODE, the dtype and, for
+'auto' notch steps, the powerline detection settings.
+
+Changing one modality's settings therefore only misses that modality's
+entries, and adding a recording only misses that recording; everything else
+is read back (memory-mapped) instead of being preprocessed again. Settings
+that do not change the result, such as the number of workers, are not part
+of the key.
+"""
+
+import os
+import json
+import hashlib
+import numpy as np
+
+# Epochs hashed per update; bounds the temporary copy of strided input
+CHUNK_EPOCHS = 256
+
+
+def preprocess_key(data, signal_type, steps, fs, channel_names=None, config=None):
+    """
+    Compute the store key of one recording's modality.
+
+    Args:
+        data (np.ndarray): Raw epochs of the recording, in the dtype they are
+            preprocessed in
+        signal_type (str): 'eeg', 'eog' or 'emg'
+        steps (list): The modality's configured chain (before 'auto' notch
+            steps are resolved)
+        fs (float): Sampling frequency of `data` in Hz
+        channel_names (list): Channel names (re-referencing depends on them)
+        config (module): The configuration module (FILTER_MODE,
+            POWERLINE_FREQS, POWERLINE_RATIO_THRESHOLD)
+
+    Returns:
+        str: Hex digest identifying the raw signal and its preprocessing
+    """
+    settings = {
+        'signal_type': signal_type,
+        'steps': steps,
+        'fs': float(fs),
+        'channel_names': list(channel_names) if channel_names is not None else None,
+        'filter_mode': getattr(config, 'FILTER_MODE', 'epoch'),
+        'shape': list(data.shape),
+        'dtype': data.dtype.str,
+    }
+    if any(step['step'] == 'notch' and step.get('freq') == 'auto' for step in steps):
+        settings['powerline_freqs'] = [float(f) for f in getattr(config, 'POWERLINE_FREQS', (50.0, 60.0))]
+        settings['powerline_threshold'] = float(getattr(config, 'POWERLINE_RATIO_THRESHOLD', 3.0))
+
+    digest = hashlib.sha256(json.dumps(settings, sort_keys=True, default=float).encode('utf-8'))
+    for start in range(0, len(data), CHUNK_EPOCHS):
+        digest.update(np.ascontiguousarray(data[start:start + CHUNK_EPOCHS]).data)
+    return digest.hexdigest()
+
+
+def load_preprocessed(store_dir, key):
+    """
+    Open a stored preprocessed signal.
+
+    Args:
+        store_dir (str): Root directory of the store
+        key (str): Key from preprocess_key()
+
+    Returns:
+        np.ndarray or None: Memory-mapped read-only array, or None if the
+            entry is not in the store
+    """
+    path = os.path.join(store_dir, f'{key}.npy')
+    if not os.path.exists(path):
+        return None
+    return np.load(path, mmap_mode='r')
+
+
+def save_preprocessed(store_dir, key, data):
+    """
+    Write a preprocessed signal to the store.
+
+    The array is written to a temporary file and renamed into place, so an
+    interrupted run never leaves a partial entry behind.
+
+    Args:
+        store_dir (str): Root directory of the store
+        key (str): Key from preprocess_key()
+        data (np.ndarray): Preprocessed epochs of one recording's modality
+    """
+    path = os.path.join(store_dir, f'{key}.npy')
+    if os.path.exists(path):
+        return
+
+    os.makedirs(store_dir, exist_ok=True)
+    tmp_path = f'{path}.tmp-{os.getpid()}.npy'
+    try:
+        np.save(tmp_path, data)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
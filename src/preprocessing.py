@@ -1,7 +1,31 @@
-from scipy.signal import butter, lfilter
+from scipy.signal import sosfilt, sosfiltfilt, resample_poly
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from multiprocessing import shared_memory
+from types import SimpleNamespace
 import numpy as np
+import sys
 
-def lowpass_filter(data, cutoff, fs, order=5):
+# Handle both package import and standalone execution
+try:
+    from .utils import get_signal_dtype, get_sampling_rate, record_segments
+    from .filters import design_filter, design_resampler, resample_factors
+    from .powerline import detect_powerline, POWERLINE_FREQS
+    from .normalization import normalize_recordings, NORMALIZATION_METHODS
+    from .preprocess_store import preprocess_key, load_preprocessed, save_preprocessed
+except ImportError:
+    from utils import get_signal_dtype, get_sampling_rate, record_segments
+    from filters import design_filter, design_resampler, resample_factors
+    from powerline import detect_powerline, POWERLINE_FREQS
+    from normalization import normalize_recordings, NORMALIZATION_METHODS
+    from preprocess_store import preprocess_key, load_preprocessed, save_preprocessed
+
+# Chain steps that are filters; adjacent filter steps are fused into one SOS cascade
+FILTER_STEPS = ('lowpass', 'highpass', 'bandpass', 'notch')
+
+# Epochs processed per call in 'epoch' mode; bounds the size of temporaries
+CHUNK_EPOCHS = 256
+
+def lowpass_filter(data, cutoff, fs, order=5, axis=-1, out=None):
     """
     EXAMPLE IMPLEMENTATION: Simple low-pass Butterworth filter.
 
@@ -11,27 +35,724 @@ def lowpass_filter(data, cutoff, fs, order=5):
     - Should you use bandpass instead?
     - What about notch filtering for powerline interference?
 
+    The filter comes from the design registry (filters.py) and is applied
+    along `axis` in a single call, so a whole (n_epochs, n_channels, samples)
+    array can be filtered at once; each epoch is still filtered independently.
+
     Args:
-        data (np.ndarray): The input signal.
+        data (np.ndarray): The input signal, any shape.
         cutoff (float): The cutoff frequency of the filter.
         fs (int): The sampling frequency of the signal.
         order (int): The order of the filter.
+        axis (int): The time axis (default: last).
+        out (np.ndarray): Optional output array of the same shape; may be
+            `data` itself to filter in place.
 
     Returns:
-        np.ndarray: The filtered signal.
+        np.ndarray: The filtered signal. float32 input stays float32.
     """
     # TODO: Students may want to implement additional filtering:
     # - High-pass filter to remove DC drift
     # - Notch filter for 50/60 Hz powerline noise
     # - Bandpass filter (e.g., 0.5-40 Hz for EEG)
 
+    return apply_filter(data, 'lowpass', cutoff, fs, order, axis, out)
+
+def apply_filter(data, filter_type, cutoff, fs, order=5, axis=-1, out=None):
+    """
+    Apply a registry filter (lowpass, highpass, bandpass or notch) along one axis.
+
+    Args:
+        data (np.ndarray): The input signal, any shape.
+        filter_type (str): 'lowpass', 'highpass', 'bandpass' or 'notch'
+        cutoff: Cutoff frequency in Hz ((low, high) for 'bandpass')
+        fs (float): The sampling frequency of the signal.
+        order (int): The order of the filter.
+        axis (int): The time axis (default: last).
+        out (np.ndarray): Optional output array of the same shape; may be
+            `data` itself to filter in place. Filtering then runs in chunks,
+            so no full-size temporary is allocated.
+
+    Returns:
+        np.ndarray: The filtered signal. float32 input stays float32.
+    """
+    # Filter in the input's precision (float64 for integer input)
+    dtype = np.result_type(data, np.float32)
+    # SciPy's filters need writeable coefficients; the registry's are read-only
+    sos = np.array(design_filter(filter_type, cutoff, fs, order, dtype))
+    if out is None:
+        return sosfilt(sos, data, axis=axis)
+
+    if data.ndim == 1:
+        out[...] = sosfilt(sos, data)
+        return out
+    _map_signal(np.moveaxis(data, axis, -1), lambda x: sosfilt(sos, x, axis=-1), 'epoch',
+                out=np.moveaxis(out, axis, -1))
+    return out
+
+def filter_epochs(epochs, cutoff, fs, config, record_ids=None, order=5,
+                  filter_type='lowpass', out=None):
+    """
+    Filter epoched data according to config.FILTER_MODE.
+
+    Modes:
+        - 'epoch': filter every epoch on its own (the filter restarts from
+          zero state at each epoch boundary)
+        - 'continuous': causal filter over each recording's continuous signal
+        - 'zero_phase': forward-backward (sosfiltfilt) filter over each
+          recording's continuous signal, no phase shift
+
+    In the continuous modes the epochs of each recording are joined back into
+    one signal per channel, filtered once and split into epochs again, so
+    there are no edge transients at epoch boundaries. Epochs must be in time
+    order within each recording, as the loaders return them.
+
+    Args:
+        epochs (np.ndarray): Shape (n_epochs, samples) or (n_epochs, n_channels, samples)
+        cutoff: The cutoff frequency of the filter ((low, high) for 'bandpass').
+        fs (float): The sampling frequency of the signal.
+        config (module): The configuration module.
+        record_ids (np.ndarray): Record ID per epoch; consecutive epochs with
+            the same ID form one recording (default None: a single recording)
+        order (int): The order of the filter.
+        filter_type (str): Registry filter type (default 'lowpass')
+        out (np.ndarray): Optional output array of the same shape; may be
+            `epochs` itself to filter in place.
+
+    Returns:
+        np.ndarray: Filtered epochs, same shape. float32 input stays float32.
+    """
+    dtype = np.result_type(epochs, np.float32)
+    sos = design_filter(filter_type, cutoff, fs, order, dtype)
+    return _sosfilt_epochs(epochs, sos, config, record_ids, out)
+
+def _sosfilt_epochs(epochs, sos, config, record_ids=None, out=None, state=None):
+    """
+    Apply an SOS cascade to epoched data in the configured FILTER_MODE.
+
+    With a `state` dict ('continuous' mode, one recording), the filter
+    starts from the final state of the previous call and leaves its own
+    final state in state['zi'], so consecutive blocks of a recording filter
+    exactly like the whole recording.
+    """
+    mode = getattr(config, 'FILTER_MODE', 'epoch')
+    if mode not in ('epoch', 'continuous', 'zero_phase'):
+        raise ValueError(f"Invalid FILTER_MODE: {mode}. Must be 'epoch', 'continuous' or 'zero_phase'.")
+
+    # SciPy's filters need writeable coefficients; registry designs are read-only
+    sos = np.array(sos)
+    if mode == 'zero_phase':
+        return _map_signal(epochs, lambda x: sosfiltfilt(sos, x, axis=-1), mode, record_ids, out)
+    if state is not None and mode == 'continuous':
+        def carry(x):
+            if x.size == 0:
+                return sosfilt(sos, x, axis=-1)
+            zi = state.get('zi')
+            if zi is None:
+                zi = np.zeros((sos.shape[0],) + x.shape[:-1] + (2,), dtype=np.result_type(sos, x))
+            y, state['zi'] = sosfilt(sos, x, axis=-1, zi=zi)
+            return y
+        return _map_signal(epochs, carry, mode, record_ids, out)
+    return _map_signal(epochs, lambda x: sosfilt(sos, x, axis=-1), mode, record_ids, out)
+
+def _map_signal(epochs, func, mode, record_ids=None, out=None):
+    """
+    Apply func along the time axis, per epoch ('epoch' mode) or over each
+    recording's continuous signal (continuous modes).
+
+    func maps (..., n_samples) to (..., n_samples * k) for a fixed ratio k,
+    so the output can be split back into epochs. Results are written piece
+    by piece (chunks of epochs, or recordings) into `out`, which may be
+    `epochs` itself: every piece is read before it is overwritten.
+    """
+    if len(epochs) == 0:
+        return func(epochs)
+
+    if mode == 'epoch':
+        for start in range(0, len(epochs), CHUNK_EPOCHS):
+            result = func(epochs[start:start + CHUNK_EPOCHS])
+            if out is None:
+                out = np.empty((len(epochs),) + result.shape[1:], dtype=np.result_type(result, np.float32))
+            out[start:start + CHUNK_EPOCHS] = result
+        return out
+
+    for start, stop in record_segments(record_ids, len(epochs)):
+        # (n, ..., samples) -> (..., n * samples): one continuous signal per channel
+        segment = np.moveaxis(epochs[start:stop], 0, -2)
+        continuous = func(segment.reshape(segment.shape[:-2] + (-1,)))
+        result = np.moveaxis(continuous.reshape(segment.shape[:-1] + (-1,)), -2, 0)
+        if out is None:
+            out = np.empty((len(epochs),) + result.shape[1:], dtype=np.result_type(result, np.float32))
+        out[start:stop] = result
+
+    return out
+
+def compile_chain(steps, fs, channel_names=None, dtype=np.float64):
+    """
+    Compile a modality's preprocessing steps into fused operations.
+
+    Steps are dicts with a 'step' key (see PREPROCESSING_CHAIN in config.py):
+        - 'lowpass', 'highpass', 'bandpass': 'cutoff' in Hz ((low, high) for
+          bandpass), optional 'order' (default 5)
+        - 'notch': 'freq' in Hz, optional 'quality' (default 30). 'freq'
+          may be 'auto' in the configured chain; preprocess_modality()
+          replaces it with each recording's detected mains frequency
+          before compiling
+        - 'rereference': 'reference' is 'average' or a channel name
+        - 'normalize': 'method' is 'zscore' (default) or 'robust'
+          (median/IQR); 'scope' is 'epoch' (default, every epoch on its
+          own) or 'recording' (every recording by its own statistics, see
+          src/normalization.py)
+        - 'resample': polyphase resampling to 'fs' Hz; later steps run at
+          the new rate
+
+    Adjacent filter steps are fused into a single SOS cascade, so they cost
+    one filtering pass. Filter edges at or above the Nyquist frequency are
+    dropped with a note (the signal holds no content there): a lowpass,
+    highpass or notch is skipped and a bandpass becomes a highpass.
+
+    Args:
+        steps (list): Ordered step dicts for one modality
+        fs (float): Sampling frequency of the modality in Hz
+        channel_names (list): Channel names, needed to re-reference to a channel
+        dtype: Signal dtype the filters are designed in
+
+    Returns:
+        list: Operations as (op, params) tuples, op being 'filter' (params:
+            SOS array), 'rereference' (params: channel index or None for the
+            average), 'normalize' (params: (scope, method)) or 'resample' (params:
+            (up, down, fir) tuple)
+
+    Raises:
+        ValueError: If a step is unknown or refers to a missing channel.
+
+    Example:
+        >>> ops = compile_chain([{'step': 'highpass', 'cutoff': 0.3},
+        ...                      {'step': 'lowpass', 'cutoff': 40}], fs=125)
+        >>> [op for op, _ in ops]
+        ['filter']
+    """
+    ops = []
+    for step in steps:
+        kind = step['step']
+
+        if kind in FILTER_STEPS:
+            sos = _design_step(step, fs, dtype)
+            if sos is None:
+                continue
+            if ops and ops[-1][0] == 'filter':
+                ops[-1] = ('filter', np.vstack([ops[-1][1], sos]))
+            else:
+                ops.append(('filter', sos))
+
+        elif kind == 'rereference':
+            reference = step.get('reference', 'average')
+            if reference == 'average':
+                ops.append(('rereference', None))
+            elif channel_names is not None and reference in channel_names:
+                ops.append(('rereference', list(channel_names).index(reference)))
+            else:
+                raise ValueError(f"Reference channel {reference} not found in {channel_names}")
+
+        elif kind == 'normalize':
+            scope, method = step.get('scope', 'epoch'), step.get('method', 'zscore')
+            if scope not in ('epoch', 'recording') or method not in NORMALIZATION_METHODS:
+                raise ValueError(f"Invalid normalization: scope {scope}, method {method}")
+            ops.append(('normalize', (scope, method)))
+
+        elif kind == 'resample':
+            up, down = resample_factors(fs, step['fs'])
+            if up == down:
+                continue
+            ops.append(('resample', (up, down, design_resampler(up, down, dtype))))
+            fs = fs * up / down
+
+        else:
+            raise ValueError(f"Unknown preprocessing step: {kind}")
+
+    return ops
+
+def _design_step(step, fs, dtype):
+    """SOS design for one filter step, or None if the step has no effect at this fs."""
+    kind = step['step']
     nyquist = 0.5 * fs
-    normal_cutoff = cutoff / nyquist
-    b, a = butter(order, normal_cutoff, btype='low', analog=False)
-    y = lfilter(b, a, data)
-    return y
+    order = step.get('order', 5)
+
+    if kind == 'notch':
+        freq = step['freq']
+        if freq == 'auto':
+            raise ValueError("Notch frequency 'auto' must be resolved against the data first, see resolve_auto_notch()")
+        if freq >= nyquist:
+            print(f"  Note: skipping {freq} Hz notch, at or above Nyquist ({nyquist} Hz)")
+            return None
+        return design_filter('notch', freq, fs, dtype=dtype, quality=step.get('quality', 30.0))
+
+    if kind == 'bandpass':
+        low, high = step['cutoff']
+        if high >= nyquist:
+            print(f"  Note: bandpass upper edge {high} Hz is at or above Nyquist ({nyquist} Hz), using highpass {low} Hz")
+            kind, cutoff = 'highpass', low
+        else:
+            return design_filter('bandpass', (low, high), fs, order, dtype)
+    else:
+        cutoff = step['cutoff']
+
+    if cutoff >= nyquist:
+        print(f"  Note: skipping {cutoff} Hz {kind}, at or above Nyquist ({nyquist} Hz)")
+        return None
+    return design_filter(kind, cutoff, fs, order, dtype)
+
+def chain_output_rate(ops, fs):
+    """Sampling rate after running compiled operations on a signal sampled at fs."""
+    for op, params in ops:
+        if op == 'resample':
+            up, down, _ = params
+            fs = fs * up / down
+    return fs
+
+def apply_chain(data, ops, config, record_ids=None, out=None, inplace=False, filter_state=None):
+    """
+    Run compiled operations over a whole epoch array.
+
+    By default the input is left untouched and every operation writes a new
+    array. With inplace=True (or a caller-supplied `out`) the operations
+    overwrite one buffer instead, so peak memory stays close to one copy of
+    the data. A resample changes the array shape and always writes a new
+    buffer (or `out`), which later operations then reuse.
+
+    Args:
+        data (np.ndarray): Shape (n_epochs, samples) or (n_epochs, n_channels, samples)
+        ops (list): Operations from compile_chain()
+        config (module): The configuration module (for FILTER_MODE)
+        record_ids (np.ndarray): Record ID per epoch, see filter_epochs()
+        out (np.ndarray): Optional output array with the chain's output shape
+        inplace (bool): Overwrite `data` (default False); needs a writeable
+            floating-point array
+        filter_state (dict): Causal filter states carried between calls on
+            consecutive blocks of one recording in 'continuous' mode (default
+            None: every call starts from rest). Pass the same, initially
+            empty, dict for every block; it is updated in place.
+
+    Returns:
+        np.ndarray: Preprocessed data, same dtype; same shape unless the
+            chain resamples, which changes the number of samples per epoch.
+            This is `out` if given, and `data` itself for in-place runs
+            that do not resample.
+
+    Raises:
+        ValueError: If a resampled epoch would not have a whole number of
+            samples, `out` has the wrong shape, or `data` cannot be
+            overwritten in place.
+    """
+    mode = getattr(config, 'FILTER_MODE', 'epoch')
+    out_shape = data.shape[:-1] + (_output_samples(ops, data.shape[-1]),)
+
+    if inplace and out is not None:
+        raise ValueError("Pass either inplace=True or out, not both")
+    if inplace and not (data.flags.writeable and np.issubdtype(data.dtype, np.floating)):
+        raise ValueError("In-place preprocessing needs a writeable floating-point array")
+    if out is not None and out.shape != out_shape:
+        raise ValueError(f"Output must have shape {out_shape}, got {out.shape}")
+
+    # Whether `data` is a buffer the chain may overwrite
+    owned = inplace
+
+    for index, (op, params) in enumerate(ops):
+        if op == 'filter':
+            state = filter_state.setdefault(index, {}) if filter_state is not None else None
+            data = _sosfilt_epochs(data, params, config, record_ids,
+                                   _chain_buffer(data, owned, out, data.shape), state)
+        elif op == 'resample':
+            up, down, fir = params
+            if (data.shape[-1] * up) % down:
+                raise ValueError(f"Epochs of {data.shape[-1]} samples cannot be resampled by {up}/{down} "
+                                 f"to a whole number of samples")
+            target = _chain_buffer(data, False, out, data.shape[:-1] + (data.shape[-1] * up // down,))
+            # Resampling is zero-phase, so both continuous modes resample the continuous signal
+            data = _map_signal(data, lambda x: resample_poly(x, up, down, axis=-1, window=fir),
+                               mode, record_ids, target)
+        elif op == 'rereference':
+            if data.ndim < 3:
+                continue  # Single channel: nothing to re-reference against
+            if params is None:
+                reference = data.mean(axis=1, keepdims=True)
+            else:
+                reference = data[:, params:params + 1, :].copy()
+            target = _chain_buffer(data, owned, out, data.shape)
+            data = np.subtract(data, reference, out=target)
+        elif op == 'normalize':
+            scope, method = params
+            target = _chain_buffer(data, owned, out, data.shape)
+            if scope == 'recording':
+                data = normalize_recordings(data, record_ids, method, out=target)
+            else:
+                if method == 'robust':
+                    q1, center, q3 = np.quantile(data, (0.25, 0.5, 0.75), axis=-1, keepdims=True)
+                    scale = q3 - q1
+                else:
+                    center, scale = data.mean(axis=-1, keepdims=True), data.std(axis=-1, keepdims=True)
+                scale = np.maximum(scale, np.finfo(data.dtype).eps)
+                data = np.subtract(data, center, out=target)
+                data /= scale
+        owned = True
+
+    if out is not None and data is not out:
+        out[...] = data
+        data = out
+    return data
+
+def _chain_buffer(data, owned, out, shape):
+    """Buffer an operation can write its result to, or None to allocate a new one."""
+    if owned and data.shape == shape:
+        return data
+    if out is not None and out.shape == shape:
+        return out
+    return None
+
+def apply_chain_parallel(data, ops, config, record_ids=None, n_jobs=1, backend='thread',
+                         out=None, inplace=False):
+    """
+    Run compiled operations over chunks of the epoch array in parallel.
+
+    The array is split into chunks of whole epochs (whole recordings in the
+    continuous filter modes) and, unless the chain re-references, single
+    channels. Chunks are processed independently and written into one
+    preallocated output, so the result equals apply_chain().
+
+    Backends:
+        - 'thread': a thread pool working on the arrays directly; SciPy's
+          filtering and resampling kernels release the GIL
+        - 'process': a process pool; input and output live in
+          multiprocessing.shared_memory blocks that the workers attach to,
+          so chunks are never pickled
+
+    Args:
+        data (np.ndarray): Shape (n_epochs, samples) or (n_epochs, n_channels, samples)
+        ops (list): Operations from compile_chain()
+        config (module): The configuration module (for FILTER_MODE)
+        record_ids (np.ndarray): Record ID per epoch, see filter_epochs()
+        n_jobs (int): Number of workers (default 1, runs apply_chain())
+        backend (str): 'thread' or 'process' (default 'thread')
+        out (np.ndarray): Optional output array, see apply_chain()
+        inplace (bool): Overwrite `data`, see apply_chain()
+
+    Returns:
+        np.ndarray: Same as apply_chain()
+    """
+    if n_jobs <= 1 or len(data) == 0:
+        return apply_chain(data, ops, config, record_ids, out, inplace)
+    if backend not in ('thread', 'process'):
+        raise ValueError(f"Invalid preprocessing backend: {backend}. Must be 'thread' or 'process'.")
+
+    mode = getattr(config, 'FILTER_MODE', 'epoch')
+    record_ids = np.asarray(record_ids) if record_ids is not None else None
+    out_shape = data.shape[:-1] + (_output_samples(ops, data.shape[-1]),)
+    out_dtype = np.result_type(data, np.float32)
+    chunks = _chain_chunks(data, ops, mode, record_ids, n_jobs)
+
+    if inplace:
+        if out is not None:
+            raise ValueError("Pass either inplace=True or out, not both")
+        if not (data.flags.writeable and np.issubdtype(data.dtype, np.floating)):
+            raise ValueError("In-place preprocessing needs a writeable floating-point array")
+        if out_shape == data.shape:
+            out = data
+    if out is not None and out.shape != out_shape:
+        raise ValueError(f"Output must have shape {out_shape}, got {out.shape}")
+
+    if out is None:
+        out = np.empty(out_shape, dtype=out_dtype)
+    tasks = [(epochs, channels, ops) for epochs, channels in chunks]
+    return _run_chunks(data, tasks, config, record_ids, n_jobs, backend, out)
+
+def _run_chunks(data, tasks, config, record_ids, n_jobs, backend, out):
+    """
+    Run (epoch slice, channel slice, ops) tasks on disjoint chunks of `data`
+    into the preallocated `out` (which may be `data` itself). Regions of
+    `out` that no task covers are left as they are.
+    """
+    def run(task):
+        # Chunks are disjoint, so each writes its own region of out
+        epochs, channels, ops = task
+        ids = record_ids[epochs] if record_ids is not None else None
+        apply_chain(data[epochs, channels], ops, config, ids, out=out[epochs, channels])
+
+    if n_jobs <= 1 or len(tasks) <= 1:
+        for task in tasks:
+            run(task)
+        return out
+
+    if backend == 'thread':
+        with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+            list(executor.map(run, tasks))
+        return out
+    if backend != 'process':
+        raise ValueError(f"Invalid preprocessing backend: {backend}. Must be 'thread' or 'process'.")
+
+    shm_in = shared_memory.SharedMemory(create=True, size=max(data.nbytes, 1))
+    shm_out = shared_memory.SharedMemory(create=True, size=max(out.nbytes, 1))
+    try:
+        np.ndarray(data.shape, dtype=data.dtype, buffer=shm_in.buf)[...] = data
+        spec = {
+            'in': (shm_in.name, data.shape, data.dtype.str),
+            'out': (shm_out.name, out.shape, out.dtype.str),
+            'mode': getattr(config, 'FILTER_MODE', 'epoch'),
+        }
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            list(executor.map(_chain_chunk_worker,
+                              [(spec, epochs, channels, ops, record_ids[epochs] if record_ids is not None else None)
+                               for epochs, channels, ops in tasks]))
+
+        # Copy the processed regions out before the shared block is released
+        result = np.ndarray(out.shape, dtype=out.dtype, buffer=shm_out.buf)
+        for epochs, channels, _ in tasks:
+            out[epochs, channels] = result[epochs, channels]
+        return out
+    finally:
+        for shm in (shm_in, shm_out):
+            shm.close()
+            shm.unlink()
+
+def _chain_chunk_worker(task):
+    """Process pool worker: run a chain on one chunk of the shared input."""
+    spec, epochs, channels, ops, record_ids = task
+    blocks = {}
+    try:
+        arrays = {}
+        for role in ('in', 'out'):
+            name, shape, dtype = spec[role]
+            blocks[role] = _attach_shared_memory(name)
+            arrays[role] = np.ndarray(shape, dtype=dtype, buffer=blocks[role].buf)
+
+        config = SimpleNamespace(FILTER_MODE=spec['mode'])
+        arrays['out'][epochs, channels] = apply_chain(arrays['in'][epochs, channels], ops, config, record_ids)
+        del arrays
+    finally:
+        for block in blocks.values():
+            block.close()
+
+def _attach_shared_memory(name):
+    """Attach to a block created by the parent without taking ownership of it."""
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    # Pool workers share the parent's resource tracker (fork, spawn and
+    # forkserver alike), so registering the block again is harmless and the
+    # parent's unlink() deregisters it; unregistering here would drop the
+    # parent's registration instead
+    return shared_memory.SharedMemory(name=name)
+
+def _output_samples(ops, n_samples):
+    """Samples per epoch after running compiled operations."""
+    for op, params in ops:
+        if op == 'resample':
+            up, down, _ = params
+            n_samples = n_samples * up // down
+    return n_samples
+
+def _chain_chunks(data, ops, mode, record_ids, n_jobs):
+    """Independent (epoch slice, channel slice) chunks for apply_chain_parallel()."""
+    n_epochs = len(data)
+    per_recording = any(op == 'normalize' and params[0] == 'recording' for op, params in ops)
+    if mode == 'epoch' and not per_recording:
+        # Epochs are independent: split them evenly
+        bounds = np.linspace(0, n_epochs, min(n_jobs, n_epochs) + 1).astype(int)
+        epoch_slices = [slice(a, b) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+    else:
+        # Continuous modes and per-recording statistics: whole recordings,
+        # grouped into about n_jobs chunks
+        target = n_epochs / n_jobs
+        epoch_slices = []
+        first = None
+        for start, stop in record_segments(record_ids, n_epochs):
+            first = start if first is None else first
+            if stop - first >= target:
+                epoch_slices.append(slice(first, stop))
+                first = None
+        if first is not None:
+            epoch_slices.append(slice(first, n_epochs))
+
+    # Channels are independent unless the chain re-references across them
+    if data.ndim == 3 and not any(op == 'rereference' for op, _ in ops):
+        channel_slices = [slice(c, c + 1) for c in range(data.shape[1])]
+    else:
+        channel_slices = [slice(None)]
+
+    return [(epochs, channels) for epochs in epoch_slices for channels in channel_slices]
+
+def resolve_auto_notch(steps, freq):
+    """
+    Replace 'auto' notch frequencies with a detected mains frequency.
+
+    Args:
+        steps (list): Ordered step dicts for one modality
+        freq (float): Mains frequency in Hz (see powerline.detect_powerline()),
+            or None to drop the 'auto' notch steps
+
+    Returns:
+        list: Steps with concrete notch frequencies
+    """
+    resolved = []
+    for step in steps:
+        if _is_auto_notch(step):
+            if freq is None:
+                continue
+            step = dict(step, freq=freq)
+        resolved.append(step)
+    return resolved
+
+def _is_auto_notch(step):
+    """True for a notch step whose frequency is detected from the data."""
+    return step['step'] == 'notch' and step.get('freq') == 'auto'
+
+def _modality_output_rate(signal_type, config, channel_info):
+    """Sampling rate of a modality after its configured chain."""
+    fs = get_sampling_rate(channel_info, signal_type)
+    names = channel_info.get(f'{signal_type}_names') if channel_info is not None else None
+    # Notches do not change the rate, so 'auto' ones need not be resolved
+    steps = [step for step in config.PREPROCESSING_CHAIN.get(signal_type, []) if not _is_auto_notch(step)]
+    return chain_output_rate(compile_chain(steps, fs, names), fs)
+
+def _output_channel_info(channel_info, signal_types, config):
+    """Copy of channel_info (training or holdout form) with the rates after preprocessing."""
+    output = dict(channel_info) if channel_info is not None else {}
+    if 'sampling_rates' in output:
+        output['sampling_rates'] = dict(output['sampling_rates'])
+    for signal_type in signal_types:
+        output_fs = _modality_output_rate(signal_type, config, channel_info)
+        if 'sampling_rates' in output and f'{signal_type}_fs' not in output:
+            output['sampling_rates'][signal_type] = output_fs
+        else:
+            output[f'{signal_type}_fs'] = output_fs
+    return output
+
+def preprocess_modality(data, signal_type, config, channel_info=None, record_ids=None,
+                        out=None, inplace=False, store_dir=None, filter_state=None):
+    """
+    Run the configured preprocessing chain of one modality.
+
+    'auto' notch steps are resolved per recording, from that recording's raw
+    signal. With a store, every recording is looked up by its raw signal and
+    the modality's settings (see preprocess_store.py), and only recordings
+    without an entry are preprocessed.
+
+    Args:
+        data (np.ndarray): Epochs of the modality
+        signal_type (str): 'eeg', 'eog' or 'emg'
+        config (module): The configuration module (PREPROCESSING_CHAIN,
+            FILTER_MODE, PREPROCESS_N_JOBS, PREPROCESS_BACKEND,
+            POWERLINE_FREQS, POWERLINE_RATIO_THRESHOLD)
+        channel_info (dict): Channel information from the data loader; the
+            sampling rate and channel names are read from it (it is not
+            modified)
+        record_ids (np.ndarray): Record ID per epoch, see filter_epochs()
+        out (np.ndarray): Optional output array, see apply_chain()
+        inplace (bool): Overwrite `data`, see apply_chain()
+        store_dir (str): Preprocessing store directory (default None, no store)
+        filter_state (dict): Filter states of the modality carried between
+            blocks of one recording, see apply_chain(); the chain then runs
+            sequentially, without the store
+
+    Returns:
+        np.ndarray: Preprocessed epochs, same dtype
+    """
+    fs = get_sampling_rate(channel_info, signal_type)
+    names = channel_info.get(f'{signal_type}_names') if channel_info is not None else None
+    steps = config.PREPROCESSING_CHAIN.get(signal_type, [])
+    dtype = np.result_type(data, np.float32)
+
+    # Notches do not change the shape, so the chain without 'auto' ones gives the output rate
+    shape_ops = compile_chain([step for step in steps if not _is_auto_notch(step)], fs, names, dtype)
+    output_fs = chain_output_rate(shape_ops, fs)
+    rates = f"{fs} Hz" if output_fs == fs else f"{fs} -> {output_fs} Hz"
+    print(f"  {signal_type.upper()} ({rates}): {', '.join(s['step'] for s in steps) or 'no steps'}")
+
+    if filter_state is not None:
+        if any(_is_auto_notch(step) for step in steps):
+            raise ValueError("Streamed preprocessing needs a fixed notch frequency, not 'auto'")
+        data = apply_chain(data, shape_ops, config, record_ids, out, inplace, filter_state)
+    elif store_dir is None and not any(_is_auto_notch(step) for step in steps):
+        data = apply_chain_parallel(data, shape_ops, config, record_ids,
+                                    n_jobs=getattr(config, 'PREPROCESS_N_JOBS', 1),
+                                    backend=getattr(config, 'PREPROCESS_BACKEND', 'thread'),
+                                    out=out, inplace=inplace)
+    else:
+        if out is None:
+            out_shape = data.shape[:-1] + (_output_samples(shape_ops, data.shape[-1]),)
+            out = data if inplace and out_shape == data.shape else np.empty(out_shape, dtype=dtype)
+        data = _preprocess_recordings(data, signal_type, steps, fs, names, config, record_ids,
+                                      out, store_dir)
+    return data
 
-def preprocess(data, config):
+def _preprocess_recordings(data, signal_type, steps, fs, names, config, record_ids, out, store_dir):
+    """
+    Run a modality's chain per recording into `out`, reusing stored results.
+
+    Recordings are first inspected in a thread pool (store key and lookup,
+    mains detection; hashing and FFTs release the GIL). The chunks of every
+    recording that still needs preprocessing, each with the chain compiled
+    for that recording, then go to one pool together, so the workers are
+    busy even when a single recording gives a single chunk.
+    """
+    dtype = np.result_type(data, np.float32)
+    record_ids = np.asarray(record_ids) if record_ids is not None else None
+    segments = record_segments(record_ids, len(data))
+    n_jobs = getattr(config, 'PREPROCESS_N_JOBS', 1)
+    mode = getattr(config, 'FILTER_MODE', 'epoch')
+    auto_notch = any(_is_auto_notch(step) for step in steps)
+    detected = {}
+    n_stored = 0
+
+    def inspect(segment):
+        """(key, stored result, detected mains frequency) of one recording."""
+        recording = data[segment[0]:segment[1]]
+        key = stored = freq = None
+        if store_dir is not None:
+            key = preprocess_key(recording, signal_type, steps, fs, names, config)
+            stored = load_preprocessed(store_dir, key)
+        if stored is None and auto_notch:
+            freq = detect_powerline(recording, fs,
+                                    freqs=getattr(config, 'POWERLINE_FREQS', POWERLINE_FREQS),
+                                    threshold=getattr(config, 'POWERLINE_RATIO_THRESHOLD', 3.0))
+        return key, stored, freq
+
+    if n_jobs > 1 and len(segments) > 1:
+        with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+            inspected = list(executor.map(inspect, segments))
+    else:
+        inspected = [inspect(segment) for segment in segments]
+
+    tasks = []
+    pending = []
+    for (start, stop), (key, stored, freq) in zip(segments, inspected):
+        if stored is not None:
+            out[start:stop] = stored
+            n_stored += 1
+            continue
+        if auto_notch:
+            detected[freq] = detected.get(freq, 0) + 1
+
+        ops = compile_chain(resolve_auto_notch(steps, freq), fs, names, dtype)
+        ids = record_ids[start:stop] if record_ids is not None else None
+        for epochs, channels in _chain_chunks(data[start:stop], ops, mode, ids, n_jobs):
+            tasks.append((slice(start + epochs.start, start + epochs.stop), channels, ops))
+        pending.append((start, stop, key))
+
+    _run_chunks(data, tasks, config, record_ids, n_jobs,
+                getattr(config, 'PREPROCESS_BACKEND', 'thread'), out)
+    for start, stop, key in pending:
+        if key is not None:
+            save_preprocessed(store_dir, key, out[start:stop])
+
+    if detected:
+        found = ', '.join(f"{freq:g} Hz in {n}" if freq is not None else f"none in {n}"
+                          for freq, n in detected.items())
+        print(f"    Auto notch (mains interference per recording): {found}")
+    if store_dir is not None:
+        print(f"    {n_stored} of {len(segments)} recordings read from the preprocessing store")
+    return out
+
+def preprocess(data, config, record_ids=None, channel_info=None, inplace=False, out=None,
+               store_dir=None, return_channel_info=False, filter_state=None):
     """
     STUDENT IMPLEMENTATION AREA: Preprocess data based on current iteration.
 
@@ -41,73 +762,169 @@ def preprocess(data, config):
     Args:
         data: Either np.ndarray (single-channel) or dict (multi-channel)
         config (module): The configuration module.
+        record_ids (np.ndarray): Record ID per epoch, used by the continuous
+            filter modes to find recording boundaries (default None: all
+            epochs come from one recording)
+        channel_info (dict): Channel information from the data loader, for
+            sampling rates and channel names (default None: SHHS rates).
+            It is never modified.
+        inplace (bool): Overwrite the input arrays instead of allocating new
+            ones (default False). Halves peak memory; the caller's data is
+            lost unless a dtype conversion made a copy first.
+        out: Optional caller-supplied output, an array (single-channel) or a
+            dict of arrays per signal type (multi-channel)
+        store_dir (str): Preprocessing store directory (default None, no
+            store). Recordings whose modality was already preprocessed with
+            the same settings are read back from it.
+        return_channel_info (bool): Also return the channel information of
+            the preprocessed data (default False)
+        filter_state (dict): Filter states carried between consecutive
+            blocks of one recording, see preprocess_stream() (default None)
 
     Returns:
-        Same format as input: preprocessed data.
+        Same format as input: preprocessed data. With return_channel_info, a
+        tuple (preprocessed_data, channel_info) where channel_info is a copy
+        of the input one holding the sampling rates after any resampling
+        steps, so it describes the returned arrays.
+
+    Example:
+        >>> eeg, eeg_info = preprocess(eeg_data, config, record_ids, channel_info,
+        ...                            return_channel_info=True)
+        >>> get_sampling_rate(eeg_info, 'eeg')   # rate of `eeg`, e.g. 100.0
     """
     print(f"Preprocessing data for iteration {config.CURRENT_ITERATION}...")
 
     # Detect data format
     is_multi_channel = isinstance(data, dict) and 'eeg' in data
 
+    # Work in the configured signal dtype (no copy if it already matches)
+    dtype = get_signal_dtype(config)
+    if is_multi_channel:
+        data = {signal_type: signal.astype(dtype, copy=False) for signal_type, signal in data.items()}
+    else:
+        data = np.asarray(data).astype(dtype, copy=False)
+
     if is_multi_channel:
         print("Processing multi-channel data (EEG + EOG + EMG)")
-        return preprocess_multi_channel(data, config)
+        preprocessed_data = preprocess_multi_channel(data, config, record_ids, channel_info, inplace, out,
+                                                     store_dir, filter_state)
+        processed_types = list(preprocessed_data)
     else:
         print("Processing single-channel data (backward compatibility)")
-        return preprocess_single_channel(data, config)
+        preprocessed_data = preprocess_single_channel(data, config, record_ids, channel_info, inplace, out,
+                                                      store_dir, filter_state)
+        # Only iteration 1 runs the EEG chain on single-channel data
+        processed_types = ['eeg'] if config.CURRENT_ITERATION == 1 else []
+
+    if return_channel_info:
+        return preprocessed_data, _output_channel_info(channel_info, processed_types, config)
+    return preprocessed_data
 
 
-def preprocess_multi_channel(multi_channel_data, config):
+def preprocess_stream(blocks, config):
     """
-    Preprocess multi-channel data: 2 EEG + 2 EOG + 1 EMG channels.
-    Each channel type may have different sampling rates and require different processing.
+    Preprocess a stream of epoch blocks, one block at a time.
+
+    The blocks are consecutive pieces of one recording, and the result equals
+    preprocessing the full recording at once. In 'epoch' filter mode epochs
+    are independent anyway; in 'continuous' mode every filter carries its
+    state from one block to the next.
+
+    Streaming uses its own settings, config.STREAM_FILTER_MODE and
+    config.STREAM_PREPROCESSING_CHAIN, falling back to FILTER_MODE and
+    PREPROCESSING_CHAIN when they are not set, so the whole-recording
+    defaults can keep steps that cannot be streamed.
+
+    Steps that need the whole recording cannot be streamed and raise a
+    ValueError up front: 'zero_phase' filtering (the backward pass starts at
+    the end of the recording), resampling in 'continuous' mode (the
+    polyphase filter looks ahead across block boundaries), 'recording'
+    normalization and 'auto' notch frequencies (both use statistics of the
+    whole recording). Preprocess whole recordings with preprocess() instead.
+
+    Args:
+        blocks (iterable): (multi_channel_data, sampling_rates) tuples, e.g.
+            from data_loader.stream_holdout_data()
+        config (module): The configuration module.
+
+    Yields:
+        tuple: (preprocessed_data, sampling_rates) for each block, with the
+            rates after any resampling steps
+
+    Raises:
+        ValueError: If the configuration cannot be streamed, see above.
     """
-    preprocessed_data = {}
+    config = _stream_config(config)
+    _check_streamable(config)
+    filter_state = {}
+    for block, sampling_rates in blocks:
+        preprocessed, channel_info = preprocess(block, config, channel_info={'sampling_rates': sampling_rates},
+                                                return_channel_info=True, filter_state=filter_state)
+        yield preprocessed, channel_info['sampling_rates']
 
-    # Process EEG channels (2 channels)
-    eeg_data = multi_channel_data['eeg']
-    eeg_fs = 125  # Actual sampling rate: 125 Hz (TODO: Get from channel_info)
-    preprocessed_eeg = np.zeros_like(eeg_data)
 
-    for ch in range(eeg_data.shape[1]):
-        for epoch in range(eeg_data.shape[0]):
-            signal = eeg_data[epoch, ch, :]
-            # Apply EEG-specific preprocessing
-            filtered_signal = lowpass_filter(signal, config.LOW_PASS_FILTER_FREQ, eeg_fs)
-            # TODO: Students should add bandpass filter, artifact removal
-            preprocessed_eeg[epoch, ch, :] = filtered_signal
+def _stream_config(config):
+    """The config with the streaming filter mode and chain in place of the whole-recording ones."""
+    settings = {name: value for name, value in vars(config).items() if name.isupper()}
+    settings['FILTER_MODE'] = getattr(config, 'STREAM_FILTER_MODE', getattr(config, 'FILTER_MODE', 'epoch'))
+    settings['PREPROCESSING_CHAIN'] = getattr(config, 'STREAM_PREPROCESSING_CHAIN', config.PREPROCESSING_CHAIN)
+    return SimpleNamespace(**settings)
 
-    preprocessed_data['eeg'] = preprocessed_eeg
 
-    if config.CURRENT_ITERATION >= 2:  # EOG starts in iteration 2
-        # Process EOG channels (2 channels) - may need different filtering
-        eog_data = multi_channel_data['eog']
-        eog_fs = 50  # Actual sampling rate: 50 Hz (TODO: Get from channel_info)
-        preprocessed_eog = np.zeros_like(eog_data)
+def _check_streamable(config):
+    """Raise a ValueError if block-wise preprocessing would differ from whole recordings."""
+    mode = getattr(config, 'FILTER_MODE', 'epoch')
+    if mode == 'zero_phase':
+        raise ValueError("Filter mode 'zero_phase' needs whole recordings and cannot be streamed; "
+                         "use 'epoch' or 'continuous', or preprocess() the full recording")
+    for signal_type, steps in config.PREPROCESSING_CHAIN.items():
+        for step in steps:
+            if _is_auto_notch(step):
+                problem = "an 'auto' notch frequency"
+            elif step['step'] == 'normalize' and step.get('scope', 'epoch') == 'recording':
+                problem = "'recording' normalization"
+            elif step['step'] == 'resample' and mode == 'continuous':
+                problem = "resampling in 'continuous' mode"
+            else:
+                continue
+            raise ValueError(f"The {signal_type.upper()} streaming chain uses {problem}, which needs "
+                             f"whole recordings and cannot be streamed; set STREAM_PREPROCESSING_CHAIN "
+                             f"or preprocess() the full recording")
+
 
-        for ch in range(eog_data.shape[1]):
-            for epoch in range(eog_data.shape[0]):
-                signal = eog_data[epoch, ch, :]
-                # EOG may need different filter settings (preserve slow eye movements)
-                filtered_signal = lowpass_filter(signal, 30, eog_fs)  # Lower cutoff for EOG
-                preprocessed_eog[epoch, ch, :] = filtered_signal
+def _modality_state(filter_state, signal_type):
+    """The filter states of one modality within preprocess()'s filter_state, or None."""
+    return filter_state.setdefault(signal_type, {}) if filter_state is not None else None
 
-        preprocessed_data['eog'] = preprocessed_eog
+
+def preprocess_multi_channel(multi_channel_data, config, record_ids=None, channel_info=None,
+                             inplace=False, out=None, store_dir=None, filter_state=None):
+    """
+    Preprocess multi-channel data: 2 EEG + 2 EOG + 1 EMG channels.
+
+    Each modality runs its own chain from config.PREPROCESSING_CHAIN at its
+    own sampling rate (from channel_info), over all its channels at once.
+    """
+    preprocessed_data = {}
+    out = out if out is not None else {}
+
+    # Process EEG channels (2 channels)
+    # TODO: Students should add artifact removal
+    preprocessed_data['eeg'] = preprocess_modality(multi_channel_data['eeg'], 'eeg', config, channel_info,
+                                                   record_ids, out.get('eeg'), inplace, store_dir,
+                                                   _modality_state(filter_state, 'eeg'))
+
+    if config.CURRENT_ITERATION >= 2:  # EOG starts in iteration 2
+        # Process EOG channels (2 channels) - preserve slow eye movements
+        preprocessed_data['eog'] = preprocess_modality(multi_channel_data['eog'], 'eog', config, channel_info,
+                                                       record_ids, out.get('eog'), inplace, store_dir,
+                                                       _modality_state(filter_state, 'eog'))
 
     if config.CURRENT_ITERATION >= 3:  # EMG starts in iteration 3
-        # Process EMG channel (1 channel) - may need higher frequency preservation
-        emg_data = multi_channel_data['emg']
-        emg_fs = 125  # Actual sampling rate: 125 Hz (TODO: Get from channel_info)
-        preprocessed_emg = np.zeros_like(emg_data)
-
-        for epoch in range(emg_data.shape[0]):
-            signal = emg_data[epoch, 0, :]
-            # EMG needs higher frequency content preserved (muscle activity)
-            filtered_signal = lowpass_filter(signal, 70, emg_fs)  # Higher cutoff for EMG
-            preprocessed_emg[epoch, 0, :] = filtered_signal
-
-        preprocessed_data['emg'] = preprocessed_emg
+        # Process EMG channel (1 channel) - preserve muscle activity
+        preprocessed_data['emg'] = preprocess_modality(multi_channel_data['emg'], 'emg', config, channel_info,
+                                                       record_ids, out.get('emg'), inplace, store_dir,
+                                                       _modality_state(filter_state, 'emg'))
         print("Multi-channel preprocessing applied to EEG + EOG + EMG")
     elif config.CURRENT_ITERATION >= 2:
         print("Iteration 2: Processing EEG + EOG channels")
@@ -118,19 +935,19 @@ def preprocess_multi_channel(multi_channel_data, config):
     # - Channel-specific artifact removal
     # - Cross-channel artifact detection
     # - Signal quality assessment
-    # - Normalization per channel type
 
     return preprocessed_data
 
 
-def preprocess_single_channel(data, config):
+def preprocess_single_channel(data, config, record_ids=None, channel_info=None,
+                              inplace=False, out=None, store_dir=None, filter_state=None):
     """
     Backward compatibility for single-channel preprocessing.
     """
     if config.CURRENT_ITERATION == 1:
-        # EXAMPLE: Very basic low-pass filter (students should expand)
-        fs = 125  # Actual EEG sampling rate: 125 Hz (TODO: Get from data/config)
-        preprocessed_data = lowpass_filter(data, config.LOW_PASS_FILTER_FREQ, fs)
+        # EXAMPLE: the EEG chain from config.PREPROCESSING_CHAIN (students should expand)
+        preprocessed_data = preprocess_modality(data, 'eeg', config, channel_info, record_ids, out, inplace,
+                                                store_dir, _modality_state(filter_state, 'eeg'))
 
     elif config.CURRENT_ITERATION == 2:
         print("TODO: Implement enhanced preprocessing for iteration 2")
@@ -0,0 +1,197 @@
+"""
+Signal Quality Assessment
+
+Batched quality checks over whole epoch arrays. Every check runs on all
+epochs and channels of a modality at once and sets one bit in a uint8 flag
+array of shape (n_epochs, n_channels):
+
+    QA_FLAT               flat line (channel disconnected or saturated off)
+    QA_CLIPPED            many samples stuck at the channel's extreme values
+                          in the recording
+    QA_AMPLITUDE          epoch amplitude far above the channel's typical
+                          level in the recording
+    QA_POWERLINE          mains interference at any of the POWERLINE_FREQS
+                          (see powerline.py)
+    QA_EOG_CONTAMINATION  EEG channel strongly correlated with an EOG channel
+
+A flag value of 0 means the epoch passed every check. usable_epochs() turns
+the flags into one boolean per epoch, so feature extraction and training can
+skip bad epochs.
+
+The clipping limits and the typical amplitude are baselines of one
+recording: with record_ids, every recording is judged against its own
+channels, so a recording with a wider range or a higher gain does not hide
+the problems of another.
+"""
+
+import numpy as np
+from scipy.signal import resample_poly
+
+# Handle both package import and standalone execution
+try:
+    from .filters import design_resampler, resample_factors
+    from .powerline import powerline_epochs, POWERLINE_FREQS
+    from .utils import get_sampling_rate, record_segments
+except ImportError:
+    from filters import design_resampler, resample_factors
+    from powerline import powerline_epochs, POWERLINE_FREQS
+    from utils import get_sampling_rate, record_segments
+
+QA_FLAT = 1
+QA_CLIPPED = 2
+QA_AMPLITUDE = 4
+QA_POWERLINE = 8
+QA_EOG_CONTAMINATION = 16
+
+QA_FLAG_NAMES = {
+    QA_FLAT: 'flat',
+    QA_CLIPPED: 'clipped',
+    QA_AMPLITUDE: 'amplitude',
+    QA_POWERLINE: 'powerline',
+    QA_EOG_CONTAMINATION: 'eog_contamination',
+}
+
+# Defaults for the thresholds, used when config does not set them
+QA_DEFAULTS = {
+    'QA_FLAT_STD': 1e-7,          # V; below 0.1 uV the channel carries no signal
+    'QA_CLIP_FRACTION': 0.05,     # share of samples at the channel's min/max
+    'QA_AMPLITUDE_Z': 6.0,        # robust z-score of the epoch standard deviation
+    'POWERLINE_FREQS': POWERLINE_FREQS,  # Hz; candidate mains frequencies, shared with 'auto' notches
+    'QA_POWERLINE_RATIO': 5.0,    # powerline-to-baseline magnitude ratio of one epoch
+    'QA_EOG_CORRELATION': 0.9,    # |r| between an EEG and an EOG channel
+}
+
+def assess_signal_quality(multi_channel_data, channel_info=None, config=None, record_ids=None):
+    """
+    Compute per-epoch, per-channel quality flags for every modality.
+
+    Args:
+        multi_channel_data (dict): Arrays of shape (n_epochs, n_channels,
+            samples_per_epoch) per signal type, as returned by the loaders
+        channel_info (dict): Channel information with '<type>_fs' sampling
+            rates (default None: SHHS rates)
+        config (module): The configuration module; QA_* thresholds are read
+            from it when present (default None: QA_DEFAULTS)
+        record_ids (np.ndarray): Record ID per epoch; consecutive epochs with
+            the same ID form one recording (default None: one recording)
+
+    Returns:
+        dict: uint8 flag array of shape (n_epochs, n_channels) per signal
+            type; bits are the QA_* constants
+
+    Example:
+        >>> flags = assess_signal_quality(multi_channel_data, channel_info, config, record_ids)
+        >>> keep = usable_epochs(flags)
+        >>> features, labels = features[keep], labels[keep]
+    """
+    settings = {name: getattr(config, name, default) for name, default in QA_DEFAULTS.items()}
+
+    flags = {}
+    for signal_type, data in multi_channel_data.items():
+        fs = get_sampling_rate(channel_info, signal_type)
+        flags[signal_type] = _modality_flags(data, fs, settings, record_ids)
+
+    # Cross-channel check: EOG activity leaking into the EEG
+    if 'eeg' in multi_channel_data and 'eog' in multi_channel_data:
+        contaminated = _eog_contamination(multi_channel_data['eeg'], get_sampling_rate(channel_info, 'eeg'),
+                                          multi_channel_data['eog'], get_sampling_rate(channel_info, 'eog'),
+                                          settings['QA_EOG_CORRELATION'])
+        flags['eeg'] |= np.where(contaminated, QA_EOG_CONTAMINATION, 0).astype(np.uint8)
+
+    return flags
+
+
+def usable_epochs(flags, ignore=0):
+    """
+    Boolean mask of epochs without quality flags in any channel.
+
+    Args:
+        flags (dict): Flag arrays from assess_signal_quality()
+        ignore (int): Bitmask of QA_* flags to tolerate (default 0)
+
+    Returns:
+        np.ndarray: Boolean array of shape (n_epochs,), True for usable epochs
+    """
+    keep = None
+    for signal_flags in flags.values():
+        good = ~np.any(signal_flags & ~np.uint8(ignore), axis=1)
+        keep = good if keep is None else keep & good
+    return keep
+
+
+def summarize_quality(flags):
+    """
+    Count flagged epochs per signal type and check.
+
+    Args:
+        flags (dict): Flag arrays from assess_signal_quality()
+
+    Returns:
+        dict: signal type -> {flag name: number of epochs with the flag in any channel}
+    """
+    summary = {}
+    for signal_type, signal_flags in flags.items():
+        any_channel = np.bitwise_or.reduce(signal_flags, axis=1)
+        summary[signal_type] = {name: int(np.count_nonzero(any_channel & bit))
+                                for bit, name in QA_FLAG_NAMES.items()}
+    return summary
+
+
+def _modality_flags(data, fs, settings, record_ids=None):
+    """Single-modality checks over a (n_epochs, n_channels, samples) array."""
+    flags = np.zeros(data.shape[:2], dtype=np.uint8)
+    if data.shape[0] == 0:
+        return flags
+
+    std = data.std(axis=-1)
+    flags[std < settings['QA_FLAT_STD']] |= QA_FLAT
+
+    for start, stop in record_segments(record_ids, len(data)):
+        flags[start:stop] |= _recording_flags(data[start:stop], std[start:stop], settings)
+
+    # Powerline: interference at any candidate mains frequency, measured as for 'auto' notches
+    affected = powerline_epochs(data, fs, settings['POWERLINE_FREQS'], settings['QA_POWERLINE_RATIO'])
+    flags[affected] |= QA_POWERLINE
+
+    return flags
+
+
+def _recording_flags(data, std, settings):
+    """Checks against one recording's own per-channel baselines."""
+    flags = np.zeros(data.shape[:2], dtype=np.uint8)
+
+    # Clipping: samples at the channel's extremes over the recording
+    low = data.min(axis=(0, 2))[None, :, None]
+    high = data.max(axis=(0, 2))[None, :, None]
+    tolerance = 1e-6 * (high - low)
+    at_limits = (data <= low + tolerance) | (data >= high - tolerance)
+    clipped = at_limits.mean(axis=-1) > settings['QA_CLIP_FRACTION']
+    flags[clipped & (std >= settings['QA_FLAT_STD'])] |= QA_CLIPPED
+
+    # Amplitude outliers: robust z-score of the epoch std within each channel
+    median = np.median(std, axis=0)
+    mad = 1.4826 * np.median(np.abs(std - median), axis=0)
+    z = (std - median) / np.maximum(mad, np.finfo(std.dtype).tiny)
+    flags[z > settings['QA_AMPLITUDE_Z']] |= QA_AMPLITUDE
+
+    return flags
+
+
+def _eog_contamination(eeg, eeg_fs, eog, eog_fs, threshold):
+    """True for EEG channels/epochs whose |correlation| with any EOG channel exceeds threshold."""
+    if eeg.shape[0] == 0:
+        return np.zeros(eeg.shape[:2], dtype=bool)
+
+    # Bring the EEG to the EOG rate so samples line up
+    if eeg_fs != eog_fs:
+        up, down = resample_factors(eeg_fs, eog_fs)
+        eeg = resample_poly(eeg, up, down, axis=-1, window=design_resampler(up, down, np.result_type(eeg, np.float32)))
+    n = min(eeg.shape[-1], eog.shape[-1])
+
+    def standardize(x):
+        x = x[..., :n] - x[..., :n].mean(axis=-1, keepdims=True)
+        return x / np.maximum(np.linalg.norm(x, axis=-1, keepdims=True), np.finfo(x.dtype).tiny)
+
+    # (n_epochs, n_eeg, n_eog) correlations in one batched product
+    correlation = np.einsum('ecs,eds->ecd', standardize(eeg), standardize(eog))
+    return np.abs(correlation).max(axis=-1) > threshold
@@ -1,5 +1,9 @@
 import os
 import joblib
+import numpy as np
+
+# Sampling rates of the SHHS montage, used when no channel_info is given
+DEFAULT_SAMPLING_RATES = {'eeg': 125, 'eog': 50, 'emg': 125}
 
 def save_cache(data, filename, cache_dir):
     """
@@ -32,3 +36,56 @@ def load_cache(filename, cache_dir):
         return joblib.load(filepath)
     print(f"Cache file not found: {filepath}")
     return None
+
+def get_signal_dtype(config):
+    """
+    Returns the signal dtype configured for the pipeline.
+
+    Args:
+        config (module): The configuration module.
+
+    Returns:
+        np.dtype: config.SIGNAL_DTYPE, or float64 if it is not set.
+    """
+    return np.dtype(getattr(config, 'SIGNAL_DTYPE', 'float64'))
+
+def get_sampling_rate(channel_info, signal_type):
+    """
+    Returns the sampling rate of a signal type.
+
+    Args:
+        channel_info (dict): Channel information from the data loaders, either
+            with '<type>_fs' keys (training) or a 'sampling_rates' dict
+            (holdout and streamed blocks); may be None.
+        signal_type (str): 'eeg', 'eog' or 'emg'
+
+    Returns:
+        float: Sampling rate in Hz, or the SHHS default if channel_info
+            does not have it.
+    """
+    if channel_info is not None:
+        if f'{signal_type}_fs' in channel_info:
+            return channel_info[f'{signal_type}_fs']
+        if signal_type in channel_info.get('sampling_rates', {}):
+            return channel_info['sampling_rates'][signal_type]
+    return DEFAULT_SAMPLING_RATES[signal_type]
+
+def record_segments(record_ids, n_epochs):
+    """
+    Returns the epoch ranges of the recordings in an epoch array.
+
+    Args:
+        record_ids (np.ndarray): Record ID per epoch; consecutive epochs with
+            the same ID belong to one recording. May be None.
+        n_epochs (int): Number of epochs
+
+    Returns:
+        list: (start, stop) epoch ranges, one per recording; a single range
+            over all epochs if record_ids is None.
+    """
+    if record_ids is None or n_epochs == 0:
+        return [(0, n_epochs)]
+    record_ids = np.asarray(record_ids)
+    bounds = np.flatnonzero(record_ids[1:] != record_ids[:-1]) + 1
+    edges = np.concatenate([[0], bounds, [n_epochs]])
+    return list(zip(edges[:-1], edges[1:]))
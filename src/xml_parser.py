@@ -11,15 +11,50 @@ import xml.etree.ElementTree as ET
 import numpy as np
 
 
-def parse_xml_annotations(xml_file_path):
+# Sleep stage concept mappings (SDO ontology)
+STAGE_MAP = {
+    'SDO:NonRapidEyeMovementSleep-N1': 1,  # N1
+    'SDO:NonRapidEyeMovementSleep-N2': 2,  # N2
+    'SDO:NonRapidEyeMovementSleep-N3': 3,  # N3
+    'SDO:NonRapidEyeMovementSleep-N4': 3,  # N4 (rare, usually mapped to N3)
+    'SDO:RapidEyeMovementSleep': 4,        # REM
+    'SDO:WakeState': 0                      # Wake
+}
+
+
+# Columnar event table layouts (see parse_xml_annotations(as_table=True))
+EVENT_DTYPE = np.dtype([
+    ('concept', np.int32),       # index into the 'concepts' list
+    ('start', np.float64),
+    ('duration', np.float64),
+    ('desaturation', np.float64),  # NaN when absent
+    ('spo2_nadir', np.float64),    # NaN when absent
+])
+STAGE_DTYPE = np.dtype([
+    ('stage', np.int8),
+    ('start', np.float64),
+    ('duration', np.float64),
+])
+
+# Marks an absent <Text> element (an empty one has text None)
+_MISSING = object()
+
+
+def parse_xml_annotations(xml_file_path, as_table=False):
     """
     Parse XML annotation file to extract sleep stage labels.
 
     The XML file contains ScoredEvent elements with sleep stage classifications
     according to the SDO (Sleep Domain Ontology) standard.
 
+    The file is parsed incrementally with iterparse: each ScoredEvent is read
+    in a single pass over its children and then removed from its parent, so
+    the parsed tree never holds more than the event being read.
+
     Args:
         xml_file_path (str): Path to XML annotation file.
+        as_table (bool): Return events and stages as columnar structured
+            arrays instead of lists of dicts (default False).
 
     Returns:
         dict: Dictionary containing:
@@ -27,87 +62,144 @@ def parse_xml_annotations(xml_file_path):
             - 'stages': List of sleep stage events only
             - 'epoch_length': Epoch duration in seconds (typically 30)
 
+        With as_table=True, 'events' is a structured array with EVENT_DTYPE
+        (concept as a categorical code, NaN for missing desaturation and
+        SpO2 nadir values), 'stages' is a structured array with STAGE_DTYPE,
+        and 'concepts' lists the concept name for each code. Free-text
+        'text' fields are only available in the list output.
+
     Raises:
         FileNotFoundError: If XML file doesn't exist.
         ET.ParseError: If XML file is malformed.
+
+    Example:
+        >>> table = parse_xml_annotations('R1.xml', as_table=True)
+        >>> stages = table['stages']
+        >>> print(stages['duration'][stages['stage'] == 4].sum())  # seconds of REM
     """
+    # Extract epoch length (default 30 seconds)
+    epoch_length = 30
+    epoch_length_found = False
+
+    # Parsed event fields, one list per column (None when a field is absent)
+    concepts = []
+    starts = []
+    durations = []
+    desaturations = []
+    spo2_nadirs = []
+    texts = []
+
+    # Open elements, innermost last: the parent of each finished element
+    open_elements = []
+
     try:
-        tree = ET.parse(xml_file_path)
-        root = tree.getroot()
+        for event, elem in ET.iterparse(xml_file_path, events=('start', 'end')):
+            if event == 'start':
+                open_elements.append(elem)
+                continue
+            open_elements.pop()
+
+            if elem.tag == 'EpochLength' and not epoch_length_found:
+                epoch_length = float(elem.text)
+                epoch_length_found = True
+                continue
+
+            if elem.tag != 'ScoredEvent':
+                continue
+
+            # Collect child fields in one pass (first occurrence wins)
+            fields = {}
+            for child in elem:
+                fields.setdefault(child.tag, child.text)
+
+            # Detach the parsed event, so the tree does not grow with the file
+            if open_elements:
+                open_elements[-1].remove(elem)
+
+            # Skip events without concept, start time or duration
+            if 'EventConcept' not in fields or 'Start' not in fields or 'Duration' not in fields:
+                continue
+
+            concepts.append(fields['EventConcept'].strip())
+            starts.append(float(fields['Start']))
+            durations.append(float(fields['Duration']))
+
+            # Extract additional fields if present
+            desaturation = fields.get('Desaturation')
+            spo2_nadir = fields.get('SpO2Nadir')
+            desaturations.append(float(desaturation) if desaturation is not None else None)
+            spo2_nadirs.append(float(spo2_nadir) if spo2_nadir is not None else None)
+            texts.append(fields['Text'] if 'Text' in fields else _MISSING)
     except FileNotFoundError:
         raise FileNotFoundError(f"XML file not found: {xml_file_path}")
     except ET.ParseError as e:
         raise ET.ParseError(f"Failed to parse XML file {xml_file_path}: {e}")
 
-    # Extract epoch length (default 30 seconds)
-    epoch_length = 30
-    epoch_elements = root.findall('.//EpochLength')
-    if epoch_elements:
-        epoch_length = float(epoch_elements[0].text)
+    if as_table:
+        return _build_event_table(concepts, starts, durations, desaturations,
+                                  spo2_nadirs, epoch_length)
 
-    # Parse all scored events
     events = []
     stages = []
 
-    # Sleep stage concept mappings (SDO ontology)
-    stage_map = {
-        'SDO:NonRapidEyeMovementSleep-N1': 1,  # N1
-        'SDO:NonRapidEyeMovementSleep-N2': 2,  # N2
-        'SDO:NonRapidEyeMovementSleep-N3': 3,  # N3
-        'SDO:NonRapidEyeMovementSleep-N4': 3,  # N4 (rare, usually mapped to N3)
-        'SDO:RapidEyeMovementSleep': 4,        # REM
-        'SDO:WakeState': 0                      # Wake
-    }
-
-    scored_events = root.findall('.//ScoredEvent')
-
-    for event in scored_events:
-        # Extract event concept (sleep stage or other event type)
-        concept_elem = event.find('EventConcept')
-        if concept_elem is None:
-            continue
-
-        concept = concept_elem.text.strip()
-
-        # Extract start time and duration
-        start_elem = event.find('Start')
-        duration_elem = event.find('Duration')
-
-        if start_elem is None or duration_elem is None:
-            continue
-
-        start_time = float(start_elem.text)
-        duration = float(duration_elem.text)
-
+    for concept, start_time, duration, desaturation, spo2_nadir, text in zip(
+            concepts, starts, durations, desaturations, spo2_nadirs, texts):
         # Store all events
         event_dict = {
             'concept': concept,
             'start': start_time,
             'duration': duration
         }
-
-        # Extract additional fields if present
-        if event.find('Desaturation') is not None:
-            event_dict['desaturation'] = float(event.find('Desaturation').text)
-        if event.find('SpO2Nadir') is not None:
-            event_dict['spo2_nadir'] = float(event.find('SpO2Nadir').text)
-        if event.find('Text') is not None:
-            event_dict['text'] = event.find('Text').text
+        if desaturation is not None:
+            event_dict['desaturation'] = desaturation
+        if spo2_nadir is not None:
+            event_dict['spo2_nadir'] = spo2_nadir
+        if text is not _MISSING:
+            event_dict['text'] = text
 
         events.append(event_dict)
 
         # If this is a sleep stage event, add to stages list
-        if concept in stage_map:
-            stage_event = {
-                'stage': stage_map[concept],
+        if concept in STAGE_MAP:
+            stages.append({
+                'stage': STAGE_MAP[concept],
                 'start': start_time,
                 'duration': duration
-            }
-            stages.append(stage_event)
+            })
+
+    return {
+        'events': events,
+        'stages': stages,
+        'epoch_length': epoch_length
+    }
+
+
+def _build_event_table(concepts, starts, durations, desaturations, spo2_nadirs,
+                       epoch_length):
+    """Build the columnar output of parse_xml_annotations(as_table=True)."""
+    concept_names, concept_codes = np.unique(np.array(concepts, dtype=str), return_inverse=True)
+
+    events = np.empty(len(concepts), dtype=EVENT_DTYPE)
+    events['concept'] = concept_codes
+    events['start'] = starts
+    events['duration'] = durations
+    events['desaturation'] = np.array(desaturations, dtype=float)  # None -> NaN
+    events['spo2_nadir'] = np.array(spo2_nadirs, dtype=float)
+
+    # Stage code per concept (-1 for non-stage concepts), looked up per event
+    stage_codes = np.array([STAGE_MAP.get(name, -1) for name in concept_names], dtype=np.int8)
+    event_stages = stage_codes[concept_codes]
+    is_stage = event_stages >= 0
+
+    stages = np.empty(int(is_stage.sum()), dtype=STAGE_DTYPE)
+    stages['stage'] = event_stages[is_stage]
+    stages['start'] = events['start'][is_stage]
+    stages['duration'] = events['duration'][is_stage]
 
     return {
         'events': events,
         'stages': stages,
+        'concepts': concept_names.tolist(),
         'epoch_length': epoch_length
     }
 
@@ -116,8 +208,12 @@ def create_epoch_labels(stages, total_duration, epoch_length=30):
     """
     Convert variable-duration stage events to fixed-length epoch labels.
 
+    Labels are assigned with array operations over all stage events at once.
+    Where stage events overlap, the later event in the list wins.
+
     Args:
-        stages (list): List of stage events from parse_xml_annotations()
+        stages (list or np.ndarray): Stage events from parse_xml_annotations(),
+            either the list of dicts or the STAGE_DTYPE table
         total_duration (float): Total recording duration in seconds
         epoch_length (float): Epoch duration in seconds (default 30)
 
@@ -135,35 +231,61 @@ def create_epoch_labels(stages, total_duration, epoch_length=30):
     n_epochs = int(np.ceil(total_duration / epoch_length))
     labels = np.zeros(n_epochs, dtype=int)
 
-    for stage_event in stages:
-        stage = stage_event['stage']
-        start = stage_event['start']
-        duration = stage_event['duration']
+    if len(stages) == 0:
+        return labels
+
+    stage, start, duration = _stage_columns(stages)
 
-        # Calculate which epochs this stage covers
-        start_epoch = int(start / epoch_length)
-        end_time = start + duration
-        end_epoch = int(np.ceil(end_time / epoch_length))
+    # Calculate which epochs each stage covers
+    start_epoch = np.clip(np.trunc(start / epoch_length), 0, n_epochs).astype(int)
+    end_epoch = np.clip(np.ceil((start + duration) / epoch_length), 0, n_epochs).astype(int)
+    lengths = np.maximum(end_epoch - start_epoch, 0)
 
-        # Assign stage label to all epochs in this range
-        labels[start_epoch:end_epoch] = stage
+    # Expand every event into the epoch indices it covers
+    event_index = np.repeat(np.arange(len(stage)), lengths)
+    first_position = np.repeat(np.cumsum(lengths) - lengths, lengths)
+    epoch_index = np.repeat(start_epoch, lengths) + np.arange(lengths.sum()) - first_position
+
+    # The last event covering an epoch decides its label
+    owner = np.full(n_epochs, -1)
+    np.maximum.at(owner, epoch_index, event_index)
+    covered = owner >= 0
+    labels[covered] = stage[owner[covered]]
 
     return labels
 
 
-def validate_annotations(xml_file_path, edf_duration):
+def _stage_columns(stages):
+    """Return (stage, start, duration) arrays from a stage list or table."""
+    if isinstance(stages, np.ndarray):
+        return stages['stage'].astype(int), stages['start'], stages['duration']
+
+    stage = np.array([s['stage'] for s in stages], dtype=int)
+    start = np.array([s['start'] for s in stages], dtype=float)
+    duration = np.array([s['duration'] for s in stages], dtype=float)
+    return stage, start, duration
+
+
+def validate_annotations(annotations, edf_duration):
     """
     Validate that XML annotations match the EDF recording duration.
 
+    Gaps and overlaps are found with array operations over the stage start
+    and end times, sorted by start time.
+
     Args:
-        xml_file_path (str): Path to XML annotation file
-        edf_duration (float): Duration of EDF recording in seconds
+        annotations (str or dict): Path to XML annotation file, or the
+            output of parse_xml_annotations() (list or table form) to avoid
+            parsing the file again
+        edf_duration (float): Duration of EDF recording in seconds, or None
+            to skip the coverage check
 
     Returns:
         dict: Validation results with keys:
             - 'valid': bool, True if annotations cover the entire recording
             - 'annotation_duration': float, total duration of annotations
-            - 'coverage': float, percentage of recording covered (0-100)
+            - 'coverage': float, percentage of recording covered (0-100),
+              None if edf_duration is None
             - 'gaps': list of time gaps in annotations
             - 'overlaps': list of overlapping annotations
 
@@ -171,10 +293,12 @@ def validate_annotations(xml_file_path, edf_duration):
         >>> results = validate_annotations('R1.xml', 32400)  # 9 hours
         >>> print(f"Coverage: {results['coverage']:.1f}%")
     """
-    parsed = parse_xml_annotations(xml_file_path)
+    parsed = annotations
+    if not isinstance(parsed, dict):
+        parsed = parse_xml_annotations(annotations, as_table=True)
     stages = parsed['stages']
 
-    if not stages:
+    if len(stages) == 0:
         return {
             'valid': False,
             'annotation_duration': 0,
@@ -184,44 +308,45 @@ def validate_annotations(xml_file_path, edf_duration):
             'message': 'No sleep stage annotations found'
         }
 
-    # Sort stages by start time
-    stages = sorted(stages, key=lambda x: x['start'])
+    # Sort stages by start time (stable, so ties keep file order)
+    _, start, duration = _stage_columns(stages)
+    order = np.argsort(start, kind='stable')
+    start = start[order]
+    end = start + duration[order]
 
     # Calculate total annotated duration
-    last_event = stages[-1]
-    annotation_duration = last_event['start'] + last_event['duration']
+    annotation_duration = float(end[-1])
+
+    # Compare each stage's end with the next stage's start
+    current_end = end[:-1]
+    next_start = start[1:]
 
     # Check for gaps
-    gaps = []
-    for i in range(len(stages) - 1):
-        current_end = stages[i]['start'] + stages[i]['duration']
-        next_start = stages[i + 1]['start']
-
-        if next_start > current_end:
-            gaps.append({
-                'start': current_end,
-                'end': next_start,
-                'duration': next_start - current_end
-            })
+    gap_index = np.flatnonzero(next_start > current_end)
+    gaps = [{
+        'start': float(current_end[i]),
+        'end': float(next_start[i]),
+        'duration': float(next_start[i] - current_end[i])
+    } for i in gap_index]
 
     # Check for overlaps
-    overlaps = []
-    for i in range(len(stages) - 1):
-        current_end = stages[i]['start'] + stages[i]['duration']
-        next_start = stages[i + 1]['start']
-
-        if next_start < current_end:
-            overlaps.append({
-                'event1_end': current_end,
-                'event2_start': next_start,
-                'overlap_duration': current_end - next_start
-            })
+    overlap_index = np.flatnonzero(next_start < current_end)
+    overlaps = [{
+        'event1_end': float(current_end[i]),
+        'event2_start': float(next_start[i]),
+        'overlap_duration': float(current_end[i] - next_start[i])
+    } for i in overlap_index]
 
     # Calculate coverage
-    coverage = (annotation_duration / edf_duration) * 100 if edf_duration > 0 else 0
+    if edf_duration is None:
+        coverage = None
+        covered = True
+    else:
+        coverage = (annotation_duration / edf_duration) * 100 if edf_duration > 0 else 0
+        covered = coverage >= 99
 
     return {
-        'valid': len(gaps) == 0 and len(overlaps) == 0 and coverage >= 99,
+        'valid': len(gaps) == 0 and len(overlaps) == 0 and covered,
         'annotation_duration': annotation_duration,
         'edf_duration': edf_duration,
         'coverage': coverage,
@@ -231,6 +356,48 @@ def validate_annotations(xml_file_path, edf_duration):
     }
 
 
+def validate_annotation_directory(directory):
+    """
+    Validate every XML annotation file in a directory in one call.
+
+    Each annotation file is parsed once into the columnar table form. The
+    recording duration is read from the matching EDF header only (no
+    signal data); when there is no EDF file the coverage check is skipped.
+
+    Args:
+        directory (str): Directory containing R*.xml (and R*.edf) files
+
+    Returns:
+        dict: Validation results from validate_annotations() per record ID,
+            in file order
+
+    Example:
+        >>> results = validate_annotation_directory('data/training/')
+        >>> bad = [r for r, res in results.items() if not res['valid']]
+    """
+    import os
+    from glob import glob
+
+    try:
+        from .edf_reader import read_edf_header
+    except ImportError:
+        from edf_reader import read_edf_header
+
+    results = {}
+    for xml_file in sorted(glob(os.path.join(directory, '*.xml'))):
+        record_id = os.path.splitext(os.path.basename(xml_file))[0]
+        edf_file = os.path.splitext(xml_file)[0] + '.edf'
+
+        edf_duration = None
+        if os.path.exists(edf_file):
+            edf_duration = read_edf_header(edf_file)['duration']
+
+        parsed = parse_xml_annotations(xml_file, as_table=True)
+        results[record_id] = validate_annotations(parsed, edf_duration)
+
+    return results
+
+
 if __name__ == '__main__':
     # Example usage
     import sys
@@ -1,8 +1,20 @@
 # tests/__init__.py
 
+from .test_catalog import *
+from .test_channels import *
 from .test_config import *
 from .test_data_loader import *
+from .test_edf_reader import *
+from .test_epoch_store import *
+from .test_feature_extraction import *
+from .test_filters import *
 from .test_pipeline import *
 from .test_preprocessing import *
+from .test_quality import *
+from .test_powerline import *
+from .test_normalization import *
+from .test_preprocess_store import *
+from .test_derivations import *
+from .test_xml_parser import *
 
 __all__ = []
@@ -0,0 +1,124 @@
+"""
+Helpers for building small synthetic EDF/XML recordings in tests.
+
+The real PSG recordings are not shipped with the repository, so tests that
+exercise the loaders write tiny EDF files with known content instead.
+"""
+import numpy as np
+
+
+def write_edf(path, signals, n_records, record_duration=1.0):
+    """
+    Write a minimal EDF file.
+
+    Args:
+        path (str): Output file path
+        signals (list): List of dicts with keys 'label', 'fs', 'data' (1-D
+            physical values) and optionally 'dimension', 'physical_min',
+            'physical_max'
+        n_records (int): Number of data records
+        record_duration (float): Duration of one data record in seconds
+    """
+    n_signals = len(signals)
+    samples_per_record = [int(round(s['fs'] * record_duration)) for s in signals]
+
+    def field(value, width):
+        return str(value).ljust(width)[:width].encode('ascii')
+
+    header = b''.join([
+        field('0', 8),
+        field('X X X X', 80),
+        field('Startdate 01-JAN-2000 X X X', 80),
+        field('01.01.00', 8),
+        field('22.00.00', 8),
+        field(256 * (n_signals + 1), 8),
+        field('', 44),
+        field(n_records, 8),
+        field(record_duration, 8),
+        field(n_signals, 4),
+    ])
+
+    digital_min, digital_max = -32768, 32767
+    physical = []
+    for s in signals:
+        p_min = s.get('physical_min', -500.0)
+        p_max = s.get('physical_max', 500.0)
+        physical.append((p_min, p_max))
+
+    header += b''.join(field(s['label'], 16) for s in signals)
+    header += b''.join(field('', 80) for _ in signals)
+    header += b''.join(field(s.get('dimension', 'uV'), 8) for s in signals)
+    header += b''.join(field(p[0], 8) for p in physical)
+    header += b''.join(field(p[1], 8) for p in physical)
+    header += b''.join(field(digital_min, 8) for _ in signals)
+    header += b''.join(field(digital_max, 8) for _ in signals)
+    header += b''.join(field('', 80) for _ in signals)
+    header += b''.join(field(n, 8) for n in samples_per_record)
+    header += b''.join(field('', 32) for _ in signals)
+
+    digital = []
+    for s, n, (p_min, p_max) in zip(signals, samples_per_record, physical):
+        gain = (p_max - p_min) / (digital_max - digital_min)
+        values = np.asarray(s['data'], dtype=float)[:n * n_records]
+        d = np.round((values - p_min) / gain + digital_min)
+        d = np.clip(d, digital_min, digital_max).astype('<i2')
+        digital.append(d.reshape(n_records, n))
+
+    records = np.concatenate(digital, axis=1)
+
+    with open(path, 'wb') as f:
+        f.write(header)
+        f.write(records.tobytes())
+
+
+def write_annotations_xml(path, stages, epoch_length=30):
+    """
+    Write a Compumedics-style XML annotation file.
+
+    Args:
+        path (str): Output file path
+        stages (list): List of (concept, start, duration) tuples
+        epoch_length (int): Epoch length written to the header
+    """
+    events = ''.join(
+        '<ScoredEvent>'
+        f'<EventConcept>{concept}</EventConcept>'
+        f'<Start>{start}</Start>'
+        f'<Duration>{duration}</Duration>'
+        '</ScoredEvent>'
+        for concept, start, duration in stages
+    )
+    with open(path, 'w') as f:
+        f.write('<?xml version="1.0" encoding="ISO-8859-1"?>'
+                f'<PSGAnnotation><EpochLength>{epoch_length}</EpochLength>'
+                f'<ScoredEvents>{events}</ScoredEvents></PSGAnnotation>')
+
+
+def make_psg_signals(n_seconds, rng=None):
+    """
+    Build a PSG-like signal list: 2 EEG + 2 EOG + 1 EMG plus unused channels.
+
+    Args:
+        n_seconds (int): Recording length in seconds
+        rng (np.random.Generator): Random generator (default seed 0)
+
+    Returns:
+        list: Signal dicts suitable for write_edf()
+    """
+    rng = rng if rng is not None else np.random.default_rng(0)
+
+    def noise(fs, scale=50.0):
+        return rng.standard_normal(int(fs * n_seconds)) * scale
+
+    return [
+        {'label': 'SaO2', 'fs': 1, 'data': 95 + rng.standard_normal(n_seconds),
+         'dimension': '%', 'physical_min': 0.0, 'physical_max': 100.0},
+        {'label': 'EEG(sec)', 'fs': 125, 'data': noise(125)},
+        {'label': 'EEG', 'fs': 125, 'data': noise(125)},
+        {'label': 'EOG(L)', 'fs': 50, 'data': noise(50)},
+        {'label': 'EOG(R)', 'fs': 50, 'data': noise(50)},
+        {'label': 'EMG', 'fs': 125, 'data': noise(125, 20.0)},
+        {'label': 'ECG', 'fs': 125, 'data': noise(125, 200.0)},
+        {'label': 'POSITION', 'fs': 1, 'data': np.ones(n_seconds),
+         'dimension': '', 'physical_min': 0.0, 'physical_max': 3.0},
+    ]
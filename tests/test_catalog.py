@@ -0,0 +1,30 @@
+import os
+from src.catalog import build_catalog
+from tests.helpers import write_edf, write_annotations_xml, make_psg_signals
+
+
+def test_catalog_reads_headers_and_refreshes_changed_files(tmp_path, capsys):
+    for i, n_seconds in enumerate([90, 120]):
+        write_edf(str(tmp_path / f'R{i + 1}.edf'), make_psg_signals(n_seconds), n_records=n_seconds)
+    write_annotations_xml(str(tmp_path / 'R1.xml'), [('SDO:WakeState', 0, 30),
+                                                    ('SDO:NonRapidEyeMovementSleep-N2', 30, 60)])
+    cache_path = str(tmp_path / 'cache' / 'catalog.json')
+
+    catalog = build_catalog(str(tmp_path), cache_path=cache_path)
+
+    assert list(catalog) == ['R1', 'R2']
+    assert catalog['R1']['n_epochs'] == 2
+    assert catalog['R1']['sampling_rates']['EOG(L)'] == 50
+    assert catalog['R1']['stage_histogram'] == {'Wake': 1, 'N1': 0, 'N2': 1, 'N3': 0, 'REM': 0}
+    assert catalog['R2']['xml_file'] is None
+    assert catalog['R2']['stage_histogram'] is None
+    assert os.path.exists(cache_path)
+
+    # Only the rewritten recording is read again
+    write_edf(str(tmp_path / 'R2.edf'), make_psg_signals(150), n_records=150)
+    os.utime(str(tmp_path / 'R2.edf'), (1, 1))
+    capsys.readouterr()
+    catalog = build_catalog(str(tmp_path), cache_path=cache_path)
+
+    assert '(1 read, 1 cached)' in capsys.readouterr().out
+    assert catalog['R2']['n_epochs'] == 4
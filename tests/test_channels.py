@@ -0,0 +1,51 @@
+from src.channels import resolve_channel_plan, _resolve
+
+SHHS_CHANNELS = ['SaO2', 'H.R.', 'EEG(sec)', 'ECG', 'EMG', 'EOG(L)', 'EOG(R)',
+                 'EEG', 'THOR RES', 'ABDO RES', 'POSITION', 'LIGHT', 'NEW AIR', 'OX stat']
+SHHS_RATES = [1, 1, 125, 125, 125, 50, 50, 125, 10, 10, 1, 1, 10, 1]
+
+
+def test_resolve_channel_plan_groups():
+    plan = resolve_channel_plan(SHHS_CHANNELS)
+
+    assert plan['groups'] == {
+        'eeg': ['EEG(sec)', 'EEG'],
+        'eog': ['EOG(L)', 'EOG(R)'],
+        'emg': ['EMG'],
+        'ref': [],
+    }
+    assert plan['sampling_rates'] == {'eeg': None, 'eog': None, 'emg': None, 'ref': None}
+
+
+def test_resolve_channel_plan_rules():
+    channels = ['C3-A2', 'C4-A1', 'O1-A2', 'Fz', 'SpO2', 'EEG SaO2', 'Chin1-Chin2',
+                'EOG C3', 'EMG F3', 'Pleth']
+    plan = resolve_channel_plan(channels, [256] * 3 + [200] + [1] * 6)
+
+    # EOG/EMG take precedence over EEG electrode names; SaO2/SpO2 are not EEG
+    assert plan['groups']['eeg'] == ['C3-A2', 'C4-A1', 'O1-A2', 'Fz']
+    assert plan['groups']['eog'] == ['EOG C3']
+    assert plan['groups']['emg'] == ['Chin1-Chin2', 'EMG F3']
+    assert plan['sampling_rates'] == {'eeg': 256.0, 'eog': 1.0, 'emg': 1.0, 'ref': None}
+
+
+def test_resolve_channel_plan_separates_reference_electrodes():
+    # A montage that lists the mastoids first: they must not become EEG channel 0
+    plan = resolve_channel_plan(['M1', 'EEG M2-REF', 'EEG C3-REF', 'M1-M2', 'A1', 'C4-M1', 'ABDO RES', 'EMG1'],
+                                [200, 200, 200, 200, 200, 256, 10, 200])
+    assert plan['groups']['eeg'] == ['EEG C3-REF', 'C4-M1']
+    assert plan['groups']['ref'] == ['M1', 'EEG M2-REF', 'M1-M2', 'A1']
+    assert plan['sampling_rates']['ref'] == 200.0
+
+
+def test_resolve_channel_plan_memoized():
+    _resolve.cache_clear()
+
+    first = resolve_channel_plan(SHHS_CHANNELS, SHHS_RATES)
+    first['groups']['eeg'].append('modified')
+    second = resolve_channel_plan(SHHS_CHANNELS, SHHS_RATES)
+
+    info = _resolve.cache_info()
+    assert (info.hits, info.misses) == (1, 1)
+    assert second['groups']['eeg'] == ['EEG(sec)', 'EEG']
+    assert second['sampling_rates'] == {'eeg': 125.0, 'eog': 50.0, 'emg': 125.0, 'ref': None}
@@ -42,3 +42,131 @@ def test_load_holdout_data():
     assert isinstance(info, dict)
     assert 'n_epochs' in info
     assert info['n_epochs'] == 240
+
+def test_selective_reader_loads_native_rates(tmp_path):
+    from tests.helpers import write_edf, write_annotations_xml, make_psg_signals
+
+    edf_path = str(tmp_path / 'R1.edf')
+    xml_path = str(tmp_path / 'R1.xml')
+    write_edf(edf_path, make_psg_signals(120), n_records=120)
+    write_annotations_xml(xml_path, [('SDO:WakeState', 0, 60),
+                                     ('SDO:NonRapidEyeMovementSleep-N2', 60, 60)])
+
+    data, labels, info = load_training_data(edf_path, xml_path)
+
+    # Last partial epoch is dropped (duration is measured to the last sample)
+    assert data['eeg'].shape == (3, 2, 3750)
+    assert data['eog'].shape == (3, 2, 1500)
+    assert data['emg'].shape == (3, 1, 3750)
+    assert info['eog_fs'] == 50
+    assert info['eeg_names'] == ['EEG(sec)', 'EEG']
+    assert labels.tolist() == [0, 0, 2]
+
+    # Same EEG samples as decoding the whole file up front
+    preloaded, _, _ = load_training_data(edf_path, xml_path, reader='preload')
+    assert np.array_equal(data['eeg'], preloaded['eeg'])
+
+
+def test_native_reader_matches_selective(tmp_path):
+    from tests.helpers import write_edf, write_annotations_xml, make_psg_signals
+
+    edf_path = str(tmp_path / 'R1.edf')
+    xml_path = str(tmp_path / 'R1.xml')
+    write_edf(edf_path, make_psg_signals(120), n_records=120)
+    write_annotations_xml(xml_path, [('SDO:WakeState', 0, 120)])
+
+    selective, labels, _ = load_training_data(edf_path, xml_path)
+    native, native_labels, info = load_training_data(edf_path, xml_path, reader='native')
+
+    assert info['eog_fs'] == 50
+    assert np.array_equal(labels, native_labels)
+    for signal_type in ('eeg', 'eog', 'emg'):
+        assert np.allclose(native[signal_type], selective[signal_type])
+
+
+def test_load_all_training_data_parallel_matches_sequential(tmp_path):
+    from src.data_loader import load_all_training_data
+    from tests.helpers import write_edf, write_annotations_xml, make_psg_signals
+
+    for i, n_seconds in enumerate([90, 150, 120]):
+        rng = np.random.default_rng(i)
+        write_edf(str(tmp_path / f'R{i + 1}.edf'), make_psg_signals(n_seconds, rng), n_records=n_seconds)
+        write_annotations_xml(str(tmp_path / f'R{i + 1}.xml'), [('SDO:RapidEyeMovementSleep', 0, n_seconds)])
+
+    sequential = load_all_training_data(str(tmp_path), n_jobs=1)
+    parallel = load_all_training_data(str(tmp_path), n_jobs=2)
+
+    data, labels, record_ids, info = parallel
+    assert data['eeg'].shape == (2 + 4 + 3, 2, 3750)
+    assert record_ids.tolist() == ['R1'] * 2 + ['R2'] * 4 + ['R3'] * 3
+    assert np.all(labels == 4)
+    for signal_type in ('eeg', 'eog', 'emg'):
+        assert np.array_equal(data[signal_type], sequential[0][signal_type])
+
+
+def test_two_phase_assembly_fills_preallocated_arrays(tmp_path):
+    from src.data_loader import plan_training_data, assemble_training_data
+    from tests.helpers import write_edf, write_annotations_xml, make_psg_signals
+
+    for i, n_seconds in enumerate([90, 150]):
+        rng = np.random.default_rng(i)
+        write_edf(str(tmp_path / f'R{i + 1}.edf'), make_psg_signals(n_seconds, rng), n_records=n_seconds)
+        write_annotations_xml(str(tmp_path / f'R{i + 1}.xml'), [('SDO:WakeState', 0, n_seconds)])
+
+    plan = plan_training_data(str(tmp_path))
+    assert [r['n_epochs'] for r in plan['records']] == [2, 4]
+    assert plan['layout']['eog']['samples_per_epoch'] == 1500
+
+    data, labels, record_ids, info = assemble_training_data(plan, dtype=np.float32, reader='native')
+    reference, _, _ = load_training_data(str(tmp_path / 'R2.edf'), str(tmp_path / 'R2.xml'))
+
+    assert data['eeg'].dtype == np.float32
+    assert data['eeg'].flags.c_contiguous
+    assert record_ids.tolist() == ['R1'] * 2 + ['R2'] * 4
+    assert info['eog_fs'] == 50
+    assert np.allclose(data['eog'][2:], reference['eog'], atol=1e-9)
+
+
+def test_plan_reuses_cached_catalog(tmp_path, capsys):
+    from src.data_loader import plan_training_data
+    from src.edf_reader import read_edf_header
+    from src.xml_parser import parse_xml_annotations, create_epoch_labels
+    from tests.helpers import write_edf, write_annotations_xml, make_psg_signals
+
+    for i, n_seconds in enumerate([90, 150]):
+        write_edf(str(tmp_path / f'R{i + 1}.edf'), make_psg_signals(n_seconds), n_records=n_seconds)
+        write_annotations_xml(str(tmp_path / f'R{i + 1}.xml'), [('SDO:WakeState', 0, 60),
+                                                                ('SDO:RapidEyeMovementSleep', 60, 90)])
+    catalog_path = str(tmp_path / 'catalog.json')
+
+    first = plan_training_data(str(tmp_path), catalog_path=catalog_path)
+    capsys.readouterr()
+    second = plan_training_data(str(tmp_path), catalog_path=catalog_path)
+
+    assert '(0 read, 2 cached)' in capsys.readouterr().out
+    for record in second['records']:
+        header = read_edf_header(record['edf_file'])
+        stages = parse_xml_annotations(record['xml_file'])['stages']
+        expected = create_epoch_labels(stages, header['last_sample_time'])[:record['n_epochs']]
+        assert np.array_equal(record['labels'], expected)
+    assert [r['n_epochs'] for r in second['records']] == [2, 4]
+    assert second['layout'] == first['layout']
+    assert second['records'][1]['channel_groups'] == first['records'][1]['channel_groups']
+
+
+def test_channel_plan_has_rates_for_every_reader(tmp_path):
+    from src.data_loader import _open_edf, _channel_plan
+    from tests.helpers import write_edf, make_psg_signals
+
+    edf_path = str(tmp_path / 'R1.edf')
+    write_edf(edf_path, make_psg_signals(60), n_records=30, record_duration=2.0)
+
+    plans = {reader: _channel_plan(_open_edf(edf_path, reader))
+             for reader in ('selective', 'native', 'preload')}
+
+    for reader, plan in plans.items():
+        assert plan['sampling_rates'] == {'eeg': 125.0, 'eog': 50.0, 'emg': 125.0, 'ref': None}, reader
+        assert plan['groups'] == plans['native']['groups']
+    # Per channel, as in the EDF header (2 s data records)
+    native = _open_edf(edf_path, 'native')['sampling_rates']
+    assert _open_edf(edf_path, 'selective')['sampling_rates'] == native == [1, 125, 125, 50, 50, 125, 125, 1]
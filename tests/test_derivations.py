@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+from src.derivations import derivation_matrix, apply_derivations, derive_channels
+
+CHANNELS = ['EEG C3-REF', 'EEG C4-REF', 'EEG M1-REF', 'EEG M2-REF', 'O1-M2']
+
+
+def test_derivation_matrix():
+    matrix = derivation_matrix(['C4-M1', 'C3-(M1+M2)/2', 'O1-M2', 'c3'], CHANNELS)
+
+    assert np.array_equal(matrix, [[0, 1, -1, 0, 0],
+                                   [1, 0, -0.5, -0.5, 0],
+                                   [0, 0, 0, 0, 1],
+                                   [1, 0, 0, 0, 0]])
+
+
+def test_derivation_matrix_errors():
+    with pytest.raises(ValueError, match='not found'):
+        derivation_matrix(['F3-M2'], CHANNELS)
+    with pytest.raises(ValueError, match='ambiguous'):
+        derivation_matrix(['C3'], ['EEG C3-REF', 'C3-REF'])
+    with pytest.raises(ValueError, match='Malformed'):
+        derivation_matrix(['C3-(M1+M2)/3'], CHANNELS)
+    with pytest.raises(ValueError, match='Malformed'):
+        derivation_matrix(['C3-'], CHANNELS)
+
+
+def test_derive_channels_matches_per_channel_arithmetic():
+    data = np.random.default_rng(0).standard_normal((7, 5, 250)).astype(np.float32)
+
+    derived, names = derive_channels(data, CHANNELS, ['C4-M1', 'C3-(M1+M2)/2'])
+
+    assert names == ['C4-M1', 'C3-(M1+M2)/2']
+    assert derived.shape == (7, 2, 250) and derived.dtype == np.float32
+    assert np.allclose(derived[:, 0], data[:, 1] - data[:, 2], atol=1e-6)
+    assert np.allclose(derived[:, 1], data[:, 0] - (data[:, 2] + data[:, 3]) / 2, atol=1e-6)
+
+    out = np.empty((7, 2, 250), dtype=np.float32)
+    assert apply_derivations(data, derivation_matrix(names, CHANNELS), out=out) is out
+    assert np.array_equal(out, derived)
+
+
+@pytest.mark.parametrize('derivations', [None, ['EEG-EEG(sec)', 'EEG(sec)']])
+def test_training_and_holdout_see_same_eeg_channels(tmp_path, derivations):
+    from src.data_loader import load_training_data, load_holdout_data
+    from src.derivations import derive_eeg
+    from tests.helpers import write_edf, write_annotations_xml, make_psg_signals
+
+    edf_path = str(tmp_path / 'R1.edf')
+    xml_path = str(tmp_path / 'R1.xml')
+    write_edf(edf_path, make_psg_signals(120), n_records=120)
+    write_annotations_xml(xml_path, [('SDO:WakeState', 0, 120)])
+
+    training, _, channel_info = load_training_data(edf_path, xml_path)
+    holdout, record_info = load_holdout_data(edf_path)
+    training, training_names = derive_eeg(training, channel_info, derivations)
+    holdout, holdout_names = derive_eeg(holdout, record_info, derivations)
+
+    assert training_names == holdout_names == (derivations or ['EEG(sec)', 'EEG'])
+    assert np.array_equal(training['eeg'], holdout['eeg'])
+    assert training['eeg'].shape[1] == len(training_names)
+
+
+def test_reference_electrodes_only_feed_derivations(tmp_path):
+    from src.data_loader import load_training_data, load_holdout_data
+    from src.derivations import derive_eeg
+    from tests.helpers import write_edf, write_annotations_xml
+
+    # A montage that lists a mastoid before the EEG electrodes
+    rng = np.random.default_rng(4)
+    signals = [{'label': label, 'fs': fs, 'data': rng.standard_normal(fs * 60) * 50.0}
+               for label, fs in (('M1', 125), ('EEG C3', 125), ('EEG C4', 125), ('M2', 125),
+                                 ('EOG(L)', 50), ('EMG', 125))]
+    edf_path = str(tmp_path / 'R1.edf')
+    xml_path = str(tmp_path / 'R1.xml')
+    write_edf(edf_path, signals, n_records=60)
+    write_annotations_xml(xml_path, [('SDO:WakeState', 0, 60)])
+
+    raw, _, channel_info = load_training_data(edf_path, xml_path)
+    assert channel_info['eeg_names'] == ['EEG C3', 'EEG C4']
+    assert channel_info['ref_names'] == ['M1', 'M2']
+
+    recorded, names = derive_eeg(raw, channel_info, None)
+    assert names == ['EEG C3', 'EEG C4'] and 'ref' not in recorded
+    assert np.array_equal(recorded['eeg'], raw['eeg'])
+
+    derived, names = derive_eeg(raw, channel_info, ['C3-(M1+M2)/2', 'C4-M1'])
+    assert names == ['C3-(M1+M2)/2', 'C4-M1'] and 'ref' not in derived
+    m1, m2 = raw['ref'][:, 0], raw['ref'][:, 1]
+    assert np.allclose(derived['eeg'][:, 0], raw['eeg'][:, 0] - (m1 + m2) / 2)
+    assert np.allclose(derived['eeg'][:, 1], raw['eeg'][:, 1] - m1)
+
+    holdout, record_info = load_holdout_data(edf_path)
+    holdout, holdout_names = derive_eeg(holdout, record_info, ['C3-(M1+M2)/2', 'C4-M1'])
+    assert holdout_names == names
+    assert np.array_equal(holdout['eeg'], derived['eeg'])
@@ -0,0 +1,73 @@
+import numpy as np
+import mne
+import pytest
+from src.edf_reader import read_edf_header, open_edf_records, epoch_view, read_epochs
+from tests.helpers import write_edf, make_psg_signals
+
+
+def _write_recording(tmp_path, n_seconds=120, record_duration=1.0):
+    edf_path = str(tmp_path / 'R1.edf')
+    write_edf(edf_path, make_psg_signals(n_seconds),
+              n_records=int(n_seconds / record_duration),
+              record_duration=record_duration)
+    return edf_path
+
+
+def test_read_edf_header(tmp_path):
+    edf_path = _write_recording(tmp_path)
+    header = read_edf_header(edf_path)
+
+    assert header['n_records'] == 120
+    assert header['labels'][3] == 'EOG(L)'
+    assert header['sampling_rates'][3] == 50
+    assert header['duration'] == 120
+
+
+def test_epoch_view_points_into_file(tmp_path):
+    edf_path = _write_recording(tmp_path)
+    header = read_edf_header(edf_path)
+    records = open_edf_records(edf_path, header)
+
+    view = epoch_view(records, header, 3, epoch_length=30)
+
+    assert view.shape == (4, 30, 50)
+    assert view.dtype == np.int16
+    assert np.shares_memory(view, records)
+
+
+def test_read_epochs_matches_mne(tmp_path):
+    edf_path = _write_recording(tmp_path, record_duration=30.0)
+    channels = ['EOG(L)', 'EOG(R)']
+
+    epochs, fs = read_epochs(edf_path, channels, epoch_length=30, chunk_epochs=3)
+
+    raw = mne.io.read_raw_edf(edf_path, include=channels, verbose=False)
+    expected = raw.get_data().reshape(2, 4, 1500).transpose(1, 0, 2)
+    assert fs == 50
+    assert epochs.shape == (4, 2, 1500)
+    assert np.allclose(epochs, expected)
+
+def test_header_units_and_undefined_scaling(tmp_path):
+    n = 2 * 125
+    signals = [{'label': 'EEG', 'fs': 125, 'data': np.zeros(n), 'dimension': 'UV'},
+               {'label': 'EMG', 'fs': 125, 'data': np.zeros(n), 'dimension': 'nV'},
+               {'label': 'EOG', 'fs': 125, 'data': np.zeros(n), 'dimension': 'kV'},
+               {'label': 'SaO2', 'fs': 125, 'data': np.zeros(n), 'dimension': '%'}]
+    path = tmp_path / 'units.edf'
+    write_edf(str(path), signals, n_records=2)
+    # Give the EMG a zero digital range (digital_max == digital_min)
+    n_signals = len(signals)
+    with open(path, 'r+b') as f:
+        f.seek(256 + n_signals * (16 + 80 + 8 + 8 + 8 + 8) + 8 * 1)
+        f.write(b'-32768  ')
+
+    with pytest.warns(UserWarning) as record:
+        header = read_edf_header(str(path))
+    messages = ' '.join(str(w.message) for w in record)
+    assert "['EMG']" in messages and "'kV'" in messages and "'%'" not in messages
+
+    physical_range = 1000.0
+    assert np.isclose(header['gains'][0], physical_range / 65535 * 1e-6)  # case-insensitive
+    assert np.isfinite(header['gains']).all()
+    assert np.isclose(header['gains'][1], physical_range * 1e-9)          # digital range of 1
+    assert np.isclose(header['gains'][3], physical_range / 65535)        # not a voltage
@@ -0,0 +1,52 @@
+import numpy as np
+from src.data_loader import load_training_data, load_holdout_data
+from src.epoch_store import store_key
+from tests.helpers import write_edf, write_annotations_xml, make_psg_signals
+
+
+def _write_recording(tmp_path, name='R1'):
+    edf_path = str(tmp_path / f'{name}.edf')
+    xml_path = str(tmp_path / f'{name}.xml')
+    write_edf(edf_path, make_psg_signals(120), n_records=120)
+    write_annotations_xml(xml_path, [('SDO:NonRapidEyeMovementSleep-N3', 0, 120)])
+    return edf_path, xml_path
+
+
+def test_training_data_round_trips_through_store(tmp_path):
+    edf_path, xml_path = _write_recording(tmp_path)
+    store_dir = str(tmp_path / 'store')
+
+    decoded, labels, info = load_training_data(edf_path, xml_path, dtype=np.float32, store_dir=store_dir)
+    stored, stored_labels, stored_info = load_training_data(edf_path, xml_path, dtype=np.float32, store_dir=store_dir)
+
+    assert isinstance(stored['eeg'], np.memmap)
+    assert stored['eog'].dtype == np.float32
+    assert np.array_equal(stored['eog'], decoded['eog'])
+    assert np.array_equal(stored_labels, labels)
+    assert stored_info == info
+
+
+def test_store_key_changes_with_content_and_parameters(tmp_path):
+    edf_path, xml_path = _write_recording(tmp_path)
+    key = store_key(edf_path, xml_path, 30, np.float32)
+
+    assert store_key(edf_path, xml_path, 30, np.float32) == key
+    assert store_key(edf_path, xml_path, 20, np.float32) != key
+    assert store_key(edf_path, xml_path, 30, np.float64) != key
+
+    write_annotations_xml(xml_path, [('SDO:WakeState', 0, 120)])
+    assert store_key(edf_path, xml_path, 30, np.float32) != key
+
+
+def test_holdout_store_keeps_record_id(tmp_path):
+    edf_path, _ = _write_recording(tmp_path, 'H1')
+    store_dir = str(tmp_path / 'store')
+
+    load_holdout_data(edf_path, store_dir=store_dir)
+    copy_path = str(tmp_path / 'H2.edf')
+    with open(edf_path, 'rb') as src, open(copy_path, 'wb') as dst:
+        dst.write(src.read())
+    data, info = load_holdout_data(copy_path, store_dir=store_dir)
+
+    assert info['record_id'] == 'H2'
+    assert data['eeg'].shape == (3, 2, 3750)
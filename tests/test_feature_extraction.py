@@ -0,0 +1,93 @@
+import numpy as np
+from types import SimpleNamespace
+from src.preprocessing import preprocess
+from src.feature_extraction import extract_features
+
+
+def _config(dtype, iteration=1):
+    return SimpleNamespace(CURRENT_ITERATION=iteration, SIGNAL_DTYPE=dtype,
+                           PREPROCESSING_CHAIN={'eeg': [{'step': 'lowpass', 'cutoff': 40}]})
+
+
+def test_float32_features_match_float64():
+    rng = np.random.default_rng(0)
+    data = {'eeg': rng.standard_normal((10, 2, 3750)) * 50e-6}
+
+    features = {}
+    for dtype in ('float32', 'float64'):
+        config = _config(dtype)
+        preprocessed = preprocess(data, config)
+        assert preprocessed['eeg'].dtype == np.dtype(dtype)
+        features[dtype] = extract_features(preprocessed, config)
+
+    assert features['float32'].dtype == np.float32
+    assert features['float32'].shape == features['float64'].shape
+    assert np.allclose(features['float32'], features['float64'], rtol=1e-3, atol=1e-12)
+
+
+def test_streamed_features_match_full_recording(tmp_path):
+    from src.data_loader import load_holdout_data, stream_holdout_data
+    from src.preprocessing import preprocess_stream
+    from src.feature_extraction import extract_features_stream
+    from tests.helpers import write_edf, make_psg_signals
+
+    edf_path = str(tmp_path / 'H1.edf')
+    write_edf(edf_path, make_psg_signals(300), n_records=10, record_duration=30.0)
+    config = _config('float64')
+
+    blocks = list(stream_holdout_data(edf_path, block_epochs=4))
+    assert [block['eeg'].shape[0] for block, _ in blocks] == [4, 4, 1]
+    assert blocks[0][1]['eog'] == 50
+
+    streamed = extract_features_stream(preprocess_stream(iter(blocks), config), config)
+
+    data, _ = load_holdout_data(edf_path, reader='native')
+    full = extract_features(preprocess(data, config), config)
+    assert np.allclose(streamed, full)
+
+
+def _reference_features(epoch):
+    # The per-epoch definitions the batched engine must reproduce
+    import scipy.stats
+    d1, d2 = np.diff(epoch), np.diff(epoch, 2)
+    mobility = np.sqrt(np.var(d1) / np.var(epoch))
+    return [np.mean(epoch), np.median(epoch), np.std(epoch), np.var(epoch),
+            np.sqrt(np.mean(epoch ** 2)), np.min(epoch), np.max(epoch), np.ptp(epoch),
+            scipy.stats.skew(epoch), scipy.stats.kurtosis(epoch),
+            np.sum(np.diff(np.sign(epoch)) != 0), np.var(epoch), mobility,
+            np.sqrt(np.var(d2) / np.var(d1)) / mobility, np.sum(epoch ** 2), np.mean(epoch ** 2)]
+
+
+def test_time_domain_features_match_per_epoch_definitions():
+    from src.feature_extraction import time_domain_features, extract_time_domain_features, TIME_DOMAIN_FEATURES
+    data = np.random.default_rng(1).standard_normal((5, 2, 3750))
+
+    features = time_domain_features(data)
+
+    assert features.shape == (5, 2, len(TIME_DOMAIN_FEATURES))
+    for epoch in range(5):
+        for ch in range(2):
+            assert np.allclose(features[epoch, ch], _reference_features(data[epoch, ch]))
+    single = extract_time_domain_features(data[3, 1])
+    assert list(single) == list(TIME_DOMAIN_FEATURES)
+    assert np.allclose(list(single.values()), features[3, 1])
+
+
+def test_multi_channel_features_fill_preallocated_matrix():
+    rng = np.random.default_rng(2)
+    data = {'eeg': rng.standard_normal((4, 2, 3750)).astype(np.float32),
+            'eog': rng.standard_normal((4, 2, 1500)).astype(np.float32),
+            'emg': rng.standard_normal((4, 1, 3750)).astype(np.float32)}
+    config = SimpleNamespace(CURRENT_ITERATION=3, SIGNAL_DTYPE='float32')
+
+    from src.feature_extraction import extract_multi_channel_features, extract_eog_features, extract_emg_features
+    features = extract_multi_channel_features(data, config)
+
+    assert features.shape == (4, 2 * 16 + 2 * 3 + 3) and features.dtype == np.float32
+    expected = np.concatenate([_reference_features(data['eeg'][1, 0].astype(np.float64)),
+                               _reference_features(data['eeg'][1, 1].astype(np.float64)),
+                               list(extract_eog_features(data['eog'][1, 0]).values()),
+                               list(extract_eog_features(data['eog'][1, 1]).values()),
+                               list(extract_emg_features(data['emg'][1, 0]).values())])
+    assert np.allclose(features[1], expected, rtol=1e-5)
+    assert np.isclose(features[1, 32 + 2], np.ptp(data['eog'][1, 0]))
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+from scipy.signal import sosfilt, resample_poly
+from src.filters import design_filter, _design, design_resampler, resample_factors
+
+
+def test_design_filter_memoized():
+    _design.cache_clear()
+
+    first = design_filter('lowpass', 40, 125, order=5)
+    second = design_filter('lowpass', 40.0, 125.0, order=5)
+
+    assert first is second
+    assert _design.cache_info().misses == 1
+    assert first.shape == (3, 6)
+
+
+def test_design_filter_types():
+    bandpass = design_filter('bandpass', [0.5, 30], 125, order=4, dtype=np.float32)
+    assert bandpass.shape == (4, 6)
+    assert bandpass.dtype == np.float32
+
+    highpass = design_filter('highpass', 0.3, 125, order=2)
+    assert highpass.shape == (1, 6)
+
+    # The notch removes a 60 Hz tone but keeps 10 Hz
+    fs = 250
+    t = np.arange(0, 10, 1 / fs)
+    notch = np.array(design_filter('notch', 60, fs))   # writeable copy for sosfilt
+    tone_60 = sosfilt(notch, np.sin(2 * np.pi * 60 * t))[fs * 5:]
+    tone_10 = sosfilt(notch, np.sin(2 * np.pi * 10 * t))[fs * 5:]
+    assert np.std(tone_60) < 0.05
+    assert np.std(tone_10) > 0.65
+
+
+def test_design_filter_invalid():
+    with pytest.raises(ValueError):
+        design_filter('lowpass', 70, 125)  # Above Nyquist
+    with pytest.raises(ValueError):
+        design_filter('comb', 50, 125)
+
+
+def test_resampler_matches_resample_poly_default():
+    assert resample_factors(125, 100) == (4, 5)
+    assert resample_factors(50, 125.0) == (5, 2)
+
+    x = np.random.default_rng(0).standard_normal((3, 3750))
+    fir = design_resampler(4, 5)
+    assert design_resampler(4, 5) is fir
+    assert np.allclose(resample_poly(x, 4, 5, axis=-1, window=fir), resample_poly(x, 4, 5, axis=-1))
+
+
+def test_memoized_designs_are_read_only():
+    sos = design_filter('highpass', 0.3, 125)
+    fir = design_resampler(4, 5, np.float32)
+
+    for shared in (sos, fir):
+        with pytest.raises(ValueError, match='read-only'):
+            shared[0] = 0.0
+    assert not sos.flags.writeable and not fir.flags.writeable
+    # Every caller gets the same protected array
+    assert design_filter('highpass', 0.3, 125) is sos
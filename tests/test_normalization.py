@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+import src.normalization as normalization
+from src.normalization import recording_statistics, normalize_recordings
+
+
+def test_zscore_statistics_match_numpy():
+    data = np.random.default_rng(0).normal(3.0, 2.0, (600, 2, 250)).astype(np.float32)
+
+    center, scale = recording_statistics(data, 'zscore')
+
+    assert center.shape == scale.shape == (2,)
+    assert np.allclose(center, data.mean(axis=(0, 2), dtype=np.float64))
+    assert np.allclose(scale, data.std(axis=(0, 2), dtype=np.float64))
+
+
+def test_robust_statistics_exact_and_sampled(monkeypatch):
+    data = np.random.default_rng(1).laplace(1.0, 0.5, (300, 2, 100))
+    values = np.moveaxis(data, 1, 0).reshape(2, -1)
+    q1, median, q3 = np.quantile(values, (0.25, 0.5, 0.75), axis=1)
+
+    center, scale = recording_statistics(data, 'robust')
+    assert np.allclose(center, median) and np.allclose(scale, q3 - q1)
+
+    # Above the sample size the quantiles are estimated from a uniform sample
+    monkeypatch.setattr(normalization, 'QUANTILE_SAMPLES', 5000)
+    center, scale = recording_statistics(data, 'robust')
+    assert np.allclose(center, median, atol=0.05) and np.allclose(scale, q3 - q1, rtol=0.05)
+
+
+def test_normalize_recordings_per_recording_and_in_place():
+    rng = np.random.default_rng(2)
+    data = np.concatenate([rng.normal(0, 1, (4, 2, 500)), rng.normal(5, 100, (6, 2, 500))])
+    record_ids = np.array(['R1'] * 4 + ['R2'] * 6)
+
+    normalized = normalize_recordings(data, record_ids, method='zscore')
+    for rows in (slice(0, 4), slice(4, 10)):
+        assert np.allclose(normalized[rows].mean(axis=(0, 2)), 0, atol=1e-9)
+        assert np.allclose(normalized[rows].std(axis=(0, 2)), 1)
+
+    expected = normalize_recordings(data, record_ids, method='robust')
+    assert normalize_recordings(data, record_ids, method='robust', out=data) is data
+    assert np.allclose(data, expected)
+
+    with pytest.raises(ValueError):
+        recording_statistics(data, 'minmax')
@@ -0,0 +1,32 @@
+import numpy as np
+from src.powerline import powerline_ratios, analyze_powerline, detect_powerline
+
+
+def _epochs_with_mains(freq, amplitude, n_epochs=6, fs=125, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(30 * fs) / fs
+    return rng.standard_normal((n_epochs, 2, 30 * fs)) + amplitude * np.sin(2 * np.pi * freq * t)
+
+
+def test_powerline_ratios_cover_every_epoch():
+    data = _epochs_with_mains(60, 0.0)
+    data[2, 1] += np.sin(2 * np.pi * 50 * np.arange(3750) / 125)
+
+    ratios = powerline_ratios(data, 125)
+
+    assert set(ratios) == {50.0, 60.0}
+    assert ratios[50.0].shape == (6, 2)
+    assert np.argmax(ratios[50.0]) == np.ravel_multi_index((2, 1), (6, 2))
+    assert np.median(ratios[60.0]) < 3
+
+
+def test_powerline_ratios_skip_frequencies_above_nyquist():
+    ratios = analyze_powerline({'eog': np.zeros((2, 2, 1500))}, {'eog_fs': 50.0})
+    assert ratios == {'eog': {}}
+
+
+def test_detect_powerline():
+    assert detect_powerline(_epochs_with_mains(60, 0.5), 125) == 60.0
+    assert detect_powerline(_epochs_with_mains(50, 0.5), 125) == 50.0
+    assert detect_powerline(_epochs_with_mains(60, 0.0), 125) is None
+    assert detect_powerline(_epochs_with_mains(60, 0.5)[:, :, ::5], 25) is None
@@ -0,0 +1,65 @@
+import os
+from types import SimpleNamespace
+import numpy as np
+from src.preprocessing import preprocess
+from src.preprocess_store import preprocess_key
+
+
+def _config(emg_cutoff=10):
+    return SimpleNamespace(CURRENT_ITERATION=3, SIGNAL_DTYPE='float32', FILTER_MODE='zero_phase',
+                           PREPROCESSING_CHAIN={'eeg': [{'step': 'lowpass', 'cutoff': 40}],
+                                                'eog': [{'step': 'lowpass', 'cutoff': 15}],
+                                                'emg': [{'step': 'highpass', 'cutoff': emg_cutoff}]})
+
+
+def _recordings(seed=0):
+    rng = np.random.default_rng(seed)
+    data = {'eeg': rng.standard_normal((6, 2, 3750)).astype(np.float32),
+            'eog': rng.standard_normal((6, 2, 1500)).astype(np.float32),
+            'emg': rng.standard_normal((6, 1, 3750)).astype(np.float32)}
+    return data, np.repeat(['R1', 'R2'], 3)
+
+
+def _entries(store_dir):
+    return set(os.listdir(store_dir)) if os.path.exists(store_dir) else set()
+
+
+def test_store_matches_direct_preprocessing(tmp_path):
+    store_dir = str(tmp_path / 'store')
+    data, record_ids = _recordings()
+    expected = preprocess(data, _config(), record_ids)
+
+    first = preprocess(data, _config(), record_ids, store_dir=store_dir)
+    assert len(_entries(store_dir)) == 6  # 2 recordings x 3 modalities
+    second = preprocess(data, _config(), record_ids, store_dir=store_dir)
+
+    for signal_type in expected:
+        assert np.allclose(first[signal_type], expected[signal_type], atol=1e-5)
+        assert np.array_equal(second[signal_type], first[signal_type])
+
+
+def test_changed_modality_only_recomputes_that_modality(tmp_path):
+    store_dir = str(tmp_path / 'store')
+    data, record_ids = _recordings()
+    preprocess(data, _config(), record_ids, store_dir=store_dir)
+    before = _entries(store_dir)
+
+    preprocess(data, _config(emg_cutoff=20), record_ids, store_dir=store_dir)
+    assert len(_entries(store_dir) - before) == 2  # EMG of each recording
+
+    # A changed recording only misses its own entries
+    data['eeg'][4] += 1.0
+    preprocess(data, _config(emg_cutoff=20), record_ids, store_dir=store_dir)
+    assert len(_entries(store_dir) - before) == 3
+
+
+def test_preprocess_key_depends_on_settings():
+    data = np.zeros((2, 1, 3750), dtype=np.float32)
+    steps = [{'step': 'lowpass', 'cutoff': 40}]
+    key = preprocess_key(data, 'eeg', steps, 125, config=SimpleNamespace(FILTER_MODE='epoch'))
+
+    assert preprocess_key(data, 'eeg', steps, 125, config=SimpleNamespace(FILTER_MODE='epoch')) == key
+    assert preprocess_key(data, 'eeg', steps, 125, config=SimpleNamespace(FILTER_MODE='zero_phase')) != key
+    assert preprocess_key(data, 'eeg', steps, 250, config=SimpleNamespace(FILTER_MODE='epoch')) != key
+    assert preprocess_key(data.astype(np.float64), 'eeg', steps, 125,
+                          config=SimpleNamespace(FILTER_MODE='epoch')) != key
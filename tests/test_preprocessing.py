@@ -1,5 +1,11 @@
+from types import SimpleNamespace
+import os
+import subprocess
+import sys
 import numpy as np
-from src.preprocessing import lowpass_filter, preprocess
+import pytest
+from scipy.signal import butter, sosfilt, sosfiltfilt, resample_poly
+from src.preprocessing import lowpass_filter, filter_epochs, preprocess, compile_chain, apply_chain
 import config
 
 def test_lowpass_filter():
@@ -30,3 +36,397 @@ def test_preprocess_other_iteration():
     assert preprocessed_data.shape == eeg_data.shape
     # For other iterations, it should return raw data, so it should be very similar
     assert np.allclose(preprocessed_data, eeg_data) # Check if it's essentially the same
+
+def test_lowpass_filter_batched_matches_per_epoch():
+    # Filtering a whole (epochs, channels, samples) array at once must equal
+    # filtering every epoch/channel slice on its own
+    rng = np.random.default_rng(0)
+    data = rng.standard_normal((6, 2, 3750))
+    batched = lowpass_filter(data, 40, 125)
+
+    for epoch in range(data.shape[0]):
+        for ch in range(data.shape[1]):
+            expected = lowpass_filter(data[epoch, ch], 40, 125)
+            assert np.allclose(batched[epoch, ch], expected)
+
+def test_preprocess_multi_channel_batched():
+    cfg = SimpleNamespace(CURRENT_ITERATION=1, SIGNAL_DTYPE='float32',
+                          PREPROCESSING_CHAIN={'eeg': [{'step': 'lowpass', 'cutoff': 40}]})
+    data = {'eeg': np.random.randn(4, 2, 3750).astype(np.float32)}
+    preprocessed = preprocess(data, cfg)
+    assert preprocessed['eeg'].shape == data['eeg'].shape
+    assert preprocessed['eeg'].dtype == np.float32
+    assert np.allclose(preprocessed['eeg'][2, 1], lowpass_filter(data['eeg'][2, 1], 40, 125), atol=1e-5)
+
+def test_filter_epochs_zero_phase_per_recording():
+    # Two recordings of 4 and 3 epochs: each is filtered as one continuous signal
+    rng = np.random.default_rng(1)
+    epochs = rng.standard_normal((7, 2, 3750))
+    record_ids = np.array(['R1'] * 4 + ['R2'] * 3)
+    cfg = SimpleNamespace(FILTER_MODE='zero_phase')
+
+    filtered = filter_epochs(epochs, 40, 125, cfg, record_ids)
+
+    sos = butter(5, 40 / 62.5, btype='low', output='sos')
+    for rows in (slice(0, 4), slice(4, 7)):
+        continuous = epochs[rows].transpose(1, 0, 2).reshape(2, -1)
+        expected = sosfiltfilt(sos, continuous, axis=-1).reshape(2, -1, 3750).transpose(1, 0, 2)
+        assert np.allclose(filtered[rows], expected)
+
+def test_filter_epochs_continuous_single_channel():
+    rng = np.random.default_rng(2)
+    epochs = rng.standard_normal((5, 3750)).astype(np.float32)
+    cfg = SimpleNamespace(FILTER_MODE='continuous')
+
+    filtered = filter_epochs(epochs, 40, 125, cfg)
+
+    sos = butter(5, 40 / 62.5, btype='low', output='sos')
+    expected = sosfilt(sos, epochs.astype(np.float64).ravel()).reshape(epochs.shape)
+    assert filtered.dtype == np.float32
+    assert np.allclose(filtered, expected, atol=1e-4)
+
+def test_filter_epochs_invalid_mode():
+    with pytest.raises(ValueError):
+        filter_epochs(np.zeros((2, 3750)), 40, 125, SimpleNamespace(FILTER_MODE='fft'))
+
+def test_compile_chain_fuses_filters():
+    steps = [{'step': 'highpass', 'cutoff': 0.3, 'order': 2},
+             {'step': 'lowpass', 'cutoff': 40},
+             {'step': 'notch', 'freq': 60},
+             {'step': 'normalize'}]
+    ops = compile_chain(steps, fs=125)
+
+    assert [op for op, _ in ops] == ['filter', 'normalize']
+    assert ops[0][1].shape == (1 + 3 + 1, 6)
+
+    # One fused pass equals the filters applied one after another
+    data = np.random.default_rng(3).standard_normal((3, 2, 3750))
+    cfg = SimpleNamespace(FILTER_MODE='epoch')
+    fused = apply_chain(data, ops[:1], cfg)
+    sequential = data
+    for step in steps[:3]:
+        sequential = apply_chain(sequential, compile_chain([step], fs=125), cfg)
+    assert np.allclose(fused, sequential)
+
+def test_compile_chain_nyquist():
+    # At 50 Hz (EOG) a 30 Hz lowpass is dropped and a 0.3-30 Hz bandpass becomes a highpass
+    assert compile_chain([{'step': 'lowpass', 'cutoff': 30}], fs=50) == []
+    ops = compile_chain([{'step': 'bandpass', 'cutoff': (0.3, 30), 'order': 2}], fs=50)
+    assert len(ops) == 1 and ops[0][1].shape == (1, 6)
+
+    with pytest.raises(ValueError):
+        compile_chain([{'step': 'wavelet'}], fs=125)
+
+def test_apply_chain_rereference_and_normalize():
+    data = np.random.default_rng(4).standard_normal((2, 3, 100)) + 5
+    cfg = SimpleNamespace(FILTER_MODE='epoch')
+
+    averaged = apply_chain(data, compile_chain([{'step': 'rereference'}], fs=125), cfg)
+    assert np.allclose(averaged.mean(axis=1), 0)
+
+    ops = compile_chain([{'step': 'rereference', 'reference': 'C'}], fs=125, channel_names=['A', 'B', 'C'])
+    assert np.allclose(apply_chain(data, ops, cfg)[:, 2], 0)
+
+    normalized = apply_chain(data, compile_chain([{'step': 'normalize'}], fs=125), cfg)
+    assert np.allclose(normalized.mean(axis=-1), 0, atol=1e-9)
+    assert np.allclose(normalized.std(axis=-1), 1)
+
+def test_preprocess_reads_fs_from_channel_info():
+    cfg = SimpleNamespace(CURRENT_ITERATION=3, SIGNAL_DTYPE='float64', FILTER_MODE='epoch',
+                          PREPROCESSING_CHAIN={'eeg': [{'step': 'lowpass', 'cutoff': 40}],
+                                               'eog': [{'step': 'lowpass', 'cutoff': 15}],
+                                               'emg': [{'step': 'highpass', 'cutoff': 10}]})
+    rng = np.random.default_rng(5)
+    data = {'eeg': rng.standard_normal((2, 2, 7500)),
+            'eog': rng.standard_normal((2, 2, 3000)),
+            'emg': rng.standard_normal((2, 1, 7500))}
+    channel_info = {'eeg_fs': 250.0, 'eog_fs': 100.0, 'emg_fs': 250.0}
+
+    preprocessed = preprocess(data, cfg, channel_info=channel_info)
+
+    assert np.allclose(preprocessed['eeg'], lowpass_filter(data['eeg'], 40, 250))
+    assert np.allclose(preprocessed['eog'], lowpass_filter(data['eog'], 15, 100))
+    assert preprocessed['emg'].shape == data['emg'].shape
+
+def test_preprocess_resamples_and_returns_channel_info():
+    cfg = SimpleNamespace(CURRENT_ITERATION=2, SIGNAL_DTYPE='float32', FILTER_MODE='epoch',
+                          PREPROCESSING_CHAIN={'eeg': [{'step': 'resample', 'fs': 100},
+                                                       {'step': 'lowpass', 'cutoff': 40}],
+                                               'eog': [{'step': 'resample', 'fs': 125}]})
+    rng = np.random.default_rng(6)
+    data = {'eeg': rng.standard_normal((3, 2, 3750)), 'eog': rng.standard_normal((3, 2, 1500))}
+    channel_info = {'eeg_fs': 125.0, 'eog_fs': 50.0}
+
+    preprocessed, output_info = preprocess(data, cfg, channel_info=channel_info, return_channel_info=True)
+
+    assert preprocessed['eeg'].shape == (3, 2, 3000)
+    assert preprocessed['eog'].shape == (3, 2, 3750)
+    assert preprocessed['eeg'].dtype == np.float32
+    assert output_info == {'eeg_fs': 100.0, 'eog_fs': 125.0}
+    # The caller's channel_info still describes the raw data, so a second
+    # run resamples again
+    assert channel_info == {'eeg_fs': 125.0, 'eog_fs': 50.0}
+    again = preprocess(data, cfg, channel_info=channel_info)
+    assert again['eeg'].shape == (3, 2, 3000)
+    assert np.array_equal(again['eeg'], preprocessed['eeg'])
+    # The lowpass after the resample is designed at the new rate
+    expected = lowpass_filter(resample_poly(data['eeg'], 4, 5, axis=-1), 40, 100)
+    assert np.allclose(preprocessed['eeg'], expected, atol=1e-4)
+
+def test_resample_continuous_per_recording():
+    cfg = SimpleNamespace(FILTER_MODE='zero_phase')
+    epochs = np.random.default_rng(7).standard_normal((5, 1500))
+    record_ids = np.array(['R1'] * 2 + ['R2'] * 3)
+
+    resampled = apply_chain(epochs, compile_chain([{'step': 'resample', 'fs': 125}], fs=50), cfg, record_ids)
+
+    assert resampled.shape == (5, 3750)
+    expected = resample_poly(epochs[2:].ravel(), 5, 2).reshape(3, 3750)
+    assert np.allclose(resampled[2:], expected)
+
+@pytest.mark.parametrize('backend', ['thread', 'process'])
+@pytest.mark.parametrize('mode', ['epoch', 'zero_phase'])
+def test_apply_chain_parallel_matches_sequential(backend, mode):
+    from src.preprocessing import apply_chain_parallel
+    cfg = SimpleNamespace(FILTER_MODE=mode)
+    rng = np.random.default_rng(8)
+    data = rng.standard_normal((9, 2, 3750)).astype(np.float32)
+    record_ids = np.array(['R1'] * 4 + ['R2'] * 3 + ['R3'] * 2)
+    ops = compile_chain([{'step': 'bandpass', 'cutoff': (0.3, 35)},
+                         {'step': 'resample', 'fs': 100},
+                         {'step': 'normalize'}], fs=125, dtype=np.float32)
+
+    expected = apply_chain(data, ops, cfg, record_ids)
+    parallel = apply_chain_parallel(data, ops, cfg, record_ids, n_jobs=3, backend=backend)
+
+    assert parallel.shape == expected.shape == (9, 2, 3000)
+    assert parallel.dtype == np.float32
+    assert np.allclose(parallel, expected, atol=1e-5)
+
+@pytest.mark.parametrize('start_method', ['fork', 'spawn'])
+def test_apply_chain_parallel_leaves_resource_tracker_clean(start_method):
+    # The tracker reports unregistering unknown blocks (KeyError) or leaked
+    # blocks on its own stderr, so run the process backend in a fresh
+    # interpreter and check everything it printed
+    script = f"""
+import multiprocessing
+import numpy as np
+from types import SimpleNamespace
+from src.preprocessing import apply_chain_parallel, compile_chain
+
+if __name__ == '__main__':
+    multiprocessing.set_start_method({start_method!r})
+    data = np.random.default_rng(0).standard_normal((6, 2, 1000))
+    ops = compile_chain([{{'step': 'lowpass', 'cutoff': 30}}], fs=125)
+    apply_chain_parallel(data, ops, SimpleNamespace(FILTER_MODE='epoch'), n_jobs=2, backend='process')
+"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, '-c', script], cwd=root, capture_output=True, text=True,
+                            timeout=120)
+    assert result.returncode == 0, result.stderr
+    assert 'resource_tracker' not in result.stderr
+    assert 'KeyError' not in result.stderr
+
+@pytest.mark.parametrize('mode', ['epoch', 'zero_phase'])
+def test_apply_chain_inplace_and_out(mode):
+    from src.preprocessing import apply_chain_parallel
+    cfg = SimpleNamespace(FILTER_MODE=mode)
+    rng = np.random.default_rng(9)
+    data = rng.standard_normal((5, 3, 3750))
+    ops = compile_chain([{'step': 'highpass', 'cutoff': 0.5}, {'step': 'rereference'},
+                         {'step': 'lowpass', 'cutoff': 30}, {'step': 'normalize'}], fs=125)
+    expected = apply_chain(data, ops, cfg)
+
+    # Caller-supplied output; the input is left untouched
+    original = data.copy()
+    out = np.empty_like(data)
+    assert apply_chain(data, ops, cfg, out=out) is out
+    assert np.allclose(out, expected)
+    assert np.array_equal(data, original)
+
+    # In place: the input buffer is the result
+    buffer = data.copy()
+    assert apply_chain(buffer, ops, cfg, inplace=True) is buffer
+    assert np.allclose(buffer, expected)
+
+    buffer = data.copy()
+    assert apply_chain_parallel(buffer, ops, cfg, n_jobs=2, inplace=True) is buffer
+    assert np.allclose(buffer, expected)
+
+def test_apply_chain_inplace_errors():
+    cfg = SimpleNamespace(FILTER_MODE='epoch')
+    ops = compile_chain([{'step': 'lowpass', 'cutoff': 30}], fs=125)
+    data = np.zeros((2, 3750))
+
+    read_only = data.copy()
+    read_only.flags.writeable = False
+    with pytest.raises(ValueError):
+        apply_chain(read_only, ops, cfg, inplace=True)
+    with pytest.raises(ValueError):
+        apply_chain(data, ops, cfg, out=np.empty((2, 100)))
+
+def test_preprocess_inplace_multi_channel():
+    cfg = SimpleNamespace(CURRENT_ITERATION=2, SIGNAL_DTYPE='float32', FILTER_MODE='zero_phase',
+                          PREPROCESSING_CHAIN={'eeg': [{'step': 'lowpass', 'cutoff': 40}],
+                                               'eog': [{'step': 'lowpass', 'cutoff': 15}]})
+    rng = np.random.default_rng(10)
+    data = {'eeg': rng.standard_normal((4, 2, 3750)).astype(np.float32),
+            'eog': rng.standard_normal((4, 2, 1500)).astype(np.float32)}
+    expected = preprocess({k: v.copy() for k, v in data.items()}, cfg)
+
+    result = preprocess(data, cfg, inplace=True)
+
+    assert result['eeg'] is data['eeg'] and result['eog'] is data['eog']
+    assert np.allclose(result['eeg'], expected['eeg'], atol=1e-5)
+    assert np.allclose(result['eog'], expected['eog'], atol=1e-5)
+
+def test_lowpass_filter_out():
+    data = np.random.default_rng(11).standard_normal((600, 2, 500))
+    expected = lowpass_filter(data, 40, 125)
+    assert lowpass_filter(data, 40, 125, out=data) is data
+    assert np.allclose(data, expected)
+
+def test_auto_notch_uses_detected_powerline_frequency():
+    from src.preprocessing import resolve_auto_notch
+    steps = [{'step': 'notch', 'freq': 'auto'}, {'step': 'lowpass', 'cutoff': 40}]
+    assert resolve_auto_notch(steps, 50.0)[0] == {'step': 'notch', 'freq': 50.0}
+    assert resolve_auto_notch(steps, None) == steps[1:]
+    with pytest.raises(ValueError):
+        compile_chain(steps, fs=125)
+
+    # Each recording gets the notch of its own mains frequency
+    t = np.arange(3750) / 125
+    rng = np.random.default_rng(10)
+    clean = rng.standard_normal((6, 2, 3750))
+    noisy = clean.copy()
+    noisy[:2] += 0.5 * np.sin(2 * np.pi * 50 * t)
+    noisy[2:4] += 0.5 * np.sin(2 * np.pi * 60 * t)
+    record_ids = np.repeat(['R1', 'R2', 'R3'], 2)
+
+    cfg = SimpleNamespace(CURRENT_ITERATION=1, SIGNAL_DTYPE='float64', FILTER_MODE='epoch',
+                          PREPROCESSING_CHAIN={'eeg': [{'step': 'notch', 'freq': 'auto'}]})
+    filtered = preprocess({'eeg': noisy}, cfg, record_ids, channel_info={'eeg_fs': 125.0})['eeg']
+    for rows, freq in ((slice(0, 2), 50.0), (slice(2, 4), 60.0)):
+        ops = compile_chain([{'step': 'notch', 'freq': freq}], fs=125)
+        assert np.allclose(filtered[rows], apply_chain(noisy[rows], ops, cfg))
+    assert np.allclose(filtered[4:], noisy[4:])
+
+def test_recording_normalization_in_chain():
+    from src.preprocessing import apply_chain_parallel
+    from src.normalization import normalize_recordings
+    cfg = SimpleNamespace(FILTER_MODE='epoch')
+    rng = np.random.default_rng(11)
+    data = rng.standard_normal((9, 2, 750)) * np.repeat([1.0, 50.0, 0.2], 3)[:, None, None]
+    record_ids = np.array(['R1'] * 3 + ['R2'] * 3 + ['R3'] * 3)
+    ops = compile_chain([{'step': 'lowpass', 'cutoff': 30},
+                         {'step': 'normalize', 'scope': 'recording', 'method': 'robust'}], fs=125)
+
+    expected = normalize_recordings(apply_chain(data, ops[:1], cfg), record_ids, 'robust')
+    assert np.allclose(apply_chain(data, ops, cfg, record_ids), expected)
+    # Parallel chunks keep recordings whole, so the statistics are the same
+    assert np.allclose(apply_chain_parallel(data, ops, cfg, record_ids, n_jobs=4), expected)
+
+    with pytest.raises(ValueError):
+        compile_chain([{'step': 'normalize', 'scope': 'dataset'}], fs=125)
+
+@pytest.mark.parametrize('mode', ['epoch', 'continuous'])
+def test_preprocess_stream_matches_full_recording(mode):
+    from src.preprocessing import preprocess_stream
+    cfg = SimpleNamespace(CURRENT_ITERATION=3, SIGNAL_DTYPE='float64', FILTER_MODE=mode,
+                          PREPROCESSING_CHAIN={'eeg': [{'step': 'notch', 'freq': 60},
+                                                       {'step': 'lowpass', 'cutoff': 35}],
+                                               'eog': [{'step': 'highpass', 'cutoff': 0.3},
+                                                       {'step': 'normalize'},
+                                                       {'step': 'lowpass', 'cutoff': 15}],
+                                               'emg': [{'step': 'highpass', 'cutoff': 10}]})
+    rng = np.random.default_rng(12)
+    data = {'eeg': rng.standard_normal((40, 2, 3750)),
+            'eog': rng.standard_normal((40, 2, 1500)),
+            'emg': rng.standard_normal((40, 1, 3750))}
+    rates = {'eeg': 125.0, 'eog': 50.0, 'emg': 125.0}
+    blocks = [({signal_type: signal[start:start + 10] for signal_type, signal in data.items()}, rates)
+              for start in range(0, 40, 10)]
+
+    streamed = list(preprocess_stream(iter(blocks), cfg))
+    full = preprocess(data, cfg, channel_info={'sampling_rates': rates})
+
+    for signal_type in data:
+        joined = np.concatenate([block[signal_type] for block, _ in streamed])
+        assert np.allclose(joined, full[signal_type], atol=1e-10)
+
+@pytest.mark.parametrize('mode, chain', [
+    ('zero_phase', [{'step': 'lowpass', 'cutoff': 35}]),
+    ('continuous', [{'step': 'notch', 'freq': 'auto'}]),
+    ('continuous', [{'step': 'normalize', 'scope': 'recording'}]),
+    ('continuous', [{'step': 'resample', 'fs': 100}]),
+])
+def test_preprocess_stream_rejects_whole_recording_steps(mode, chain):
+    from src.preprocessing import preprocess_stream
+    cfg = SimpleNamespace(CURRENT_ITERATION=1, SIGNAL_DTYPE='float64', FILTER_MODE=mode,
+                          PREPROCESSING_CHAIN={'eeg': chain})
+    blocks = iter([({'eeg': np.zeros((2, 1, 3750))}, {'eeg': 125.0})])
+    with pytest.raises(ValueError, match='cannot be streamed'):
+        next(preprocess_stream(blocks, cfg))
+
+def test_preprocess_stream_uses_stream_settings():
+    from src.preprocessing import preprocess_stream
+    # The shipped whole-recording settings (zero-phase, 'auto' notches) cannot be
+    # streamed, so streaming runs its own settings instead
+    stream_cfg = SimpleNamespace(CURRENT_ITERATION=config.CURRENT_ITERATION, SIGNAL_DTYPE='float64',
+                                 FILTER_MODE=config.STREAM_FILTER_MODE,
+                                 PREPROCESSING_CHAIN=config.STREAM_PREPROCESSING_CHAIN)
+    cfg = SimpleNamespace(CURRENT_ITERATION=config.CURRENT_ITERATION, SIGNAL_DTYPE='float64',
+                          FILTER_MODE=config.FILTER_MODE, PREPROCESSING_CHAIN=config.PREPROCESSING_CHAIN,
+                          STREAM_FILTER_MODE=config.STREAM_FILTER_MODE,
+                          STREAM_PREPROCESSING_CHAIN=config.STREAM_PREPROCESSING_CHAIN)
+    rng = np.random.default_rng(13)
+    data = {'eeg': rng.standard_normal((20, 2, 3750)),
+            'eog': rng.standard_normal((20, 2, 1500)),
+            'emg': rng.standard_normal((20, 1, 3750))}
+    rates = {'eeg': 125.0, 'eog': 50.0, 'emg': 125.0}
+    blocks = [({signal_type: signal[start:start + 5] for signal_type, signal in data.items()}, rates)
+              for start in range(0, 20, 5)]
+
+    streamed = list(preprocess_stream(iter(blocks), cfg))
+    full = preprocess(data, stream_cfg, channel_info={'sampling_rates': rates})
+
+    for signal_type in full:
+        joined = np.concatenate([block[signal_type] for block, _ in streamed])
+        assert np.allclose(joined, full[signal_type], atol=1e-10)
+
+@pytest.mark.parametrize('backend', ['thread', 'process'])
+def test_per_recording_chains_share_one_pool(tmp_path, monkeypatch, backend):
+    import src.preprocessing as preprocessing
+    # Single-channel zero-phase data: one chunk per recording, which must
+    # still run concurrently with the other recordings' chunks
+    t = np.arange(3750) / 125
+    rng = np.random.default_rng(13)
+    data = rng.standard_normal((12, 3750))
+    data[:4] += 0.5 * np.sin(2 * np.pi * 50 * t)
+    record_ids = np.repeat([f'R{i}' for i in range(6)], 2)
+    chain = {'eeg': [{'step': 'notch', 'freq': 'auto'}, {'step': 'lowpass', 'cutoff': 30}]}
+
+    def config(n_jobs):
+        return SimpleNamespace(CURRENT_ITERATION=1, SIGNAL_DTYPE='float64', FILTER_MODE='zero_phase',
+                               PREPROCESSING_CHAIN=chain, PREPROCESS_N_JOBS=n_jobs, PREPROCESS_BACKEND=backend)
+
+    expected = preprocess(data, config(1), record_ids, channel_info={'eeg_fs': 125.0})
+
+    calls = []
+    run_chunks = preprocessing._run_chunks
+    def spy(data, tasks, *args):
+        calls.append(len(tasks))
+        return run_chunks(data, tasks, *args)
+    monkeypatch.setattr(preprocessing, '_run_chunks', spy)
+
+    parallel = preprocess(data, config(3), record_ids, channel_info={'eeg_fs': 125.0},
+                          store_dir=str(tmp_path / 'store'))
+    assert calls == [6]
+    assert np.allclose(parallel, expected)
+
+    # Stored recordings are read back; nothing is left to run
+    calls.clear()
+    again = preprocess(data, config(3), record_ids, channel_info={'eeg_fs': 125.0},
+                       store_dir=str(tmp_path / 'store'))
+    assert calls == [0]
+    assert np.allclose(again, expected)
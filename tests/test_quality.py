@@ -0,0 +1,88 @@
+from types import SimpleNamespace
+import numpy as np
+from src.quality import (assess_signal_quality, usable_epochs, summarize_quality,
+                         QA_FLAT, QA_CLIPPED, QA_AMPLITUDE, QA_POWERLINE, QA_EOG_CONTAMINATION)
+
+CHANNEL_INFO = {'eeg_fs': 125.0, 'eog_fs': 50.0, 'emg_fs': 125.0}
+
+
+def _clean_recording(n_epochs=20, seed=0):
+    rng = np.random.default_rng(seed)
+    return {
+        'eeg': 20e-6 * rng.standard_normal((n_epochs, 2, 3750)),
+        'eog': 50e-6 * rng.standard_normal((n_epochs, 2, 1500)),
+        'emg': 5e-6 * rng.standard_normal((n_epochs, 1, 3750)),
+    }
+
+
+def test_clean_recording_has_no_flags():
+    flags = assess_signal_quality(_clean_recording(), CHANNEL_INFO)
+
+    assert flags['eeg'].shape == (20, 2) and flags['eeg'].dtype == np.uint8
+    assert all(not f.any() for f in flags.values())
+    assert usable_epochs(flags).all()
+
+
+def test_quality_flags():
+    data = _clean_recording()
+    t = np.arange(3750) / 125
+
+    data['eeg'][3, 0] = 0.0                                       # disconnected electrode
+    data['eeg'][5, 1] = np.clip(data['eeg'][5, 1] * 50, -5e-4, 5e-4)  # amplifier saturation
+    data['emg'][7, 0] *= 50                                       # movement burst
+    data['eeg'][9, 0] += 3e-5 * np.sin(2 * np.pi * 60 * t)        # mains interference
+    # Eye movement picked up by both EEG channels
+    blink = 3e-4 * np.sin(2 * np.pi * 0.5 * np.arange(1500) / 50)
+    data['eog'][11] += blink
+    data['eeg'][11] += np.repeat(blink, 2.5 * 2)[::2][:3750]
+
+    flags = assess_signal_quality(data, CHANNEL_INFO)
+
+    assert flags['eeg'][3, 0] & QA_FLAT
+    assert flags['eeg'][5, 1] & QA_CLIPPED
+    assert flags['emg'][7, 0] & QA_AMPLITUDE
+    assert flags['eeg'][9, 0] & QA_POWERLINE
+    assert np.all(flags['eeg'][11] & QA_EOG_CONTAMINATION)
+
+    keep = usable_epochs(flags)
+    assert list(np.flatnonzero(~keep)) == [3, 5, 7, 9, 11]
+    tolerant = usable_epochs(flags, ignore=QA_POWERLINE | QA_AMPLITUDE)
+    assert list(np.flatnonzero(~tolerant)) == [3, 5, 11]
+
+    summary = summarize_quality(flags)
+    assert summary['eeg']['flat'] == 1
+    assert summary['emg']['amplitude'] == 1
+
+
+def test_powerline_flags_both_mains_frequencies():
+    data = _clean_recording()
+    t = np.arange(3750) / 125
+    data['eeg'][2, 1] += 3e-5 * np.sin(2 * np.pi * 50 * t)        # European mains
+    data['emg'][4, 0] += 1e-5 * np.sin(2 * np.pi * 60 * t)        # US mains
+
+    flags = assess_signal_quality(data, CHANNEL_INFO)
+    assert np.argwhere(flags['eeg'] & QA_POWERLINE).tolist() == [[2, 1]]
+    assert np.argwhere(flags['emg'] & QA_POWERLINE).tolist() == [[4, 0]]
+
+    # Only the configured candidates are checked
+    us_only = SimpleNamespace(POWERLINE_FREQS=(60.0,))
+    assert not (assess_signal_quality(data, CHANNEL_INFO, us_only)['eeg'] & QA_POWERLINE).any()
+
+
+def test_quality_baselines_per_recording():
+    # R1 is clipped at +/-1 throughout; R2 has a much wider range
+    rng = np.random.default_rng(3)
+    clipped = {'eeg': np.clip(2.0 * rng.standard_normal((20, 1, 3750)), -1.0, 1.0)}
+    wide = {'eeg': 10.0 * rng.standard_normal((20, 1, 3750))}
+    cohort = {'eeg': np.concatenate([clipped['eeg'], wide['eeg']])}
+    record_ids = np.array(['R1'] * 20 + ['R2'] * 20)
+
+    alone = assess_signal_quality(clipped, CHANNEL_INFO)
+    flags = assess_signal_quality(cohort, CHANNEL_INFO, record_ids=record_ids)
+
+    assert np.count_nonzero(alone['eeg'] & QA_CLIPPED) == 20
+    assert np.array_equal(flags['eeg'][:20], alone['eeg'])
+    assert not np.any(flags['eeg'][20:] & QA_CLIPPED)
+    # Without record_ids the wide recording sets the limits and R1 passes
+    pooled = assess_signal_quality(cohort, CHANNEL_INFO)
+    assert not np.any(pooled['eeg'][:20] & QA_CLIPPED)
@@ -0,0 +1,106 @@
+import numpy as np
+from src.xml_parser import parse_xml_annotations, create_epoch_labels
+
+
+def _loop_labels(stages, total_duration, epoch_length):
+    # Reference: assign each stage event's epoch slice in order
+    labels = np.zeros(int(np.ceil(total_duration / epoch_length)), dtype=int)
+    for s in stages:
+        start_epoch = int(s['start'] / epoch_length)
+        end_epoch = int(np.ceil((s['start'] + s['duration']) / epoch_length))
+        labels[start_epoch:end_epoch] = s['stage']
+    return labels
+
+
+def test_parse_xml_annotations(tmp_path):
+    xml_path = tmp_path / 'R1.xml'
+    xml_path.write_text(
+        '<PSGAnnotation><EpochLength>30</EpochLength><ScoredEvents>'
+        '<ScoredEvent><EventConcept>SDO:WakeState</EventConcept>'
+        '<Start>0</Start><Duration>60</Duration></ScoredEvent>'
+        '<ScoredEvent><EventConcept>SpO2 desaturation</EventConcept>'
+        '<Start>12.5</Start><Duration>20</Duration>'
+        '<SpO2Nadir>88</SpO2Nadir><Desaturation>5</Desaturation></ScoredEvent>'
+        '<ScoredEvent><EventConcept>SDO:RapidEyeMovementSleep</EventConcept>'
+        '<Duration>30</Duration><Start>60</Start></ScoredEvent>'
+        '</ScoredEvents></PSGAnnotation>'
+    )
+
+    parsed = parse_xml_annotations(str(xml_path))
+
+    assert parsed['epoch_length'] == 30
+    assert len(parsed['events']) == 3
+    assert parsed['events'][1] == {'concept': 'SpO2 desaturation', 'start': 12.5, 'duration': 20.0,
+                                   'desaturation': 5.0, 'spo2_nadir': 88.0}
+    assert parsed['stages'] == [{'stage': 0, 'start': 0.0, 'duration': 60.0},
+                                {'stage': 4, 'start': 60.0, 'duration': 30.0}]
+
+
+def test_create_epoch_labels_matches_loop():
+    rng = np.random.default_rng(0)
+    stages = [{'stage': int(rng.integers(0, 5)),
+               'start': float(rng.uniform(0, 3000)),
+               'duration': float(rng.uniform(0, 300))} for _ in range(200)]
+
+    for total_duration in (1000, 2950.5, 4000):
+        expected = _loop_labels(stages, total_duration, 30)
+        assert np.array_equal(create_epoch_labels(stages, total_duration, 30), expected)
+
+    assert create_epoch_labels([], 90).tolist() == [0, 0, 0]
+
+
+def test_parse_xml_annotations_as_table(tmp_path):
+    from tests.helpers import write_annotations_xml
+
+    rng = np.random.default_rng(1)
+    concepts = ['SDO:WakeState', 'SDO:NonRapidEyeMovementSleep-N2', 'SDO:RapidEyeMovementSleep',
+                'SpO2 desaturation', 'Arousal ()']
+    xml_file = str(tmp_path / 'R1.xml')
+    write_annotations_xml(xml_file, [(concepts[rng.integers(len(concepts))], 30 * i, 30)
+                                     for i in range(200)])
+    # Some desaturations carry the optional SpO2 fields
+    text = open(xml_file).read()
+    text = text.replace('<Duration>30</Duration></ScoredEvent>',
+                        '<Duration>30</Duration><SpO2Nadir>88</SpO2Nadir>'
+                        '<Desaturation>4</Desaturation></ScoredEvent>', 25)
+    with open(xml_file, 'w') as f:
+        f.write(text)
+
+    parsed = parse_xml_annotations(xml_file)
+    table = parse_xml_annotations(xml_file, as_table=True)
+
+    events = table['events']
+    assert len(events) == len(parsed['events'])
+    assert [table['concepts'][c] for c in events['concept']] == [e['concept'] for e in parsed['events']]
+    assert np.array_equal(events['start'], [e['start'] for e in parsed['events']])
+
+    has_nadir = ~np.isnan(events['spo2_nadir'])
+    assert has_nadir.sum() == sum('spo2_nadir' in e for e in parsed['events']) == 25
+
+    assert table['stages']['stage'].tolist() == [s['stage'] for s in parsed['stages']]
+    assert np.array_equal(create_epoch_labels(table['stages'], 30000),
+                          create_epoch_labels(parsed['stages'], 30000))
+
+
+def test_validate_annotations_finds_gaps_and_overlaps(tmp_path):
+    from src.xml_parser import validate_annotations, validate_annotation_directory
+    from tests.helpers import write_annotations_xml, write_edf, make_psg_signals
+
+    write_annotations_xml(str(tmp_path / 'R1.xml'), [
+        ('SDO:WakeState', 0, 30),
+        ('SDO:NonRapidEyeMovementSleep-N2', 90, 30),    # gap 30-90
+        ('SDO:NonRapidEyeMovementSleep-N1', 30, 30),    # out of order, sorted first
+        ('SDO:RapidEyeMovementSleep', 100, 20),         # overlaps 90-120
+    ])
+    write_edf(str(tmp_path / 'R1.edf'), make_psg_signals(120), n_records=120)
+
+    parsed = parse_xml_annotations(str(tmp_path / 'R1.xml'), as_table=True)
+    result = validate_annotations(parsed, 120)
+
+    assert result['gaps'] == [{'start': 60.0, 'end': 90.0, 'duration': 30.0}]
+    assert result['overlaps'] == [{'event1_end': 120.0, 'event2_start': 100.0, 'overlap_duration': 20.0}]
+    assert result['annotation_duration'] == 120.0
+    assert not result['valid']
+
+    batch = validate_annotation_directory(str(tmp_path))
+    assert batch['R1'] == result
@@ -41,6 +41,8 @@ import os
 from glob import glob
 import config
 from src.data_loader import load_training_data
+from src.preprocessing import lowpass_filter
+from src.powerline import powerline_magnitudes
 
 
 def compute_spectrum(data, fs):
@@ -63,12 +65,8 @@ def compute_spectrum(data, fs):
 
 
 def apply_basic_filter(data, cutoff, fs, order=5):
-    """Apply a basic low-pass filter for comparison."""
-    nyquist = 0.5 * fs
-    normal_cutoff = cutoff / nyquist
-    b, a = signal.butter(order, normal_cutoff, btype='low', analog=False)
-    filtered = signal.lfilter(b, a, data)
-    return filtered
+    """Apply the pipeline's low-pass filter for comparison."""
+    return lowpass_filter(data, cutoff, fs, order)
 
 
 def visualize_signal_chunk(chunk_data, fs, channel_name, epoch_idx,
@@ -293,7 +291,8 @@ def analyze_powerline_noise(multi_channel_data, channel_info,
         tolerance (float): Frequency tolerance in Hz
 
     Returns:
-        dict: Summary of powerline noise analysis per channel
+        dict: Summary of powerline noise analysis per channel, over all
+            epochs, including the per-epoch ratios ('epoch_ratios')
     """
     print(f"\n{'='*60}")
     print(f"Powerline Noise Analysis ({powerline_freq} Hz ± {tolerance} Hz)")
@@ -312,40 +311,18 @@ def analyze_powerline_noise(multi_channel_data, channel_info,
 
         print(f"{channel_type.upper()} Channels:")
 
-        for ch_idx, ch_name in enumerate(channel_names):
-            # Analyze multiple random epochs
-            n_epochs = data.shape[0]
-            sample_size = min(20, n_epochs)  # Analyze 20 random epochs
-            random_epochs = np.random.choice(n_epochs, size=sample_size, replace=False)
-
-            powerline_magnitudes = []
-
-            for epoch_idx in random_epochs:
-                epoch_data = data[epoch_idx, ch_idx, :]
-                freqs, magnitude = compute_spectrum(epoch_data, fs)
-
-                # Find magnitude at powerline frequency
-                freq_mask = (freqs >= powerline_freq - tolerance) & (freqs <= powerline_freq + tolerance)
-                if np.any(freq_mask):
-                    powerline_mag = np.max(magnitude[freq_mask])
-                    powerline_magnitudes.append(powerline_mag)
+        # One batched FFT pass over every epoch of every channel
+        peaks, baseline = powerline_magnitudes(data, fs, freqs=(powerline_freq,), tolerance=tolerance)
+        if powerline_freq not in peaks:
+            print(f"  Skipped: {powerline_freq} Hz is above the Nyquist frequency ({fs / 2} Hz)\n")
+            continue
+        peak = peaks[powerline_freq]
+        ratios = peak / np.maximum(baseline, np.finfo(baseline.dtype).tiny)
 
-            avg_powerline = np.mean(powerline_magnitudes)
-            max_powerline = np.max(powerline_magnitudes)
-
-            # Calculate average magnitude in other frequency ranges for comparison
-            baseline_mags = []
-            for epoch_idx in random_epochs:
-                epoch_data = data[epoch_idx, ch_idx, :]
-                freqs, magnitude = compute_spectrum(epoch_data, fs)
-
-                # Sample baseline from 5-40 Hz (avoiding powerline)
-                baseline_mask = ((freqs >= 5) & (freqs <= 40) &
-                               ((freqs < powerline_freq - 5) | (freqs > powerline_freq + 5)))
-                if np.any(baseline_mask):
-                    baseline_mags.append(np.mean(magnitude[baseline_mask]))
-
-            avg_baseline = np.mean(baseline_mags)
+        for ch_idx, ch_name in enumerate(channel_names):
+            avg_powerline = peak[:, ch_idx].mean()
+            max_powerline = peak[:, ch_idx].max()
+            avg_baseline = baseline[:, ch_idx].mean()
 
             # Calculate signal-to-noise ratio
             snr = avg_powerline / avg_baseline if avg_baseline > 0 else 0
@@ -354,7 +331,8 @@ def analyze_powerline_noise(multi_channel_data, channel_info,
                 'avg_powerline_magnitude': avg_powerline,
                 'max_powerline_magnitude': max_powerline,
                 'avg_baseline_magnitude': avg_baseline,
-                'powerline_to_baseline_ratio': snr
+                'powerline_to_baseline_ratio': snr,
+                'epoch_ratios': ratios[:, ch_idx]
             }
 
             # Determine if powerline noise is significant
@@ -369,7 +347,8 @@ def analyze_powerline_noise(multi_channel_data, channel_info,
             print(f"    Avg {powerline_freq}Hz magnitude: {avg_powerline:.6e}")
             print(f"    Max {powerline_freq}Hz magnitude: {max_powerline:.6e}")
             print(f"    Baseline magnitude (5-40Hz): {avg_baseline:.6e}")
-            print(f"    Ratio: {snr:.2f}x")
+            print(f"    Ratio: {snr:.2f}x (epochs above 3x: {np.count_nonzero(ratios[:, ch_idx] > 3)}"
+                  f" of {len(ratios)})")
 
         print()
 